@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ElectionsAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'elections_app'
+
+    def ready(self):
+        # Connect signal receivers (election descriptor cache invalidation)
+        import elections_app.signals  # noqa: F401
+        from elections_app.voter_search import ensure_search_index
+
+        # SQLite drops the search triggers whenever a migration rebuilds the voter table
+        post_migrate.connect(ensure_search_index, sender=self)
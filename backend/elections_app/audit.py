@@ -0,0 +1,153 @@
+"""Audit sink: where views record `AuditLog` entries.
+
+`record_audit` writes the row inline by default. With
+`settings.AUDIT_BUFFERED` enabled, entries are queued once the surrounding
+transaction commits and a per-process background writer inserts them with
+`bulk_create`, every `AUDIT_FLUSH_SIZE` entries or `AUDIT_FLUSH_INTERVAL_MS`
+milliseconds, whichever comes first. Pending entries are flushed when the
+process exits. Buffered rows are timestamped when they are written, at most
+one flush interval after the action.
+
+Entries that other code relies on being present immediately are written
+synchronously whatever the mode: pass `durable=True`. Votes
+(`voter.admission.record_vote`, group commit) and election closing
+(`utils.auto_close_elections`) write their audit rows in their own
+transactions and do not go through the buffer.
+
+Queue depth and flush timings are published through `elections_app.metrics`.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from elections_app import metrics
+from elections_app.models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedAuditWriter:
+    """Background thread that inserts queued AuditLog rows in batches."""
+
+    def __init__(self, flush_size=200, flush_interval=0.5):
+        self.flush_size = max(int(flush_size), 1)
+        self.flush_interval = max(float(flush_interval), 0.0)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def put(self, entry):
+        self._ensure_thread()
+        self._queue.put(entry)
+        metrics.gauge_set('audit_queue_depth', self._queue.qsize())
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        """Return `(batch, stop)`; `stop` is set when the shutdown sentinel was received."""
+        entry = self._queue.get()
+        if entry is None:
+            return [], True
+        batch = [entry]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.flush_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is None:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _run(self):
+        while True:
+            batch, stop = self._collect()
+            try:
+                self._write(batch)
+            finally:
+                close_old_connections()
+            if stop:
+                return
+
+    def _write(self, batch):
+        if not batch:
+            return
+        started = time.monotonic()
+        try:
+            AuditLog.objects.bulk_create(batch)
+        except Exception as e:
+            # Keep whatever rows can be saved on their own
+            logger.exception('Audit batch of %s entries failed, retrying one by one: %s', len(batch), e)
+            for entry in batch:
+                try:
+                    entry.save()
+                except Exception:
+                    metrics.incr('audit_rows_dropped')
+                    logger.exception('Dropping audit entry %s', entry.action)
+        elapsed_ms = (time.monotonic() - started) * 1000
+        metrics.incr('audit_flushes')
+        metrics.incr('audit_rows_buffered_written', len(batch))
+        metrics.incr('audit_flush_ms_total', elapsed_ms)
+        metrics.gauge_set('audit_flush_last_ms', round(elapsed_ms, 3))
+        metrics.gauge_set('audit_queue_depth', self._queue.qsize())
+
+    def shutdown(self, timeout=10):
+        """Stop the writer after it has written everything queued so far (registered with atexit)."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout)
+        # Entries queued after the sentinel, or left by a writer that did not stop in time
+        leftovers = []
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not None:
+                leftovers.append(entry)
+        self._write(leftovers)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_audit_writer():
+    """Return the process-wide `BufferedAuditWriter` configured from settings."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = BufferedAuditWriter(
+                flush_size=getattr(settings, 'AUDIT_FLUSH_SIZE', 200),
+                flush_interval=getattr(settings, 'AUDIT_FLUSH_INTERVAL_MS', 500) / 1000.0,
+            )
+            atexit.register(_writer.shutdown)
+        return _writer
+
+
+def record_audit(action, actor=None, detail=None, durable=False):
+    """Record an audit entry: inline when `durable` or unbuffered, otherwise after commit via the writer."""
+    entry = AuditLog(action=action, actor=actor, detail=detail)
+    if durable or not getattr(settings, 'AUDIT_BUFFERED', False):
+        entry.save()
+        metrics.incr('audit_rows_sync_written')
+        return
+    writer = get_audit_writer()
+    # Only actions whose transaction commits are logged
+    transaction.on_commit(lambda: writer.put(entry))
@@ -0,0 +1,90 @@
+"""Backups written before destructive operations (forced import deletion).
+
+The backup is a gzip-compressed CSV streamed from one joined query into a
+temporary file, then handed to storage: S3 when `AWS_S3_BUCKET_NAME` is set
+(multipart upload, presigned download URL), otherwise Django's default
+storage under `backups/institution_<id>/`, downloadable by the institution
+through `InstitutionViewSet.download_backup`.
+"""
+
+import csv
+import gzip
+import io
+import json
+import logging
+import secrets
+import tempfile
+from itertools import groupby
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from elections_app.models import Voter
+
+logger = logging.getLogger(__name__)
+
+BACKUP_FIELDS = ('id', 'identifier', 'name', 'eligible', 'created_at',
+                 'votes__id', 'votes__election_id', 'votes__candidate_id', 'votes__timestamp')
+
+
+def backup_prefix(institution_id):
+    return f'backups/institution_{int(institution_id)}/'
+
+
+def _write_voters_csv(queryset, text):
+    writer = csv.writer(text)
+    writer.writerow(['voter_identifier', 'voter_name', 'eligible', 'created_at', 'votes'])
+    # One LEFT JOIN over voters and votes, ordered by voter: one CSV line per voter
+    rows = queryset.order_by('id', 'votes__id').values_list(*BACKUP_FIELDS).iterator(chunk_size=2000)
+    count = 0
+    for _, voter_rows in groupby(rows, key=lambda r: r[0]):
+        voter_rows = list(voter_rows)
+        _, identifier, name, eligible, created_at = voter_rows[0][:5]
+        votes = [
+            {'id': vote_id, 'election_id': election_id, 'candidate_id': candidate_id, 'timestamp': ts}
+            for vote_id, election_id, candidate_id, ts in (r[5:] for r in voter_rows)
+            if vote_id is not None
+        ]
+        writer.writerow([identifier, name, eligible, created_at.isoformat(), json.dumps(votes, default=str)])
+        count += 1
+    return count
+
+
+def _upload_to_s3(fileobj, key):
+    import boto3  # type: ignore
+    s3 = boto3.client(
+        's3',
+        aws_access_key_id=getattr(settings, 'AWS_ACCESS_KEY_ID', None),
+        aws_secret_access_key=getattr(settings, 'AWS_SECRET_ACCESS_KEY', None),
+        region_name=getattr(settings, 'AWS_REGION', None),
+    )
+    s3.upload_fileobj(fileobj, settings.AWS_S3_BUCKET_NAME, key, ExtraArgs={'ContentType': 'text/csv', 'ContentEncoding': 'gzip'})
+    try:
+        return s3.generate_presigned_url('get_object', Params={'Bucket': settings.AWS_S3_BUCKET_NAME, 'Key': key}, ExpiresIn=3600)
+    except Exception:
+        return f"https://{settings.AWS_S3_BUCKET_NAME}.s3.amazonaws.com/{key}"
+
+
+def write_import_backup(import_file):
+    """Back up the voters of `import_file` with their votes; returns `{'name', 'url', 'voters'}`.
+
+    `url` is a presigned S3 URL when uploaded to S3, None for local storage
+    (use the download endpoint with `name`).
+    """
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%SZ')
+    name = f'{backup_prefix(import_file.institution_id)}import_{import_file.id}_{stamp}_{secrets.token_hex(4)}.csv.gz'
+    with tempfile.TemporaryFile() as tmp:
+        # Closing the text wrapper finishes the gzip stream; tmp stays open
+        with io.TextIOWrapper(gzip.GzipFile(fileobj=tmp, mode='wb'), encoding='utf-8', newline='') as text:
+            voters = _write_voters_csv(Voter.objects.filter(import_file=import_file), text)
+        tmp.seek(0)
+        if getattr(settings, 'AWS_S3_BUCKET_NAME', None):
+            try:
+                return {'name': name, 'url': _upload_to_s3(tmp, name), 'voters': voters}
+            except Exception as e:
+                logger.warning('S3 backup upload failed, keeping %s in local storage: %s', name, e)
+                tmp.seek(0)
+        name = default_storage.save(name, File(tmp, name=name))
+    return {'name': name, 'url': None, 'voters': voters}
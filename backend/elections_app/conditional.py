@@ -0,0 +1,57 @@
+"""Conditional GET support (ETag / Last-Modified) for the endpoints dashboards poll.
+
+Views compute cheap validators (election `updated_at`, `tally.tally_version`,
+or a digest of a cached payload) and call `conditional_response` before doing
+any real work: a matching `If-None-Match` / `If-Modified-Since` gets a
+`304 Not Modified` without running the aggregation or the serializer.
+Responses carry `Cache-Control: private, no-cache` so browsers keep the body
+but revalidate on every poll.
+"""
+
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """Strong ETag from any repr-able validator parts (ids, timestamps, versions, query strings)."""
+    return quote_etag(hashlib.md5(repr(parts).encode('utf-8'), usedforsecurity=False).hexdigest())
+
+
+def payload_etag(payload):
+    """ETag from the JSON content of a response payload."""
+    body = json.dumps(payload, cls=DjangoJSONEncoder, sort_keys=True)
+    return make_etag(body)
+
+
+def latest(*stamps):
+    """Most recent of the given datetimes (None values ignored)."""
+    stamps = [s for s in stamps if s is not None]
+    return max(stamps) if stamps else None
+
+
+def set_validators(response, etag, last_modified=None):
+    """Attach ETag/Last-Modified and revalidation headers to `response`."""
+    if etag:
+        response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    # Responses depend on the caller's token
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+def conditional_response(request, etag, last_modified=None):
+    """Return a ready `304 Not Modified` when the request's validators match, else None."""
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified is not None else None,
+    )
+    if response is None:
+        return None
+    return set_validators(response, etag, last_modified)
@@ -0,0 +1,84 @@
+"""WebSocket consumer for live election results (`ws/elections/<id>/results/`).
+
+Access mirrors `ElectionViewSet.get_queryset`: either `?token=<auth token>` of
+the institution owning the election, or `?institution=<id>` of that
+institution. On connect the client receives a `snapshot` of the tally, then
+`delta` messages as votes commit (coalesced, see `elections_app.live`).
+"""
+
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from rest_framework.authtoken.models import Token
+
+from elections_app import live, metrics
+from elections_app.models import Election
+from elections_app.tally import election_tally
+
+
+def _counts_payload(counts):
+    return [{'candidate_id': cid, 'votes': n} for cid, n in counts.items()]
+
+
+@database_sync_to_async
+def _authorized_election(election_id, token, institution_id):
+    election = Election.objects.filter(id=election_id).values('id', 'institution_id').first()
+    if election is None:
+        return None
+    if token:
+        owner = Token.objects.filter(key=token).values_list('user__institution__id', flat=True).first()
+        if owner == election['institution_id']:
+            return election
+    if institution_id and str(institution_id) == str(election['institution_id']):
+        return election
+    return None
+
+
+class ElectionResultsConsumer(AsyncJsonWebsocketConsumer):
+
+    async def connect(self):
+        self.group = None
+        params = parse_qs(self.scope.get('query_string', b'').decode())
+        token = (params.get('token') or [None])[0]
+        institution_id = (params.get('institution') or params.get('institution_id') or [None])[0]
+        try:
+            election_id = int(self.scope['url_route']['kwargs']['election_id'])
+        except (KeyError, ValueError):
+            await self.close()
+            return
+        election = await _authorized_election(election_id, token, institution_id)
+        if election is None:
+            await self.close()
+            return
+
+        live.attach_loop(asyncio.get_running_loop())
+        self.election_id = election_id
+        self.group = live.group_name(election_id)
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+        metrics.gauge_add('live_connections', 1)
+        metrics.incr('live_connections_total')
+
+        tally = await database_sync_to_async(election_tally)(election_id)
+        counts = {**tally.counts, None: tally.null_votes}
+        await self.send_json({'type': 'snapshot', 'election_id': election_id, 'counts': _counts_payload(counts)})
+
+    async def disconnect(self, code):
+        if self.group is not None:
+            await self.channel_layer.group_discard(self.group, self.channel_name)
+            metrics.gauge_add('live_connections', -1)
+            self.group = None
+
+    async def receive_json(self, content, **kwargs):
+        # Server push only; clients may ping to keep intermediaries from closing the socket
+        if content.get('type') == 'ping':
+            await self.send_json({'type': 'pong'})
+
+    async def results_delta(self, event):
+        body = json.dumps({'type': 'delta', 'election_id': event['election_id'], 'deltas': event['deltas']})
+        await self.send(text_data=body)
+        metrics.incr('live_messages_sent')
+        metrics.incr('live_bytes_sent', len(body))
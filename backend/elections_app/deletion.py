@@ -0,0 +1,155 @@
+"""Chunked deletes for imports and elections.
+
+Django's `QuerySet.delete()` collects every related object in memory and
+deletes them in one transaction, holding the database write lock for the whole
+purge. The helpers here walk primary keys in bounded chunks and issue plain
+`DELETE ... WHERE <column> IN (...)` statements, one short transaction per
+chunk, sleeping `DELETE_CHUNK_PAUSE_MS` between chunks so votes can be written
+meanwhile. They bypass the collector: no `pre_delete`/`post_delete` signals,
+and dependents are handled explicitly (votes before their voters). Callers
+rebuild what those signals would have maintained (tallies, voted indexes);
+`delete_election` and `delete_import` do it themselves.
+
+`count_*` give the dry-run numbers with aggregate queries; `progress` callbacks
+receive `(step, done, total)` after every chunk.
+"""
+
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from elections_app.models import Candidate, Election, ElectionTally, Vote, Voter
+from elections_app.tally import rebuild_election_tally
+from elections_app.voted_index import invalidate_voted_index
+
+DELETE_CHUNK_SIZE = 1000
+
+
+def _chunk_size(chunk_size):
+    return max(int(chunk_size or getattr(settings, 'DELETE_CHUNK_SIZE', DELETE_CHUNK_SIZE)), 1)
+
+
+def _pause(pause):
+    if pause is None:
+        pause = getattr(settings, 'DELETE_CHUNK_PAUSE_MS', 10) / 1000.0
+    if pause > 0:
+        time.sleep(pause)
+
+
+def raw_delete(model, column, values):
+    """`DELETE FROM <model table> WHERE <column> IN (values)`; returns the number of rows deleted."""
+    if not values:
+        return 0
+    qn = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(values))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {qn(model._meta.db_table)} WHERE {qn(column)} IN ({placeholders})', list(values))
+        return cursor.rowcount
+
+
+def iter_pk_chunks(queryset, chunk_size=DELETE_CHUNK_SIZE):
+    """Yield lists of primary keys of `queryset`, in ascending order, `chunk_size` at a time (keyset walk)."""
+    last = None
+    while True:
+        page = queryset.order_by('pk')
+        if last is not None:
+            page = page.filter(pk__gt=last)
+        ids = list(page.values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+
+def delete_voters_in_chunks(queryset, chunk_size=None, pause=None, progress=None):
+    """Delete the voters of `queryset` and their votes, one transaction per chunk.
+
+    Returns `(voters_deleted, votes_deleted, election_ids)`, the latter being
+    the elections that lost votes (their tallies need rebuilding).
+    """
+    chunk_size = _chunk_size(chunk_size)
+    total = queryset.count() if progress else None
+    voters_deleted = votes_deleted = 0
+    election_ids = set()
+    for ids in iter_pk_chunks(queryset, chunk_size):
+        with transaction.atomic():
+            election_ids.update(
+                Vote.objects.filter(voter_id__in=ids, election__isnull=False)
+                .values_list('election_id', flat=True).distinct()
+            )
+            votes_deleted += raw_delete(Vote, Vote._meta.get_field('voter').column, ids)
+            voters_deleted += raw_delete(Voter, Voter._meta.pk.column, ids)
+        if progress:
+            progress('voters', voters_deleted, total)
+        _pause(pause)
+    return voters_deleted, votes_deleted, election_ids
+
+
+def count_import_deletion(import_file):
+    """Dry run of `delete_import`: `{'voters': n, 'votes': n}`."""
+    voters = Voter.objects.filter(import_file=import_file)
+    return {'voters': voters.count(), 'votes': Vote.objects.filter(voter__in=voters).count()}
+
+
+def delete_import(import_file, chunk_size=None, pause=None, progress=None):
+    """Delete an import with its voters and their votes; returns the counts like `count_import_deletion`."""
+    voters, votes, election_ids = delete_voters_in_chunks(
+        Voter.objects.filter(import_file=import_file), chunk_size=chunk_size, pause=pause, progress=progress,
+    )
+    import_file.file.delete(save=False)
+    import_file.delete()
+    if votes:
+        for election_id in election_ids:
+            rebuild_election_tally(election_id)
+        invalidate_voted_index()
+    return {'voters': voters, 'votes': votes}
+
+
+def count_election_deletion(election):
+    """Dry run of `delete_election`: `{'candidates': n, 'votes_detached': n, 'tallies': n}`."""
+    return {
+        'candidates': Candidate.objects.filter(election=election).count(),
+        'votes_detached': Vote.objects.filter(election=election).count(),
+        'tallies': ElectionTally.objects.filter(election=election).count(),
+    }
+
+
+def delete_election(election, chunk_size=None, pause=None, progress=None):
+    """Delete an election the way the ORM would, in chunks.
+
+    Votes are kept but detached (`Vote.election` and `Vote.candidate` are
+    SET_NULL), candidates and tallies are deleted, and the election row itself
+    goes through the ORM last so its signals still run.
+    """
+    chunk_size = _chunk_size(chunk_size)
+    counts = count_election_deletion(election) if progress else None
+    qn = connection.ops.quote_name
+    detach_sql = 'UPDATE {} SET {} = NULL, {} = NULL WHERE {} IN ({{}})'.format(
+        qn(Vote._meta.db_table), qn(Vote._meta.get_field('election').column),
+        qn(Vote._meta.get_field('candidate').column), qn(Vote._meta.pk.column),
+    )
+
+    detached = 0
+    for ids in iter_pk_chunks(Vote.objects.filter(election=election), chunk_size):
+        placeholders = ', '.join(['%s'] * len(ids))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(detach_sql.format(placeholders), ids)
+            detached += cursor.rowcount
+        if progress:
+            progress('votes_detached', detached, counts['votes_detached'])
+        _pause(pause)
+
+    with transaction.atomic():
+        tallies = raw_delete(ElectionTally, ElectionTally._meta.get_field('election').column, [election.id])
+        candidate_ids = list(Candidate.objects.filter(election=election).values_list('id', flat=True))
+        Election.objects.filter(finalized_winner_id__in=candidate_ids).update(finalized_winner=None)
+        candidates = 0
+        for start in range(0, len(candidate_ids), chunk_size):
+            candidates += raw_delete(Candidate, Candidate._meta.pk.column, candidate_ids[start:start + chunk_size])
+    if progress:
+        progress('candidates', candidates, counts['candidates'])
+
+    # Nothing left to collect: one DELETE, and the Election signals drop the caches
+    election.delete()
+    return {'candidates': candidates, 'votes_detached': detached, 'tallies': tallies}
@@ -0,0 +1,121 @@
+"""Per-process cache of election descriptors used by the voting endpoints.
+
+A descriptor holds what a ballot needs to be validated: the aware start/end,
+the closed flag, the institution id and the set of valid candidate ids. The
+round a vote counts towards is deliberately not cached: the tally UPDATE reads
+it from the Election row (see `elections_app.tally.add_to_tally`).
+Descriptors are invalidated by post_save/post_delete signals on Election and
+Candidate (see `elections_app.signals`); the TTL
+(`settings.ELECTION_DESCRIPTOR_TTL`, seconds) is a safety net for writes that
+bypass signals (queryset.update, bulk_create) or happen in another process.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from elections_app.utils import as_aware, election_window_open
+
+# Beyond this many entries, expired descriptors are pruned on insert.
+_MAX_ENTRIES = 1024
+
+_lock = threading.Lock()
+_cache = {}
+# Bumped by every invalidation.
+_generation = 0
+
+
+class ElectionDescriptor(namedtuple('ElectionDescriptor', (
+    'id', 'institution_id', 'start', 'end', 'closed', 'candidate_ids',
+))):
+    __slots__ = ()
+
+    def is_open(self, now=None):
+        """True when the election is not closed and `now` is inside its window."""
+        return not self.closed and election_window_open(self.start, self.end, now)
+
+    def needs_closing(self, now=None):
+        """True when the end time has passed but the closed flag is not recorded yet."""
+        return bool(self.end) and not self.closed and self.end <= (now or timezone.now())
+
+    def has_candidate(self, candidate_id):
+        return candidate_id in self.candidate_ids
+
+
+def _ttl():
+    return getattr(settings, 'ELECTION_DESCRIPTOR_TTL', 5)
+
+
+def _queries(election_id):
+    # Lazy import to avoid circular imports
+    from elections_app.models import Candidate, Election
+
+    election_qs = (
+        Election.objects.filter(id=election_id)
+        .values('id', 'institution_id', 'start', 'end', 'closed')
+    )
+    candidate_qs = Candidate.objects.filter(election_id=election_id).values_list('id', flat=True)
+    return election_qs, candidate_qs
+
+
+def _build(row, candidate_ids):
+    return ElectionDescriptor(
+        id=row['id'],
+        institution_id=row['institution_id'],
+        start=as_aware(row['start']),
+        end=as_aware(row['end']),
+        closed=row['closed'],
+        candidate_ids=frozenset(candidate_ids),
+    )
+
+
+def _lookup(election_id):
+    """Return `(descriptor or None, generation)`; the generation guards against storing stale loads."""
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(election_id)
+        if entry is not None and entry[1] > now:
+            return entry[0], _generation
+        return None, _generation
+
+
+def _store(election_id, descriptor, generation):
+    now = time.monotonic()
+    with _lock:
+        # An invalidation ran while we were loading: do not cache what we read.
+        if generation != _generation:
+            return
+        if len(_cache) >= _MAX_ENTRIES:
+            for key in [k for k, (_, expires) in _cache.items() if expires <= now]:
+                del _cache[key]
+        _cache[election_id] = (descriptor, now + _ttl())
+
+
+def get_election_descriptor(election_id):
+    """Return the cached `ElectionDescriptor` for `election_id`, or None if the election does not exist."""
+    election_id = int(election_id)
+    descriptor, generation = _lookup(election_id)
+    if descriptor is not None:
+        return descriptor
+
+    election_qs, candidate_qs = _queries(election_id)
+    row = election_qs.first()
+    if row is None:
+        return None
+    descriptor = _build(row, candidate_qs)
+    _store(election_id, descriptor, generation)
+    return descriptor
+
+
+def invalidate_election_descriptor(election_id=None):
+    """Drop the cached descriptor for `election_id` (or every descriptor when None)."""
+    global _generation
+    with _lock:
+        _generation += 1
+        if election_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(election_id, None)
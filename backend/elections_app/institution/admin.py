@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from elections_app.models import Institution, Election, Candidate, Voter
+from elections_app.models import Institution, Election, Candidate, Voter, normalize_identifier
+from elections_app.voter_search import MAX_SEARCH_LIMIT, search_backend, search_voter_ids
 
 # Import-export for admin import/export
 from import_export import resources
@@ -11,8 +12,15 @@ class VoterResource(resources.ModelResource):
     class Meta:
         model = Voter
         # expect institution to be provided as a PK (institution id) in the import file
-        fields = ('institution', 'identifier', 'name', 'eligible')
-        import_id_fields = ('institution', 'identifier')
+        fields = ('institution', 'identifier', 'identifier_normalized', 'name', 'eligible')
+        # Rows match existing voters on the normalized identifier (unique index)
+        import_id_fields = ('institution', 'identifier_normalized')
+
+    def before_import(self, dataset, **kwargs):
+        # Computed from `identifier`, whatever the file says (exports include the column)
+        if 'identifier_normalized' in dataset.headers:
+            del dataset['identifier_normalized']
+        dataset.append_col([normalize_identifier(value) for value in dataset['identifier']], header='identifier_normalized')
 
 
 @admin.register(Institution)
@@ -45,3 +53,17 @@ class VoterAdmin(ImportExportModelAdmin):
     list_display = ('identifier', 'name', 'institution', 'eligible', 'created_at')
     list_filter = ('eligible', 'institution')
     search_fields = ('identifier', 'name')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Use the search index instead of icontains scans over every voter
+        if not search_term.strip() or search_backend() == 'scan':
+            return super().get_search_results(request, queryset, search_term)
+        institution_id = request.GET.get('institution__id__exact')
+        ids = search_voter_ids(
+            search_term, institution_id=int(institution_id) if institution_id and institution_id.isdigit() else None,
+            limit=MAX_SEARCH_LIMIT,
+        )
+        if len(ids) >= MAX_SEARCH_LIMIT:
+            # Possibly truncated: let the default search return every match
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(id__in=ids), False
@@ -1,9 +1,11 @@
 from rest_framework import serializers
-from elections_app.models import Institution, Election, Candidate, Voter, AuditLog, Vote
-from django.db.models import Q
+from elections_app.models import Institution, Election, Candidate, Voter, AuditLog, Vote, ElectionTally, normalize_identifier
+from django.db.models import Case, Count, Exists, IntegerField, OuterRef, Prefetch, Q, Subquery, Sum, When
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from rest_framework import serializers
-from django.utils import timezone
+from elections_app.tally import election_tally
+from elections_app.utils import election_window_open
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -39,6 +41,14 @@ class InstitutionRegisterSerializer(serializers.Serializer):
         return value
 
 
+def tally_or_raw_count(election_ref, tallied, raw):
+    """Annotation reading `tallied` when the election has tally rows, else `raw` (the `election_tally` fallback)."""
+    has_tally = Exists(ElectionTally.objects.filter(election=election_ref, votes__gt=0))
+    return Coalesce(
+        Case(When(has_tally, then=Subquery(tallied)), default=Subquery(raw), output_field=IntegerField()), 0,
+    )
+
+
 class CandidateSerializer(serializers.ModelSerializer):
     vote_count = serializers.SerializerMethodField()
 
@@ -48,8 +58,21 @@ class CandidateSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'bio', 'position', 'photo', 'vote_count', 'election', 'created_at')
         read_only_fields = ('created_at',)
 
+    @staticmethod
+    def prepare_queryset(queryset):
+        """Annotate `tally_votes` so `vote_count` needs no query per candidate."""
+        tallied = ElectionTally.objects.filter(candidate=OuterRef('pk')).values('candidate').annotate(n=Sum('votes')).values('n')
+        raw = Vote.objects.filter(candidate=OuterRef('pk')).values('candidate').annotate(n=Count('id')).values('n')
+        return queryset.annotate(tally_votes=tally_or_raw_count(OuterRef('election'), tallied, raw))
+
     def get_vote_count(self, obj):
-        return obj.votes.count()
+        if hasattr(obj, 'tally_votes'):
+            return obj.tally_votes or 0
+        # One tally read per election, shared by every candidate serialized in this request
+        tallies = self.context.setdefault('election_tallies', {})
+        if obj.election_id not in tallies:
+            tallies[obj.election_id] = election_tally(obj.election_id)
+        return tallies[obj.election_id].votes_for(obj.id)
 
 
 # Ballot model removed; vote-related per-election fields are computed on Election
@@ -62,7 +85,7 @@ class ElectionSerializer(serializers.ModelSerializer):
     majority_threshold = serializers.DecimalField(max_digits=5, decimal_places=2, read_only=False, required=False, min_value=0, max_value=100)
     advance_threshold = serializers.DecimalField(max_digits=5, decimal_places=2, read_only=False, required=False, min_value=0, max_value=100)
     current_round = serializers.IntegerField(read_only=True)
-    finalized_winner = CandidateSerializer(read_only=True)
+    finalized_winner = serializers.SerializerMethodField()
     start = serializers.DateTimeField(required=False, allow_null=True)
     end = serializers.DateTimeField(required=False, allow_null=True)
 
@@ -79,7 +102,29 @@ class ElectionSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({'end': 'La date de fin doit être postérieure à la date de début.'})
         return data
 
+    @staticmethod
+    def prepare_queryset(queryset):
+        """Eager-load what the serializer reads: a constant number of queries however many elections are listed."""
+        voted = (
+            ElectionTally.objects.filter(election=OuterRef('pk'))
+            .values('election').annotate(total=Sum('votes')).values('total')
+        )
+        raw = Vote.objects.filter(election=OuterRef('pk')).values('election').annotate(total=Count('id')).values('total')
+        return queryset.annotate(tally_voted_count=tally_or_raw_count(OuterRef('pk'), voted, raw)).prefetch_related(
+            Prefetch('candidates', queryset=CandidateSerializer.prepare_queryset(Candidate.objects.order_by('id'))),
+        )
+
+    def get_finalized_winner(self, obj):
+        if obj.finalized_winner_id is None:
+            return None
+        # The winner is one of the (prefetched) candidates of the election
+        winner = next((c for c in obj.candidates.all() if c.id == obj.finalized_winner_id), None) or obj.finalized_winner
+        return CandidateSerializer(winner, context=self.context).data
+
     def get_voted_voters_count(self, obj):
+        if hasattr(obj, 'tally_voted_count'):
+            # One vote per voter and election: the tally total is the number of voters who voted
+            return obj.tally_voted_count
         try:
             # count distinct voters who have at least one vote for this election
             return Vote.objects.filter(election=obj).values('voter').distinct().count()
@@ -88,17 +133,12 @@ class ElectionSerializer(serializers.ModelSerializer):
 
     def get_is_open(self, obj):
         try:
-            now = timezone.now()
             # Consider election open when:
             # - both start and end are set and now is within the window, OR
             # - start is set and end is not set and now is after start (open until explicitly closed)
             # Note: treat `end` as exclusive so setting end == now marks the election closed.
-            if obj.start and obj.end:
-                return obj.start <= now < obj.end
-            if obj.start and not obj.end:
-                return obj.start <= now
-            # If start not set, treat as closed by default
-            return False
+            # Same rules as the voting endpoints (see utils.election_window_open).
+            return election_window_open(obj.start, obj.end)
         except Exception:
             return False
 
@@ -106,8 +146,22 @@ class ElectionSerializer(serializers.ModelSerializer):
 class VoterSerializer(serializers.ModelSerializer):
     class Meta:
         model = Voter
-        fields = ('id', 'identifier', 'name', 'eligible', 'created_at')
-        read_only_fields = ('created_at',)
+        fields = ('id', 'identifier', 'identifier_normalized', 'name', 'eligible', 'created_at')
+        read_only_fields = ('identifier_normalized', 'created_at',)
+
+    def validate_identifier(self, value):
+        """Identifiers are unique per institution once normalized (case, spaces, Unicode form)."""
+        normalized = normalize_identifier(value)
+        if not normalized:
+            raise serializers.ValidationError("Identifier cannot be blank.")
+        request = self.context.get('request')
+        if request is not None:
+            others = Voter.objects.filter(institution__user=request.user, identifier_normalized=normalized)
+            if self.instance is not None:
+                others = others.exclude(pk=self.instance.pk)
+            if others.exists():
+                raise serializers.ValidationError("A voter with this identifier already exists.")
+        return value
 
 
 class AuditLogSerializer(serializers.ModelSerializer):
@@ -118,11 +172,15 @@ class AuditLogSerializer(serializers.ModelSerializer):
 
 class VoterImportFileSerializer(serializers.ModelSerializer):
     file_url = serializers.SerializerMethodField()
+    progress = serializers.SerializerMethodField()
 
     class Meta:
         model = None
         # will be set dynamically below
-        fields = ('id', 'file_url', 'uploaded_by', 'uploaded_at', 'total_rows', 'created', 'updated')
+        fields = (
+            'id', 'file_url', 'uploaded_by', 'uploaded_at', 'total_rows', 'created', 'updated',
+            'status', 'rows_processed', 'progress', 'error', 'finished_at',
+        )
 
     def get_file_url(self, obj):
         try:
@@ -130,6 +188,14 @@ class VoterImportFileSerializer(serializers.ModelSerializer):
         except Exception:
             return None
 
+    def get_progress(self, obj):
+        # Percentage of rows processed; None while a queued job has not counted its rows yet
+        if obj.status == 'done':
+            return 100
+        if not obj.total_rows:
+            return None
+        return min(100, round(100 * obj.rows_processed / obj.total_rows))
+
 # import model lazily to avoid circular import issues
 from elections_app.models import VoterImportFile
 VoterImportFileSerializer.Meta.model = VoterImportFile
@@ -2,7 +2,7 @@ from rest_framework import viewsets, status, serializers
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.decorators import action, api_view, permission_classes, authentication_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny, IsAuthenticatedOrReadOnly
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAuthenticatedOrReadOnly, IsAdminUser
 from rest_framework.authtoken.models import Token
 from django.shortcuts import get_object_or_404
 from django.db import transaction
@@ -12,10 +12,22 @@ from django.utils.dateparse import parse_datetime
 from django.contrib.auth.models import User
 from django.conf import settings
 from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import FileResponse
 
 from elections_app.models import Election, Candidate, Vote, Voter, Institution, AuditLog
 from elections_app.models import VoterImportFile
-from elections_app.utils import auto_close_election
+from elections_app import metrics
+from elections_app.audit import record_audit
+from elections_app.backups import backup_prefix, write_import_backup
+from elections_app.deletion import delete_election, delete_import
+from elections_app.pagination import OptionalCursorPagination
+from elections_app.conditional import conditional_response, latest, make_etag, payload_etag, set_validators
+from elections_app.results_cache import get_cached_results
+from elections_app.tally import election_tally, tally_version
+from elections_app.utils import auto_close_elections, auto_close_on_read, election_window_open
+from elections_app.voter_import import UnsupportedFileError, detect_format, diff_voter_rows, preview_voter_file, read_voter_rows, run_import_job
+from elections_app.voter_search import search_backend, search_voters
 from elections_app.institution.serializers import (
     ElectionSerializer, CandidateSerializer, VoterSerializer,
     InstitutionSerializer, InstitutionRegisterSerializer,
@@ -58,7 +70,7 @@ def institution_register(request):
         institution.verification_sent_at = timezone.now()
         institution.save()
         # Do NOT create or return an auth token here; user should log in via the login endpoint.
-        AuditLog.objects.create(action='institution_registered', actor=user.username, detail={'institution_id': institution.id})
+        record_audit('institution_registered', actor=user.username, detail={'institution_id': institution.id})
         # Notify site admins / superusers about the new registration (do not block on errors)
         try:
             recipients = []
@@ -132,6 +144,13 @@ def institution_login(request):
 
 
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def service_metrics(request):
+    """Per-process operational counters (live results connections, pushes, caches) for staff users."""
+    return Response(metrics.snapshot(), status=status.HTTP_200_OK)
+
+
 # SMS verification endpoints removed (Option A): endpoints and frontend wrappers deleted, model retained.
 
 
@@ -146,68 +165,71 @@ class InstitutionViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get', 'patch'])
     def my_institution(self, request):
-        # Return or update institution info and basic import statistics.
+        # Return or update institution info.
         institution = get_object_or_404(Institution, user=request.user)
+        # The serializer reads the user through the institution: reuse the authenticated one
+        institution.user = request.user
+
+        if request.method == 'GET':
+            # Polled by the dashboards: validated on the rows already loaded,
+            # so a 304 costs no further query (and GET never writes)
+            user = request.user
+            etag = make_etag('institution', institution.id, institution.name, institution.description,
+                             institution.is_verified, user.id, user.username, user.email)
+            not_modified = conditional_response(request, etag)
+            if not_modified is not None:
+                return not_modified
+            return set_validators(Response(InstitutionSerializer(institution).data, status=status.HTTP_200_OK), etag)
+
         # Initialize import-related counters in case none exist
         created = 0
         updated = 0
         errors = []
 
-        if request.method == 'PATCH':
-            # Allow updating institution name/description and the related user email/password
-            data = request.data or {}
-            user = request.user
-            changed = False
-
-            # Institution fields: accept either 'institution_name' or 'name'
-            inst_name = data.get('institution_name') or data.get('name')
-            if inst_name is not None and inst_name != institution.name:
-                institution.name = inst_name
-                changed = True
-
-            inst_desc = data.get('description') or data.get('institution_description')
-            if inst_desc is not None and inst_desc != getattr(institution, 'description', None):
-                institution.description = inst_desc
-                changed = True
-
-            # Update user email if provided
-            email = data.get('email')
-            if email and email != getattr(user, 'email', None):
-                user.email = email
+        # Allow updating institution name/description and the related user email/password
+        data = request.data or {}
+        user = request.user
+        changed = False
+
+        # Institution fields: accept either 'institution_name' or 'name'
+        inst_name = data.get('institution_name') or data.get('name')
+        if inst_name is not None and inst_name != institution.name:
+            institution.name = inst_name
+            changed = True
+
+        inst_desc = data.get('description') or data.get('institution_description')
+        if inst_desc is not None and inst_desc != getattr(institution, 'description', None):
+            institution.description = inst_desc
+            changed = True
+
+        # Update user email if provided
+        email = data.get('email')
+        if email and email != getattr(user, 'email', None):
+            user.email = email
+            user.save()
+            changed = True
+
+        # Update user password if provided
+        password = data.get('password')
+        if password:
+            try:
+                user.set_password(password)
                 user.save()
                 changed = True
+            except Exception as e:
+                errors.append(str(e))
 
-            # Update user password if provided
-            password = data.get('password')
-            if password:
-                try:
-                    user.set_password(password)
-                    user.save()
-                    changed = True
-                except Exception as e:
-                    errors.append(str(e))
-
-            if changed:
-                try:
-                    institution.save()
-                    AuditLog.objects.create(action='institution_updated', actor=user.username, detail={'institution_id': institution.id})
-                except Exception as e:
-                    errors.append(str(e))
+        if changed:
+            try:
+                institution.save()
+                record_audit('institution_updated', actor=user.username, detail={'institution_id': institution.id})
+            except Exception as e:
+                errors.append(str(e))
         total_rows = Voter.objects.filter(institution=institution).count()
 
-        try:
-            AuditLog.objects.create(
-                action='voters_imported',
-                actor=request.user.username,
-                detail={'institution_id': institution.id, 'created': created, 'updated': updated, 'total_rows': total_rows},
-            )
-        except Exception:
-            pass
-
-        # For backward compatibility the endpoint returns the institution object
-        # as the top-level JSON body (the frontend expects `inst.data` to be the
-        # institution). Keep import stats available under `last_import` in the
-        # institution payload if the frontend wants to read them later.
+        # For backward compatibility the PATCH response is the institution object
+        # as the top-level JSON body, with update errors and the voter count under
+        # `last_import` (import statistics themselves come from voters_summary).
         inst_data = InstitutionSerializer(institution).data
         inst_data['last_import'] = {'created': created, 'updated': updated, 'errors': errors, 'total_rows': total_rows}
         return Response(inst_data, status=status.HTTP_200_OK)
@@ -216,6 +238,11 @@ class InstitutionViewSet(viewsets.ModelViewSet):
     def list_imports(self, request, pk=None):
         institution = get_object_or_404(Institution, id=pk, user=request.user)
         files = VoterImportFile.objects.filter(institution=institution).order_by('-uploaded_at')
+        paginator = OptionalCursorPagination()
+        page = paginator.paginate_queryset(files, request, view=self)
+        if page is not None:
+            serializer = VoterImportFileSerializer(page, many=True, context={'request': request})
+            return Response({'imports': serializer.data, 'next': paginator.get_next_link(), 'previous': paginator.get_previous_link()}, status=status.HTTP_200_OK)
         serializer = VoterImportFileSerializer(files, many=True, context={'request': request})
         return Response({'imports': serializer.data}, status=status.HTTP_200_OK)
 
@@ -223,7 +250,8 @@ class InstitutionViewSet(viewsets.ModelViewSet):
     def import_voters(self, request, pk=None):
         """Upload and import voters CSV/XLSX for the institution.
 
-        Supports a `?preview=true` query parameter to parse the file but not persist changes.
+        Supports a `?preview=true` query parameter to parse the file but not persist changes,
+        and `?preview=diff` to compare it with the current voters (see `diff_voter_rows`).
         """
         institution = get_object_or_404(Institution, id=pk, user=request.user)
 
@@ -232,94 +260,64 @@ class InstitutionViewSet(viewsets.ModelViewSet):
             return Response({'detail': 'file required.'}, status=status.HTTP_400_BAD_REQUEST)
 
         is_preview = request.query_params.get('preview') in ('1', 'true', 'True')
+        is_diff = request.query_params.get('preview') == 'diff'
 
-        # Read bytes once
-        raw = None
         try:
-            raw = f.read()
-        except Exception:
-            return Response({'detail': 'Could not read uploaded file.'}, status=status.HTTP_400_BAD_REQUEST)
+            detect_format(f)
+        except UnsupportedFileError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Try UTF-8 with BOM then fallback to latin-1
-        text = None
-        for enc in ('utf-8-sig', 'utf-8', 'latin-1'):
+        if is_diff:
             try:
-                text = raw.decode(enc)
-                break
-            except Exception:
-                text = None
-        if text is None:
-            return Response({'detail': 'Could not decode file. Use UTF-8 or Latin-1 encoded CSV.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        import csv
-        from io import StringIO
-
-        sio = StringIO(text)
-        reader = csv.DictReader(sio)
-
-        total_rows = 0
-        eligible_ok = 0
-        invalid = 0
-        created = 0
-        updated = 0
-
-        parsed_rows = []
-        for row in reader:
-            total_rows += 1
-            # Try common header names for identifier and name. We intentionally ignore
-            # any 'eligible' column and treat imported voters as eligible by default.
-            identifier = (row.get('identifier') or row.get('id') or row.get('email') or '').strip()
-            name = (row.get('name') or row.get('full_name') or row.get('nom') or '').strip()
-            # Force eligibility to True for all imported voters to simplify import requirements
-            eligible_val = True
-
-            if not identifier:
-                invalid += 1
-                continue
-
-            if eligible_val:
-                eligible_ok += 1
-
-            parsed_rows.append({'identifier': identifier, 'name': name, 'eligible': eligible_val})
+                diff = diff_voter_rows(institution, read_voter_rows(f))
+            except Exception as e:
+                return Response({'detail': f'Could not read uploaded file: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(diff, status=status.HTTP_200_OK)
 
-        # Preview mode: return counts only
+        # Preview mode: counts only (XLSX previews are sampled, see preview_voter_file)
         if is_preview:
-            return Response({'total_rows': total_rows, 'eligible': eligible_ok, 'invalid': invalid}, status=status.HTTP_200_OK)
+            try:
+                counts = preview_voter_file(f)
+            except Exception as e:
+                return Response({'detail': f'Could not read uploaded file: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(counts, status=status.HTTP_200_OK)
+
+        # Large files can be handed to `manage.py run_import_worker` instead of
+        # running inside the request (and its gunicorn timeout), when a worker runs.
+        # Both the setting and `?background=true` need one: nothing is queued forever.
+        background = getattr(settings, 'VOTER_IMPORT_WORKER', False) and (
+            getattr(settings, 'VOTER_IMPORT_BACKGROUND', False) or request.query_params.get('background') in ('1', 'true', 'True')
+        )
 
-        # Persist file record
+        # Persist file record (the upload is copied to storage in chunks)
         try:
-            from django.core.files.base import ContentFile
             imp = VoterImportFile.objects.create(
                 institution=institution,
-                file=ContentFile(raw, name=f.name),
+                file=f,
                 uploaded_by=request.user.username if getattr(request.user, 'username', None) else None,
-                total_rows=total_rows,
+                status='queued' if background else 'running',
+                heartbeat_at=None if background else timezone.now(),
             )
         except Exception as e:
             return Response({'detail': f'Error saving import file: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        # Create/update voters
-        try:
-            with transaction.atomic():
-                for r in parsed_rows:
-                    obj, created_flag = Voter.objects.update_or_create(
-                        institution=institution,
-                        identifier=r['identifier'],
-                        defaults={'name': r['name'], 'eligible': r['eligible'], 'import_file': imp},
-                    )
-                    if created_flag:
-                        created += 1
-                    else:
-                        updated += 1
-
-                imp.created = created
-                imp.updated = updated
-                imp.save()
-                AuditLog.objects.create(action='voters_imported', actor=request.user.username, detail={'institution_id': institution.id, 'created': created, 'updated': updated, 'total_rows': total_rows})
-        except Exception as e:
-            return Response({'detail': f'Error importing voters: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        if background:
+            return Response({'id': imp.id, 'status': imp.status}, status=status.HTTP_202_ACCEPTED)
+
+        # Create/update voters from the stored copy, one committed chunk at a time.
+        # Should the request be killed, the worker resumes the import later.
+        stats = run_import_job(imp)
+        if stats is None:
+            return Response({'detail': f'Error importing voters: {imp.error}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        return Response({'created': created, 'updated': updated, 'total_rows': total_rows}, status=status.HTTP_200_OK)
+        return Response({'created': stats.created, 'updated': stats.updated, 'total_rows': stats.total_rows}, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get'], url_path=r'imports/(?P<file_id>\d+)/progress')
+    def import_progress(self, request, pk=None, file_id=None):
+        """Status and progress of one import (polled while a background import runs)."""
+        institution = get_object_or_404(Institution, id=pk, user=request.user)
+        imp = get_object_or_404(VoterImportFile, id=file_id, institution=institution)
+        return Response(VoterImportFileSerializer(imp, context={'request': request}).data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'], url_path='imports/delete')
     def delete_import_file(self, request, pk=None):
@@ -338,14 +336,8 @@ class InstitutionViewSet(viewsets.ModelViewSet):
                 ids = list(voters_with_votes.values_list('identifier', flat=True)[:20])
                 return Response({'detail': 'Cannot delete import: some imported voters have recorded votes.', 'blocked_voters_sample': ids, 'blocked_count': voters_with_votes.count()}, status=status.HTTP_400_BAD_REQUEST)
 
-            try:
-                voters.delete()
-            except Exception:
-                pass
-
-            imp.file.delete(save=False)
-            imp.delete()
-            AuditLog.objects.create(action='import_file_deleted', actor=request.user.username, detail={'file_id': file_id, 'institution_id': institution.id})
+            delete_import(imp)
+            record_audit('import_file_deleted', actor=request.user.username, detail={'file_id': file_id, 'institution_id': institution.id})
             return Response({'detail': 'Deleted.'}, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({'detail': f'Error deleting file: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -361,64 +353,34 @@ class InstitutionViewSet(viewsets.ModelViewSet):
         except VoterImportFile.DoesNotExist:
             return Response({'detail': 'Import file not found.'}, status=status.HTTP_404_NOT_FOUND)
 
-        from io import StringIO
-        import csv as pycsv
-
         try:
-            voters = Voter.objects.filter(import_file=imp)
-
-            out = StringIO()
-            writer = pycsv.writer(out)
-            writer.writerow(['voter_identifier', 'voter_name', 'eligible', 'created_at', 'votes'])
-
-            import json
-            for v in voters:
-                votes = list(Vote.objects.filter(voter=v).values('id', 'ballot_id', 'candidate_id', 'timestamp'))
-                writer.writerow([v.identifier, v.name, v.eligible, v.created_at.isoformat(), json.dumps(votes, default=str)])
-
-            backup_csv = out.getvalue()
-
-            with transaction.atomic():
-                Vote.objects.filter(voter__in=voters).delete()
-                voters.delete()
-                imp.file.delete(save=False)
-                imp.delete()
-                AuditLog.objects.create(action='import_file_force_deleted', actor=request.user.username, detail={'file_id': file_id, 'institution_id': institution.id})
-
-            s3_url = None
-            if getattr(settings, 'AWS_S3_BUCKET_NAME', None):
-                try:
-                    import boto3  # type: ignore
-                    from botocore.exceptions import BotoCoreError, ClientError  # type: ignore
-                    s3 = boto3.client(
-                        's3',
-                        aws_access_key_id=getattr(settings, 'AWS_ACCESS_KEY_ID', None),
-                        aws_secret_access_key=getattr(settings, 'AWS_SECRET_ACCESS_KEY', None),
-                        region_name=getattr(settings, 'AWS_REGION', None),
-                    )
-                    import datetime
-                    key = f"backups/import_backup_{imp.id}_{datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.csv"
-                    s3.put_object(Bucket=settings.AWS_S3_BUCKET_NAME, Key=key, Body=backup_csv.encode('utf-8'), ContentType='text/csv')
-                    try:
-                        s3_url = s3.generate_presigned_url('get_object', Params={'Bucket': settings.AWS_S3_BUCKET_NAME, 'Key': key}, ExpiresIn=3600)
-                    except Exception:
-                        s3_url = f"https://{settings.AWS_S3_BUCKET_NAME}.s3.amazonaws.com/{key}"
-                except Exception:
-                    s3_url = None
-
-            if s3_url:
-                return Response({'detail': 'Deleted.', 'backup_url': s3_url}, status=status.HTTP_200_OK)
-            return Response({'detail': 'Deleted.', 'backup': backup_csv}, status=status.HTTP_200_OK)
+            # Backup first (streamed to storage), then delete in bounded chunks
+            backup = write_import_backup(imp)
+            # Also rebuilds the affected tallies and drops the "already voted" indexes
+            deleted = delete_import(imp)
+            record_audit('import_file_force_deleted', actor=request.user.username, detail={'file_id': file_id, 'institution_id': institution.id, 'backup': backup['name'], 'votes_deleted': deleted['votes']})
         except Exception as e:
             return Response({'detail': f'Error during force delete: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+        # backup_url: presigned S3 link; otherwise fetch backup_name from imports/backup
+        return Response({'detail': 'Deleted.', 'backup_name': backup['name'], 'backup_url': backup['url']}, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get'], url_path='imports/backup')
+    def download_backup(self, request, pk=None):
+        """Download a backup (`?name=`) written by force_delete_import for this institution."""
+        institution = get_object_or_404(Institution, id=pk, user=request.user)
+        name = request.query_params.get('name') or ''
+        if not name.startswith(backup_prefix(institution.id)) or '..' in name or not default_storage.exists(name):
+            return Response({'detail': 'Backup not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(default_storage.open(name, 'rb'), as_attachment=True, filename=name.rsplit('/', 1)[-1], content_type='application/gzip')
+
     @action(detail=False, methods=['get'])
     def voters_summary(self, request):
         institution = get_object_or_404(Institution, user=request.user)
         total_voters = Voter.objects.filter(institution=institution).count()
         eligible_voters = Voter.objects.filter(institution=institution, eligible=True).count()
 
-        last_import = AuditLog.objects.filter(action='voters_imported', actor=request.user.username, detail__institution_id=institution.id).order_by('-timestamp').first()
+        last_import = AuditLog.objects.filter(action='voters_imported', actor=request.user.username, institution_id=institution.id).order_by('-timestamp').first()
         last_import_detail = None
         if last_import:
             last_import_detail = {
@@ -434,23 +396,21 @@ class ElectionViewSet(viewsets.ModelViewSet):
     queryset = Election.objects.all()
     serializer_class = ElectionSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = OptionalCursorPagination
 
     def get_queryset(self):
         # If authenticated institution user, return their elections.
         if self.request.user and getattr(self.request.user, 'is_authenticated', False):
             try:
                 institution = get_object_or_404(Institution, user=self.request.user)
-                qs = Election.objects.filter(institution=institution)
+                qs = self._for_serializer(Election.objects.filter(institution=institution))
                 # Ensure any expired elections are marked closed before returning to the UI
                 try:
-                    for e in qs:
-                        try:
-                            auto_close_election(e)
-                        except Exception:
-                            # don't let auto-close failures block listing
-                            continue
+                    if auto_close_on_read():
+                        auto_close_elections(qs)
                 except Exception:
-                    pass
+                    # don't let auto-close failures block listing
+                    logging.getLogger(__name__).exception('Bulk auto-close failed for institution %s', institution.id)
                 return qs
             except Exception:
                 return Election.objects.none()
@@ -458,10 +418,30 @@ class ElectionViewSet(viewsets.ModelViewSet):
         # Allow anonymous listing by passing ?institution=<id>
         institution_id = self.request.query_params.get('institution') or self.request.query_params.get('institution_id')
         if institution_id:
-            return Election.objects.filter(institution__id=institution_id)
+            return self._for_serializer(Election.objects.filter(institution__id=institution_id))
 
         return Election.objects.none()
 
+    def _for_serializer(self, qs):
+        # Reads served by ElectionSerializer get their counts and candidates eager-loaded
+        if self.action in ('list', 'retrieve'):
+            return ElectionSerializer.prepare_queryset(qs)
+        return qs
+
+    def list(self, request, *args, **kwargs):
+        # Polled by the dashboards: answer 304 from a version of the listed elections
+        # (their stamps, open state and tallies) before running the serializer.
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = list(queryset.order_by('id').values_list('id', 'updated_at', 'start', 'end'))
+        version = tally_version([r[0] for r in rows])
+        opened = [election_window_open(start, end) for _, _, start, end in rows]
+        etag = make_etag('elections', [r[:2] for r in rows], opened, version, request.get_full_path())
+        last_modified = latest(*(r[1] for r in rows), version[3])
+        not_modified = conditional_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+        return set_validators(super().list(request, *args, **kwargs), etag, last_modified)
+
     def perform_create(self, serializer):
         institution = get_object_or_404(Institution, user=self.request.user)
         # Verification requirement removed: allow institutions to create elections immediately.
@@ -527,29 +507,35 @@ class ElectionViewSet(viewsets.ModelViewSet):
         except Exception as e:
             logger.exception('Error logging created election state: %s', e)
 
-        AuditLog.objects.create(
-            action='election_created',
+        record_audit(
+            'election_created',
             actor=self.request.user.username,
             detail={'election_title': serializer.instance.title}
         )
         # Note: automatic ballot creation removed — institutions should create ballots explicitly.
 
+    def perform_destroy(self, instance):
+        # Detach votes and drop candidates in chunks instead of one collector-driven transaction
+        delete_election(instance)
+
     def get_object(self):
         # Ensure fetched election is auto-closed if its end time has been reached.
         obj = super().get_object()
         try:
-            auto_close_election(obj)
+            if obj.end and not obj.closed and auto_close_on_read() and auto_close_elections(Election.objects.filter(id=obj.id)):
+                obj.closed = True
         except Exception:
             pass
         return obj
 
-    def _get_participation_rate_for_election(self, election):
+    def _get_participation_rate_for_election(self, election, total_votes=None):
         """Return participation rate (%) for the whole election based on eligible voters of the institution."""
         institution = election.institution
         total_eligible = institution.voters.filter(eligible=True).count()
         if total_eligible == 0:
             return 0
-        total_votes = Vote.objects.filter(election=election).count()
+        if total_votes is None:
+            total_votes = Vote.objects.filter(election=election).count()
         return round((total_votes / total_eligible) * 100, 2)
 
     @action(detail=True, methods=['post'])
@@ -647,13 +633,8 @@ class ElectionViewSet(viewsets.ModelViewSet):
                             continue
                 else:
                     # If no qualified ids provided, default to top 2 by votes
-                    total_votes = Vote.objects.filter(election=election).count()
-                    counts = []
-                    for cand in election.candidates.all():
-                        vcount = Vote.objects.filter(election=election, candidate=cand).count()
-                        counts.append((cand, vcount))
-                    counts.sort(key=lambda x: x[1], reverse=True)
-                    top = [c for c, _ in counts][:2]
+                    tally = election_tally(election.id)
+                    top = sorted(election.candidates.all(), key=lambda c: tally.votes_for(c.id), reverse=True)[:2]
                     for c in top:
                         Candidate.objects.create(
                             election=new_election,
@@ -663,7 +644,7 @@ class ElectionViewSet(viewsets.ModelViewSet):
                             photo=c.photo,
                         )
 
-                AuditLog.objects.create(action='advance_to_round2', actor=request.user.username, detail={'election_id': election.id, 'new_election_id': new_election.id})
+                record_audit('advance_to_round2', actor=request.user.username, detail={'election_id': election.id, 'new_election_id': new_election.id})
                 return Response({'status': 'created', 'new_election_id': new_election.id}, status=status.HTTP_201_CREATED)
             except Exception as e:
                 import logging, traceback
@@ -681,7 +662,7 @@ class ElectionViewSet(viewsets.ModelViewSet):
 
         election.current_round = 2
         election.save()
-        AuditLog.objects.create(action='advance_to_round2', actor=request.user.username, detail={'election_id': election.id})
+        record_audit('advance_to_round2', actor=request.user.username, detail={'election_id': election.id})
         resp = {'status': 'advanced', 'current_round': election.current_round}
         return Response(resp, status=status.HTTP_200_OK)
 
@@ -697,7 +678,7 @@ class ElectionViewSet(viewsets.ModelViewSet):
             return Response({'detail': 'Candidate not found for this election.'}, status=status.HTTP_404_NOT_FOUND)
         election.finalized_winner = candidate
         election.save()
-        AuditLog.objects.create(action='finalize_winner', actor=request.user.username, detail={'election_id': election.id, 'winner_id': candidate.id})
+        record_audit('finalize_winner', actor=request.user.username, detail={'election_id': election.id, 'winner_id': candidate.id})
         return Response({'status': 'finalized', 'winner': CandidateSerializer(candidate).data}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'])
@@ -715,7 +696,7 @@ class ElectionViewSet(viewsets.ModelViewSet):
             opened.append(election.id)
 
         # For frontend compatibility return both 'opened' and 'opened_ballots'
-        AuditLog.objects.create(action='election_opened', actor=request.user.username, detail={'election_id': election.id, 'opened': opened})
+        record_audit('election_opened', actor=request.user.username, detail={'election_id': election.id, 'opened': opened})
         return Response({'status': 'opened', 'opened': opened, 'opened_ballots': opened}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'])
@@ -730,31 +711,40 @@ class ElectionViewSet(viewsets.ModelViewSet):
 
         # Return closed ids as a list and include 'closed_ballots' for compatibility
         closed_ids = [election.id]
-        AuditLog.objects.create(action='election_closed', actor=request.user.username, detail={'election_id': election.id, 'closed': closed_ids})
+        # durable: auto-close checks for an existing election_closed entry
+        record_audit('election_closed', actor=request.user.username, detail={'election_id': election.id, 'closed': closed_ids}, durable=True)
         return Response({'status': 'closed', 'closed': closed_ids, 'closed_ballots': closed_ids}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['get'])
     def results(self, request, pk=None):
         """Aggregate results for the whole election (across ballots)."""
         election = self.get_object()
+        payload, etag = get_cached_results(election.id, lambda: self._compute_results(election))
+        not_modified = conditional_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+        return set_validators(Response(payload, status=status.HTTP_200_OK), etag)
+
+    def _compute_results(self, election):
+        """Build the `results` payload (see `elections_app.results_cache` for how it is cached)."""
         candidates = election.candidates.all()
-        # total votes across all ballots for this election
-        total_votes = Vote.objects.filter(election=election).count()
+        tally = election_tally(election.id)
+        total_votes = tally.total
         counts = []
         for candidate in candidates:
-            vcount = Vote.objects.filter(election=election, candidate=candidate).count()
+            vcount = tally.votes_for(candidate.id)
             percent = round((vcount / total_votes) * 100, 2) if total_votes > 0 else 0.0
             counts.append({'candidate_id': candidate.id, 'candidate_name': candidate.name, 'votes': vcount, 'percent': percent})
 
         # add 'Vote nul' placeholder
-        nul_count = Vote.objects.filter(election=election, candidate__isnull=True).count()
+        nul_count = tally.null_votes
         counts.append({'candidate_id': None, 'candidate_name': 'Vote nul', 'votes': nul_count, 'percent': round((nul_count / total_votes) * 100, 2) if total_votes > 0 else 0.0})
 
         response = {
             'election_id': election.id,
             'election_title': election.title,
             'total_votes': total_votes,
-            'participation_rate': self._get_participation_rate_for_election(election),
+            'participation_rate': self._get_participation_rate_for_election(election, total_votes),
             'candidates': counts,
         }
 
@@ -766,7 +756,7 @@ class ElectionViewSet(viewsets.ModelViewSet):
                 response['winner'] = sorted_c[0]
             else:
                 response['status'] = 'no_votes'
-            return Response(response, status=status.HTTP_200_OK)
+            return response
 
         # Two-round logic (aggregate)
         if election.scrutin_type == 'majoritaire_2tours':
@@ -776,7 +766,7 @@ class ElectionViewSet(viewsets.ModelViewSet):
             if winners:
                 response['status'] = 'first_round_elected'
                 response['winner'] = winners[0]
-                return Response(response, status=status.HTTP_200_OK)
+                return response
 
             qualifiers = [c for c in counts if c['candidate_id'] is not None and c['percent'] >= advance]
             if len(qualifiers) < 2:
@@ -788,7 +778,9 @@ class ElectionViewSet(viewsets.ModelViewSet):
             response['election_current_round'] = election.current_round
             response['election_majority_threshold'] = election.majority_threshold
             response['election_advance_threshold'] = election.advance_threshold
-            return Response(response, status=status.HTTP_200_OK)
+            return response
+
+        return response
 
     @action(detail=True, methods=['get'], url_path='timeline')
     def timeline(self, request, pk=None):
@@ -802,6 +794,12 @@ class ElectionViewSet(viewsets.ModelViewSet):
         Response: { timeline: [{ timestamp: ISO, total: int, by_candidate: [{candidate_id, votes}, ...] }, ...] }
         """
         election = self.get_object()
+        version = tally_version([election.id])
+        etag = make_etag('timeline', election.id, election.updated_at, version, request.get_full_path())
+        last_modified = latest(election.updated_at, version[3])
+        not_modified = conditional_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
         unit = (request.query_params.get('unit') or 'minute').lower()
         start_raw = request.query_params.get('start')
         end_raw = request.query_params.get('end')
@@ -851,7 +849,7 @@ class ElectionViewSet(viewsets.ModelViewSet):
         # Ensure timeline is returned sorted by timestamp
         out = [timeline[k] for k in sorted(timeline.keys())]
 
-        return Response({'timeline': out}, status=status.HTTP_200_OK)
+        return set_validators(Response({'timeline': out}, status=status.HTTP_200_OK), etag, last_modified)
 
 
 class CandidateViewSet(viewsets.ModelViewSet):
@@ -862,29 +860,63 @@ class CandidateViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         institution = get_object_or_404(Institution, user=self.request.user)
-        return Candidate.objects.filter(election__institution=institution)
+        return CandidateSerializer.prepare_queryset(Candidate.objects.filter(election__institution=institution))
 
     def perform_create(self, serializer):
         election_id = self.request.data.get('election')
         election = get_object_or_404(Election, id=election_id)
         serializer.save(election=election)
-        AuditLog.objects.create(action='candidate_added', actor=self.request.user.username, detail={'candidate_name': serializer.instance.name})
+        record_audit('candidate_added', actor=self.request.user.username, detail={'candidate_name': serializer.instance.name})
 
 
 class VoterViewSet(viewsets.ModelViewSet):
     queryset = Voter.objects.all()
     serializer_class = VoterSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalCursorPagination
+    pagination_ordering = 'id'
 
     def get_queryset(self):
         institution = get_object_or_404(Institution, user=self.request.user)
         return Voter.objects.filter(institution=institution)
 
+    def filter_queryset(self, queryset):
+        """Listing filters: `eligible`, `import_file` and `identifier_prefix` (index range, case-sensitive)."""
+        queryset = super().filter_queryset(queryset)
+        params = self.request.query_params
+        eligible = params.get('eligible')
+        if eligible is not None:
+            queryset = queryset.filter(eligible=eligible.lower() in ('1', 'true', 'yes'))
+        import_file = params.get('import_file')
+        if import_file:
+            if import_file == 'none':
+                queryset = queryset.filter(import_file__isnull=True)
+            elif import_file.isdigit():
+                queryset = queryset.filter(import_file_id=int(import_file))
+            else:
+                raise serializers.ValidationError({'import_file': 'Expected an import id or "none".'})
+        prefix = params.get('identifier_prefix')
+        if prefix:
+            # A range instead of LIKE so the (institution, identifier) index is used
+            queryset = queryset.filter(identifier__gte=prefix, identifier__lt=prefix + '\U0010ffff')
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Search the institution's voters by identifier or name: `?q=` (substring), `fuzzy=true`, `limit` (max 100)."""
+        institution = get_object_or_404(Institution, user=request.user)
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'detail': 'Missing search query (q).'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({'detail': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        fuzzy = request.query_params.get('fuzzy', 'false').lower() in ('1', 'true', 'yes')
+        voters = search_voters(query, institution_id=institution.id, fuzzy=fuzzy, limit=limit)
+        return Response({'results': self.get_serializer(voters, many=True).data, 'backend': search_backend()})
+
     def perform_create(self, serializer):
         institution = get_object_or_404(Institution, user=self.request.user)
         serializer.save(institution=institution)
-        AuditLog.objects.create(action='voter_added', actor=self.request.user.username, detail={'voter_id': serializer.instance.identifier})
-    def perform_create(self, serializer):
-        institution = get_object_or_404(Institution, user=self.request.user)
-        serializer.save(institution=institution)
-        AuditLog.objects.create(action='voter_added', actor=self.request.user.username, detail={'voter_id': serializer.instance.identifier})
+        record_audit('voter_added', actor=self.request.user.username, detail={'voter_id': serializer.instance.identifier})
@@ -0,0 +1,112 @@
+"""Live results push: tally deltas broadcast to per-election channel groups.
+
+`record_vote` and the group-commit writer call `publish_vote` from
+`transaction.on_commit`. Deltas are coalesced per election and flushed by a
+background thread at most `settings.LIVE_RESULTS_MAX_RATE` times per second,
+so a burst of votes costs each subscriber one message per interval. Messages
+go to the channel group `election-results-<id>`, served by
+`elections_app.consumers.ElectionResultsConsumer`.
+
+Push is active when `settings.LIVE_RESULTS_ENABLED` is set and `channels` is
+installed. With the default in-memory channel layer only subscribers of the
+same process (the ASGI server) are reached; set `CHANNEL_REDIS_URL` to share a
+Redis layer between processes.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+from elections_app import metrics
+
+try:
+    from asgiref.sync import async_to_sync
+    from channels.layers import get_channel_layer
+except ImportError:  # channels not installed: live push disabled
+    get_channel_layer = None
+
+logger = logging.getLogger(__name__)
+
+
+def group_name(election_id):
+    return f'election-results-{int(election_id)}'
+
+
+def live_enabled():
+    return get_channel_layer is not None and getattr(settings, 'LIVE_RESULTS_ENABLED', False)
+
+
+class _Coalescer:
+    """Accumulates per-election, per-candidate vote deltas and flushes them on a fixed interval."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._wakeup = threading.Event()
+        self._thread = None
+        # Event loop of the ASGI server, set when a subscriber connects in this process
+        self.loop = None
+
+    def add(self, election_id, candidate_id, votes=1):
+        with self._lock:
+            self._pending.setdefault(election_id, Counter())[candidate_id] += votes
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='live-results', daemon=True)
+                self._thread.start()
+        metrics.incr('live_deltas_queued', votes)
+        self._wakeup.set()
+
+    def _take(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._wakeup.clear()
+        return pending
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            started = time.monotonic()
+            pending = self._take()
+            for election_id, deltas in pending.items():
+                try:
+                    self._send(election_id, deltas)
+                except Exception as e:
+                    logger.warning('Live results push failed for election %s: %s', election_id, e)
+            interval = 1.0 / max(getattr(settings, 'LIVE_RESULTS_MAX_RATE', 2), 0.1)
+            time.sleep(max(interval - (time.monotonic() - started), 0))
+
+    def _send(self, election_id, deltas):
+        layer = get_channel_layer()
+        if layer is None:
+            return
+        message = {
+            'type': 'results.delta',
+            'election_id': election_id,
+            'deltas': [{'candidate_id': cid, 'votes': n} for cid, n in deltas.items()],
+        }
+        loop = self.loop
+        if loop is not None and loop.is_running():
+            # In-memory layers must be driven from the loop their consumers run on
+            future = asyncio.run_coroutine_threadsafe(layer.group_send(group_name(election_id), message), loop)
+            future.result(timeout=5)
+        else:
+            async_to_sync(layer.group_send)(group_name(election_id), message)
+        metrics.incr('live_batches_published')
+
+
+_coalescer = _Coalescer()
+
+
+def publish_vote(election_id, candidate_id, votes=1):
+    """Queue a committed vote for the next live-results flush (no-op when push is disabled)."""
+    if election_id is not None and live_enabled():
+        _coalescer.add(int(election_id), candidate_id, votes)
+
+
+def attach_loop(loop):
+    """Remember the ASGI event loop so flushes reach in-process subscribers."""
+    _coalescer.loop = loop
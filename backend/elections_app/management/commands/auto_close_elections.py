@@ -0,0 +1,134 @@
+import heapq
+import logging
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from elections_app.models import Election
+from elections_app.utils import as_aware, auto_close_elections
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait after a failed iteration (database locked, connection lost)
+ERROR_BACKOFF = 5.0
+
+
+class EndTimeSchedule:
+    """Min-heap of upcoming election end times.
+
+    `ends` holds the current end of every scheduled election; heap entries
+    that no longer match it (end moved, election closed) are skipped when
+    popped instead of being removed eagerly.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.ends = {}
+
+    def update(self, election_id, end, closed):
+        end = as_aware(end)
+        if closed or end is None:
+            self.ends.pop(election_id, None)
+            return
+        if self.ends.get(election_id) != end:
+            self.ends[election_id] = end
+            heapq.heappush(self.heap, (end, election_id))
+
+    def _drop_stale(self):
+        while self.heap and self.ends.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+
+    def next_end(self):
+        self._drop_stale()
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now):
+        """Remove and return the `(election_id, end)` pairs whose end is at or before `now`."""
+        due = []
+        while self.next_end() is not None and self.heap[0][0] <= now:
+            end, election_id = heapq.heappop(self.heap)
+            del self.ends[election_id]
+            due.append((election_id, end))
+        return due
+
+
+def close_due(schedule, now):
+    """Close the elections of `schedule` due at `now`; returns the ids closed.
+
+    When closing fails the popped elections go back on the schedule, so the
+    next attempt retries them, and the error is raised again.
+    """
+    due = schedule.pop_due(now)
+    if not due:
+        return []
+    try:
+        return auto_close_elections(Election.objects.filter(id__in=[election_id for election_id, _ in due]), now=now)
+    except Exception:
+        for election_id, end in due:
+            schedule.update(election_id, end, False)
+        raise
+
+
+class Command(BaseCommand):
+    help = (
+        "Close elections when their end time passes and write the 'election_closed' audit entry. "
+        "Runs as a scheduler that sleeps until the next end time; use --once for cron-style runs. "
+        "With the scheduler running, set ELECTION_AUTO_CLOSE_ON_READ=False so requests skip closing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Close every election already past its end and exit.')
+        parser.add_argument('--poll', type=float, default=30.0, help='Seconds between checks for new or rescheduled elections.')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            closed = auto_close_elections()
+            self.stdout.write(f"Closed {len(closed)} election(s).")
+            return
+
+        poll = max(options['poll'], 1.0)
+        schedule = EndTimeSchedule()
+        rows = Election.objects.filter(closed=False, end__isnull=False).values_list('id', 'end', 'closed')
+        for election_id, end, closed in rows.iterator():
+            schedule.update(election_id, end, closed)
+        last_poll = timezone.now()
+        next_poll = time.monotonic() + poll
+        self.stdout.write(f"Scheduling {len(schedule.ends)} election(s); polling for changes every {poll:g}s.")
+
+        try:
+            while True:
+                try:
+                    now = timezone.now()
+                    closed = close_due(schedule, now)
+                    if closed:
+                        self.stdout.write(f"{now.isoformat()} closed election(s) {', '.join(str(i) for i in closed)}")
+
+                    if time.monotonic() >= next_poll:
+                        # Delta: elections created or edited since the last poll (updated_at is auto_now).
+                        # The one-second overlap covers writes committed while the previous poll ran.
+                        started = timezone.now()
+                        changed = Election.objects.filter(updated_at__gte=last_poll - timedelta(seconds=1))
+                        for election_id, end, closed in changed.values_list('id', 'end', 'closed'):
+                            schedule.update(election_id, end, closed)
+                        last_poll = started
+                        next_poll = time.monotonic() + poll
+                        close_old_connections()
+                except Exception:
+                    # A locked database or dropped connection must not stop the scheduler:
+                    # due elections are back on the schedule and the poll is retried
+                    logger.exception('Auto-close iteration failed; retrying in %gs', ERROR_BACKOFF)
+                    close_old_connections()
+                    time.sleep(ERROR_BACKOFF)
+                    continue
+
+                sleep_for = next_poll - time.monotonic()
+                next_end = schedule.next_end()
+                if next_end is not None:
+                    sleep_for = min(sleep_for, (next_end - timezone.now()).total_seconds())
+                if sleep_for > 0:
+                    time.sleep(sleep_for)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
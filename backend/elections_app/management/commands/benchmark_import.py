@@ -0,0 +1,75 @@
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from elections_app.models import Institution, Voter, VoterImportFile
+from elections_app.voter_import import IMPORT_CHUNK_SIZE, import_voter_rows, read_voter_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the voter import pipeline on a generated CSV: rows per second, queries and peak "
+        "Python memory (--memory) for a first import (inserts) and a re-import (updates). "
+        "Creates a throwaway institution and removes it afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000)
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+        parser.add_argument('--memory', action='store_true', help='Report peak Python memory (tracemalloc; slows the run down).')
+        parser.add_argument('--legacy', action='store_true', help='Also time the per-row update_or_create import on the same file.')
+
+    def handle(self, *args, **options):
+        n_rows = max(options['rows'], 1)
+        chunk_size = max(options['chunk_size'], 1)
+
+        tag = uuid.uuid4().hex[:8]
+        user = User.objects.create_user(username=f'bench-{tag}', password=uuid.uuid4().hex)
+        institution = Institution.objects.create(user=user, name=f'Benchmark {tag}')
+        try:
+            with tempfile.TemporaryFile() as csv_file:
+                csv_file.write(b'identifier,name\n')
+                for i in range(n_rows):
+                    csv_file.write(f'bench-{tag}-{i},Voter {i}\n'.encode())
+
+                self.stdout.write(f'rows:              {n_rows} (chunks of {chunk_size})')
+                for label in ('insert', 'update'):
+                    imp = VoterImportFile.objects.create(institution=institution, file=f'voter_imports/bench-{tag}.csv')
+                    csv_file.seek(0)
+                    if options['memory']:
+                        tracemalloc.start()
+                    t0 = time.perf_counter()
+                    with CaptureQueriesContext(connection) as ctx:
+                        stats = import_voter_rows(institution, imp, read_voter_rows(csv_file), chunk_size=chunk_size)
+                    elapsed = time.perf_counter() - t0
+                    memory = ''
+                    if options['memory']:
+                        memory = f', peak {tracemalloc.get_traced_memory()[1] / 1e6:.1f} MB'
+                        tracemalloc.stop()
+                    self.stdout.write(
+                        f'{label + ":":<19}{n_rows / elapsed:.0f} rows/s ({elapsed:.2f}s, {len(ctx.captured_queries)} queries{memory}, '
+                        f'created {stats.created}, updated {stats.updated})'
+                    )
+
+                if options['legacy']:
+                    csv_file.seek(0)
+                    rows = [row for row in read_voter_rows(csv_file) if row is not None]
+                    t0 = time.perf_counter()
+                    with transaction.atomic():
+                        for identifier, name in rows:
+                            Voter.objects.update_or_create(
+                                institution=institution,
+                                identifier=identifier,
+                                defaults={'name': name, 'eligible': True, 'import_file': imp},
+                            )
+                    elapsed = time.perf_counter() - t0
+                    self.stdout.write(f'{"legacy update:":<19}{n_rows / elapsed:.0f} rows/s ({elapsed:.2f}s, update_or_create per row)')
+        finally:
+            # Cascades to the voters and import records; the placeholder file names were never written
+            user.delete()
@@ -0,0 +1,122 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from elections_app.models import AuditLog, Candidate, Election, Institution, Voter
+from elections_app.voter.tickets import issue_ticket
+from elections_app.voter.views import VoteViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the cast_vote endpoint: queries per vote and votes per second. "
+        "Creates a throwaway institution/election/voters and removes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--voters', type=int, default=500, help='Number of votes to cast (one per voter).')
+        parser.add_argument('--candidates', type=int, default=5)
+        parser.add_argument('--sample', type=int, default=20, help='Votes used to count queries (not timed), cast after one warm-up vote per candidate.')
+        parser.add_argument('--concurrency', type=int, default=1, help='Threads casting the timed votes.')
+        parser.add_argument('--tickets', action='store_true', help='Send signed voter tickets instead of raw voter ids.')
+
+    def handle(self, *args, **options):
+        n_candidates = max(options['candidates'], 1)
+        # One untimed vote per candidate first: they pay the one-off costs (the
+        # election descriptor load, creating each candidate's tally row), so the
+        # counted sample measures the steady-state path.
+        warmup = n_candidates
+        n_voters = max(options['voters'], warmup + 1)
+        sample = min(max(options['sample'], 1), n_voters - warmup)
+        concurrency = max(options['concurrency'], 1)
+
+        tag = uuid.uuid4().hex[:8]
+        user = User.objects.create_user(username=f'bench-{tag}', password=uuid.uuid4().hex)
+        institution = Institution.objects.create(user=user, name=f'Benchmark {tag}')
+        now = timezone.now()
+        election = Election.objects.create(
+            institution=institution,
+            title=f'Benchmark {tag}',
+            start=now - timedelta(minutes=1),
+            end=now + timedelta(hours=1),
+        )
+        try:
+            Candidate.objects.bulk_create([
+                Candidate(election=election, name=f'Candidate {i}') for i in range(n_candidates)
+            ])
+            candidate_ids = list(Candidate.objects.filter(election=election).order_by('id').values_list('id', flat=True))
+            Voter.objects.bulk_create([
+                Voter(institution=institution, identifier=f'bench-{tag}-{i}') for i in range(n_voters)
+            ])
+            voter_ids = list(Voter.objects.filter(institution=institution).order_by('id').values_list('id', flat=True))
+
+            tickets = None
+            if options['tickets']:
+                tickets = [issue_ticket(vid, f'bench-{tag}-{i}', institution.id, True) for i, vid in enumerate(voter_ids)]
+
+            def payload(i):
+                data = {
+                    'election_id': election.id,
+                    'voter_id': voter_ids[i],
+                    'candidate_id': candidate_ids[i % len(candidate_ids)],
+                }
+                if tickets:
+                    data['ticket'] = tickets[i]
+                return data
+
+            run = self._runner(payload)
+
+            run(range(warmup), 1)
+            with CaptureQueriesContext(connection) as ctx:
+                run(range(warmup, warmup + sample), 1)
+            queries_per_vote = len(ctx.captured_queries) / sample
+
+            timed = n_voters - warmup - sample
+            elapsed = 0.0
+            if timed:
+                t0 = time.perf_counter()
+                run(range(warmup + sample, n_voters), concurrency)
+                elapsed = time.perf_counter() - t0
+
+            self.stdout.write(f'votes cast:        {n_voters} (concurrency {concurrency}, group commit {"on" if settings.VOTE_GROUP_COMMIT else "off"})')
+            note = ' (request thread only; batch writer not counted)' if settings.VOTE_GROUP_COMMIT else ''
+            self.stdout.write(f'queries per vote:  {queries_per_vote:.2f}{note}')
+            if timed:
+                self.stdout.write(f'votes per second:  {timed / elapsed:.1f} ({timed} timed votes in {elapsed:.2f}s)')
+        finally:
+            AuditLog.objects.filter(action='vote_cast', actor__startswith=f'bench-{tag}-').delete()
+            election.delete()
+            user.delete()
+
+    def _runner(self, payload):
+        """Cast votes through the DRF view, using a thread per concurrent request."""
+        factory = APIRequestFactory()
+        view = VoteViewSet.as_view({'post': 'cast_vote'})
+
+        def cast(i, threaded=False):
+            try:
+                response = view(factory.post('/api/votes/cast_vote/', payload(i), format='json'))
+            finally:
+                if threaded:
+                    close_old_connections()
+            if response.status_code != 201:
+                raise RuntimeError(f'cast_vote failed ({response.status_code}): {response.data}')
+
+        def run(indices, concurrency):
+            if concurrency > 1:
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    list(pool.map(lambda i: cast(i, threaded=True), indices))
+            else:
+                for i in indices:
+                    cast(i)
+        return run
+
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from elections_app.deletion import (
+    count_election_deletion,
+    count_import_deletion,
+    delete_election,
+    delete_import,
+)
+from elections_app.models import Election, VoterImportFile
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete a voter import (with its voters and their votes) or an election (detaching its votes) "
+        "in primary-key chunks, pausing between chunks. --dry-run only counts what would go."
+    )
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--import', dest='import_id', type=int, help='VoterImportFile id.')
+        target.add_argument('--election', dest='election_id', type=int, help='Election id.')
+        parser.add_argument('--dry-run', action='store_true', help='Count the rows affected without deleting anything.')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Rows per transaction (default: DELETE_CHUNK_SIZE).')
+        parser.add_argument('--pause-ms', type=float, default=None, help='Pause between chunks (default: DELETE_CHUNK_PAUSE_MS).')
+
+    def handle(self, *args, **options):
+        if options['import_id'] is not None:
+            target = VoterImportFile.objects.filter(id=options['import_id']).first()
+            label, count, delete = f"import {options['import_id']}", count_import_deletion, delete_import
+        else:
+            target = Election.objects.filter(id=options['election_id']).first()
+            label, count, delete = f"election {options['election_id']}", count_election_deletion, delete_election
+        if target is None:
+            raise CommandError(f'{label.capitalize()} not found.')
+
+        if options['dry_run']:
+            counts = count(target)
+            self.stdout.write(f"Would delete {label}: " + ', '.join(f'{k} {v}' for k, v in counts.items()))
+            return
+
+        def progress(step, done, total):
+            self.stdout.write(f"  {step}: {done}/{total}")
+
+        pause = options['pause_ms'] / 1000.0 if options['pause_ms'] is not None else None
+        counts = delete(target, chunk_size=options['chunk_size'], pause=pause, progress=progress)
+        self.stdout.write(f"Deleted {label}: " + ', '.join(f'{k} {v}' for k, v in counts.items()))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from elections_app.models import Election
+from elections_app.tally import rebuild_election_tally, verify_election_tally
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the materialized ElectionTally rows from raw votes, or with --verify "
+        "only report elections whose tally differs from the Vote table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--election', type=int, action='append', help='Election id (repeatable). Defaults to all elections.')
+        parser.add_argument('--verify', action='store_true', help='Compare tallies with raw votes without rewriting them.')
+
+    def handle(self, *args, **options):
+        election_ids = options['election'] or list(Election.objects.order_by('id').values_list('id', flat=True))
+        missing = set(election_ids) - set(Election.objects.filter(id__in=election_ids).values_list('id', flat=True))
+        if missing:
+            raise CommandError(f"Unknown election id(s): {', '.join(str(i) for i in sorted(missing))}")
+
+        mismatched = 0
+        for election_id in election_ids:
+            if options['verify']:
+                diff = verify_election_tally(election_id)
+                if diff:
+                    mismatched += 1
+                    for candidate_id, (tally, raw) in sorted(diff.items(), key=lambda kv: (kv[0] is None, kv[0] or 0)):
+                        label = candidate_id if candidate_id is not None else 'null'
+                        self.stdout.write(self.style.WARNING(f"election {election_id} candidate {label}: tally={tally} votes={raw}"))
+            else:
+                rebuild_election_tally(election_id)
+
+        if options['verify']:
+            if mismatched:
+                raise CommandError(f"{mismatched} of {len(election_ids)} election tally(ies) differ from raw votes.")
+            self.stdout.write(self.style.SUCCESS(f"{len(election_ids)} election tally(ies) match raw votes."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(election_ids)} election tally(ies)."))
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from elections_app.models import VoterImportFile
+from elections_app.voter_import import IMPORT_CHUNK_SIZE, IMPORT_STALE_SECONDS, claim_import_job, run_import_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Process queued voter imports (import_voters?background=true) in committed chunks. "
+        "Imports left running by a crashed worker or request are resumed once their heartbeat is "
+        "older than --stale-after seconds. Several workers may run side by side."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process the jobs waiting now and exit.')
+        parser.add_argument('--poll', type=float, default=2.0, help='Seconds between checks for new jobs.')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+        parser.add_argument('--stale-after', type=float, default=IMPORT_STALE_SECONDS)
+
+    def handle(self, *args, **options):
+        poll = max(options['poll'], 0.1)
+        job = None
+        try:
+            while True:
+                job = claim_import_job(stale_after=options['stale_after'])
+                if job is None:
+                    if options['once']:
+                        break
+                    close_old_connections()
+                    time.sleep(poll)
+                    continue
+                resumed = f' from row {job.rows_processed}' if job.rows_processed else ''
+                self.stdout.write(f"Import {job.id} ({job.institution.name}){resumed}...")
+                stats = run_import_job(job, chunk_size=options['chunk_size'], count_total=True)
+                if stats is None and job.status == 'failed':
+                    self.stdout.write(f"Import {job.id} failed: {job.error}")
+                elif stats is None:
+                    self.stdout.write(f"Import {job.id} cancelled (record deleted).")
+                else:
+                    self.stdout.write(f"Import {job.id} done: {stats.total_rows} rows, {stats.created} created, {stats.updated} updated.")
+                job = None
+                close_old_connections()
+        except KeyboardInterrupt:
+            if job is not None:
+                # Hand the job back right away instead of waiting for it to go stale
+                VoterImportFile.objects.filter(id=job.id, status='running').update(status='queued')
+            self.stdout.write("Stopped.")
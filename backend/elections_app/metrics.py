@@ -0,0 +1,33 @@
+"""Per-process operational counters, exposed to staff by `GET /api/metrics/`.
+
+Counters only go up (`incr`); gauges move both ways (`gauge_add`, `gauge_set`) and report
+the current value, e.g. open live-results connections. Values are per worker
+process and reset on restart.
+"""
+
+import threading
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+
+
+def incr(name, amount=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def gauge_add(name, amount):
+    with _lock:
+        _gauges[name] = _gauges.get(name, 0) + amount
+
+
+def gauge_set(name, value):
+    with _lock:
+        _gauges[name] = value
+
+
+def snapshot():
+    """Return `{'counters': {...}, 'gauges': {...}}` with the current values."""
+    with _lock:
+        return {'counters': dict(_counters), 'gauges': dict(_gauges)}
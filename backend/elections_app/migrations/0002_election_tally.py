@@ -0,0 +1,49 @@
+# Generated by Django 4.2.23 on 2026-10-18 06:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_tallies(apps, schema_editor):
+    """Populate ElectionTally from existing votes (attributed to each election's current round)."""
+    Vote = apps.get_model('elections_app', 'Vote')
+    ElectionTally = apps.get_model('elections_app', 'ElectionTally')
+    rows = (
+        Vote.objects.filter(election__isnull=False)
+        .values('election_id', 'candidate_id', 'election__current_round')
+        .annotate(n=models.Count('id'))
+        .order_by()
+    )
+    ElectionTally.objects.bulk_create([
+        ElectionTally(election_id=r['election_id'], candidate_id=r['candidate_id'], round=r['election__current_round'], votes=r['n'])
+        for r in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ElectionTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round', models.IntegerField(default=1)),
+                ('votes', models.IntegerField(default=0)),
+                ('candidate', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tallies', to='elections_app.candidate')),
+                ('election', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tallies', to='elections_app.election')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='electiontally',
+            constraint=models.UniqueConstraint(fields=('election', 'candidate', 'round'), name='unique_tally_per_candidate_round'),
+        ),
+        migrations.AddConstraint(
+            model_name='electiontally',
+            constraint=models.UniqueConstraint(condition=models.Q(('candidate__isnull', True)), fields=('election', 'round'), name='unique_null_tally_per_round'),
+        ),
+        migrations.RunPython(backfill_tallies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.23 on 2026-10-18 06:30
+
+from django.db import migrations, models
+
+
+def _ref(detail, key):
+    if not isinstance(detail, dict):
+        return None
+    try:
+        return int(detail[key])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def backfill_refs(apps, schema_editor):
+    """Copy detail['election_id'] / detail['institution_id'] into the new columns, in chunks."""
+    AuditLog = apps.get_model('elections_app', 'AuditLog')
+    batch = []
+    for log in AuditLog.objects.exclude(detail__isnull=True).only('id', 'detail').iterator(chunk_size=2000):
+        log.election_id = _ref(log.detail, 'election_id')
+        log.institution_id = _ref(log.detail, 'institution_id')
+        if log.election_id is not None or log.institution_id is not None:
+            batch.append(log)
+        if len(batch) >= 2000:
+            AuditLog.objects.bulk_update(batch, ['election_id', 'institution_id'])
+            batch = []
+    if batch:
+        AuditLog.objects.bulk_update(batch, ['election_id', 'institution_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections_app', '0003_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditlog',
+            name='election_id',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='institution_id',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['action', 'election_id'], name='auditlog_action_election_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['action', 'institution_id', 'timestamp'], name='auditlog_action_inst_ts_idx'),
+        ),
+        migrations.RunPython(backfill_refs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.23 on 2026-10-18 06:39
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_rows_processed(apps, schema_editor):
+    """Existing imports ran to completion inside their request."""
+    VoterImportFile = apps.get_model('elections_app', 'VoterImportFile')
+    VoterImportFile.objects.filter(total_rows__isnull=False).update(rows_processed=F('total_rows'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections_app', '0004_auditlog_refs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='voterimportfile',
+            name='error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='voterimportfile',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='voterimportfile',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='voterimportfile',
+            name='rows_processed',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='voterimportfile',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='done', max_length=10),
+        ),
+        migrations.RunPython(backfill_rows_processed, migrations.RunPython.noop),
+    ]
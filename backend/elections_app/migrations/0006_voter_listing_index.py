@@ -0,0 +1,17 @@
+# Generated by Django 4.2.23 on 2026-10-18 06:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections_app', '0005_import_jobs'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='voter',
+            index=models.Index(fields=['institution', 'eligible', 'id'], name='voter_inst_eligible_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+import logging
+
+from django.db import DatabaseError, migrations, transaction
+
+logger = logging.getLogger(__name__)
+
+# SQLite: external-content FTS5 table (trigram tokenizer) over voter identifier
+# and name, kept in sync by triggers, so bulk upserts and raw deletes are
+# covered too. PostgreSQL: pg_trgm GIN indexes on the same columns.
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE elections_app_voter_fts USING fts5("
+    "identifier, name, content='elections_app_voter', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER elections_app_voter_fts_ai AFTER INSERT ON elections_app_voter BEGIN "
+    "INSERT INTO elections_app_voter_fts(rowid, identifier, name) VALUES (new.id, new.identifier, new.name); END",
+    "CREATE TRIGGER elections_app_voter_fts_ad AFTER DELETE ON elections_app_voter BEGIN "
+    "INSERT INTO elections_app_voter_fts(elections_app_voter_fts, rowid, identifier, name) "
+    "VALUES ('delete', old.id, old.identifier, old.name); END",
+    "CREATE TRIGGER elections_app_voter_fts_au AFTER UPDATE OF identifier, name ON elections_app_voter BEGIN "
+    "INSERT INTO elections_app_voter_fts(elections_app_voter_fts, rowid, identifier, name) "
+    "VALUES ('delete', old.id, old.identifier, old.name); "
+    "INSERT INTO elections_app_voter_fts(rowid, identifier, name) VALUES (new.id, new.identifier, new.name); END",
+    "INSERT INTO elections_app_voter_fts(elections_app_voter_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS elections_app_voter_fts_au",
+    "DROP TRIGGER IF EXISTS elections_app_voter_fts_ad",
+    "DROP TRIGGER IF EXISTS elections_app_voter_fts_ai",
+    "DROP TABLE IF EXISTS elections_app_voter_fts",
+]
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS voter_identifier_trgm_idx ON elections_app_voter USING gin (identifier gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS voter_name_trgm_idx ON elections_app_voter USING gin (name gin_trgm_ops)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS voter_name_trgm_idx",
+    "DROP INDEX IF EXISTS voter_identifier_trgm_idx",
+]
+
+
+def _run(schema_editor, statements):
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}.get(vendor)
+    if statements is None:
+        # Other backends: search falls back to a scan (see elections_app.voter_search)
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            _run(schema_editor, statements)
+    except DatabaseError as e:
+        # SQLite without FTS5/trigram, or no permission to create pg_trgm: same fallback
+        logger.warning('Voter search index not created: %s', e)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_BACKWARD)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections_app', '0006_voter_listing_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
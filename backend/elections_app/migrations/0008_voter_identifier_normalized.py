@@ -0,0 +1,75 @@
+import logging
+import unicodedata
+
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 2000
+MAX_LENGTH = 200
+
+
+def _normalize(identifier):
+    # Same as elections_app.models.normalize_identifier at the time of writing
+    return unicodedata.normalize('NFKC', identifier or '').strip().casefold()[:MAX_LENGTH]
+
+
+def backfill_identifier_normalized(apps, schema_editor):
+    """Fill the column; identifiers equal once normalized keep their oldest voter.
+
+    The other voters of a collision get a value suffixed with their id so the
+    unique constraint can be created; they still log in with their exact
+    identifier (`voter_login` tries it before the normalized one) and should
+    be merged or renamed.
+    """
+    Voter = apps.get_model('elections_app', 'Voter')
+    qn = schema_editor.connection.ops.quote_name
+    # executemany of keyed UPDATEs: much cheaper than bulk_update's CASE expressions
+    update_sql = 'UPDATE {} SET {} = %s WHERE {} = %s'.format(
+        qn(Voter._meta.db_table), qn('identifier_normalized'), qn(Voter._meta.pk.column),
+    )
+
+    def flush(batch):
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(update_sql, batch)
+
+    rows = Voter.objects.order_by('institution_id', 'id').values_list('id', 'institution_id', 'identifier')
+    batch, seen, institution_id, collisions = [], set(), None, 0
+    for voter_id, voter_institution_id, identifier in rows.iterator(chunk_size=BATCH_SIZE):
+        if voter_institution_id != institution_id:
+            seen, institution_id = set(), voter_institution_id
+        normalized = _normalize(identifier)
+        if normalized in seen:
+            collisions += 1
+            suffix = f'#{voter_id}'
+            normalized = normalized[:MAX_LENGTH - len(suffix)] + suffix
+        seen.add(normalized)
+        batch.append((normalized, voter_id))
+        if len(batch) >= BATCH_SIZE:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    if collisions:
+        logger.warning('%d voter identifier(s) differ from another voter only by case/spacing/Unicode form.', collisions)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections_app', '0007_voter_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='voter',
+            name='identifier_normalized',
+            field=models.CharField(default='', editable=False, max_length=200),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_identifier_normalized, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='voter',
+            constraint=models.UniqueConstraint(fields=('institution', 'identifier_normalized'), name='voter_inst_identifier_norm_uniq'),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import unicodedata
+
 from django.db import models
 from django.utils import timezone
 from django.contrib.auth.models import User
@@ -43,6 +45,8 @@ class Election(models.Model):
     end = models.DateTimeField(null=True, blank=True)
     # Explicit closed flag to record that the election has been closed (set by scheduler/management command)
     closed = models.BooleanField(default=False)
+    # Last change to the election or one of its candidates (used as an HTTP validator)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.title} ({self.institution.name})"
@@ -63,15 +67,33 @@ class Candidate(models.Model):
     photo = models.ImageField(upload_to='candidates/', null=True, blank=True)
     position = models.CharField(max_length=100, blank=True)  # e.g., "Class President"
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name} ({self.election.title})"
 
 
+def normalize_identifier(identifier):
+    """Form of a voter identifier used for matching: NFKC, trimmed, casefolded."""
+    # NFKC and casefold can lengthen a string ("ß" -> "ss"): keep to the column size
+    return unicodedata.normalize('NFKC', identifier or '').strip().casefold()[:200]
+
+
+class VoterManager(models.Manager):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.fill_identifier_normalized()
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class Voter(models.Model):
     """Represents an eligible voter for an institution."""
     institution = models.ForeignKey(Institution, on_delete=models.CASCADE, related_name='voters')
     identifier = models.CharField(max_length=200)  # e.g., student id or email
+    # normalize_identifier(identifier), filled on write: login and import
+    # matching ("Jean.Dupont@univ.cd" == "jean.dupont@univ.cd") use its unique index
+    identifier_normalized = models.CharField(max_length=200, editable=False)
     name = models.CharField(max_length=200, blank=True)
     eligible = models.BooleanField(default=True)
     import_file = models.ForeignKey('VoterImportFile', null=True, blank=True, on_delete=models.SET_NULL, related_name='voters')
@@ -79,6 +101,25 @@ class Voter(models.Model):
 
     class Meta:
         unique_together = ('institution', 'identifier')
+        indexes = [
+            # Roster pages filtered on eligibility, walked by id (keyset pagination)
+            models.Index(fields=['institution', 'eligible', 'id'], name='voter_inst_eligible_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['institution', 'identifier_normalized'], name='voter_inst_identifier_norm_uniq'),
+        ]
+
+    objects = VoterManager()
+
+    def fill_identifier_normalized(self):
+        self.identifier_normalized = normalize_identifier(self.identifier)
+
+    def save(self, *args, **kwargs):
+        self.fill_identifier_normalized()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'identifier' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'identifier_normalized'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.identifier} ({self.institution.name})"
@@ -93,6 +134,20 @@ class VoterImportFile(models.Model):
     total_rows = models.IntegerField(null=True, blank=True)
     created = models.IntegerField(null=True, blank=True)
     updated = models.IntegerField(null=True, blank=True)
+    # Background import jobs (see `manage.py run_import_worker`). Imports run
+    # inside the request are created as 'done'.
+    status = models.CharField(
+        max_length=10,
+        choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')],
+        default='done',
+        db_index=True,
+    )
+    # Data rows already committed; a restarted job resumes after them
+    rows_processed = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    # Refreshed with every committed chunk; a running job without news is reclaimed
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"Import {self.id} for {self.institution.name} @ {self.uploaded_at}"
@@ -118,12 +173,78 @@ class Vote(models.Model):
         return f"{self.voter.identifier} voted for {cand}"
 
 
+class ElectionTally(models.Model):
+    """Materialized vote count for one candidate of an election in a given round.
+
+    A row with a NULL candidate holds the 'Vote nul' count. Rows are incremented
+    in the same transaction as each Vote insert (see `elections_app.tally`) and can
+    be rebuilt from raw votes with `manage.py rebuild_tallies`.
+    """
+    election = models.ForeignKey(Election, on_delete=models.CASCADE, related_name='tallies')
+    candidate = models.ForeignKey(Candidate, null=True, blank=True, on_delete=models.CASCADE, related_name='tallies')
+    round = models.IntegerField(default=1)
+    votes = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=('election', 'candidate', 'round'), name='unique_tally_per_candidate_round'),
+            # NULLs are distinct in unique indexes: the null-vote row needs its own constraint
+            models.UniqueConstraint(fields=('election', 'round'), condition=models.Q(candidate__isnull=True), name='unique_null_tally_per_round'),
+        ]
+
+    def __str__(self):
+        cand = self.candidate_id or 'Vote nul'
+        return f"Tally election={self.election_id} candidate={cand} round={self.round}: {self.votes}"
+
+
+def _detail_ref(detail, key):
+    """Integer id stored under `key` in an audit `detail` dict, or None."""
+    if not isinstance(detail, dict):
+        return None
+    try:
+        return int(detail[key])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class AuditLogManager(models.Manager):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.fill_refs()
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class AuditLog(models.Model):
     """Logs all actions for audit trail."""
     action = models.CharField(max_length=200)
     actor = models.CharField(max_length=200, blank=True, null=True)
     detail = models.JSONField(null=True, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
+    # Indexed copies of detail['election_id'] / detail['institution_id'] (plain ids, not
+    # foreign keys: audit rows outlive the objects they mention). Filled on write.
+    election_id = models.IntegerField(null=True, blank=True, db_index=True)
+    institution_id = models.IntegerField(null=True, blank=True, db_index=True)
+
+    objects = AuditLogManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['action', 'election_id'], name='auditlog_action_election_idx'),
+            models.Index(fields=['action', 'institution_id', 'timestamp'], name='auditlog_action_inst_ts_idx'),
+        ]
+
+    def fill_refs(self):
+        """Copy the election/institution ids found in `detail` into their columns."""
+        if self.election_id is None:
+            self.election_id = _detail_ref(self.detail, 'election_id')
+        if self.institution_id is None:
+            self.institution_id = _detail_ref(self.detail, 'institution_id')
+
+    def save(self, *args, **kwargs):
+        self.fill_refs()
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.action} @ {self.timestamp}"
@@ -0,0 +1,27 @@
+"""Opt-in keyset pagination for large listings (voters, elections, imports).
+
+Listings stay plain arrays unless the client sends `?page_size=` or
+`?cursor=`, so existing callers are unaffected. Pages are cut with a
+`WHERE id > <cursor>` / `ORDER BY id` walk instead of OFFSET, so every page
+costs the same however deep the client goes. Views choose the direction with
+`pagination_ordering` (default newest first).
+"""
+
+from rest_framework.pagination import CursorPagination
+
+
+class OptionalCursorPagination(CursorPagination):
+    ordering = '-id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'pagination_ordering', self.ordering)
+        return (ordering,) if isinstance(ordering, str) else tuple(ordering)
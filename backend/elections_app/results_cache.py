@@ -0,0 +1,126 @@
+"""Per-process stale-while-revalidate cache for election results payloads.
+
+`ElectionViewSet.results` is polled by every open results dashboard. Entries
+are keyed by election and carry the data version they were computed from
+(`tally.tally_version`: one aggregate over the election's tally rows) and the
+payload's ETag. Within `settings.RESULTS_CACHE_TTL` seconds an entry is served
+as is. Once stale, the first caller refreshes it (single flight): when the version is
+unchanged the entry is just re-stamped, otherwise the payload is recomputed.
+Meanwhile concurrent callers keep receiving the stale payload, as long as it
+is younger than `settings.RESULTS_CACHE_MAX_STALE` seconds; past that they
+wait for the refresh instead. A payload is never reused for longer than
+`RESULTS_CACHE_MAX_STALE` seconds, which bounds staleness for changes that do
+not move the version (e.g. voter eligibility). Election/Candidate saves drop
+the entry through `elections_app.signals`.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from elections_app import metrics
+from elections_app.conditional import payload_etag
+from elections_app.tally import tally_version
+
+# Least recently used entries beyond this are dropped.
+_MAX_ENTRIES = 1024
+# Longest a caller waits for another request's refresh before computing itself.
+_WAIT_TIMEOUT = 10
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+_inflight = {}
+# Bumped by every invalidation.
+_generation = 0
+
+
+class _Entry:
+    __slots__ = ('payload', 'etag', 'version', 'computed_at', 'checked_at')
+
+    def __init__(self, payload, etag, version, computed_at, checked_at):
+        self.payload = payload
+        self.etag = etag
+        self.version = version
+        self.computed_at = computed_at
+        self.checked_at = checked_at
+
+
+def _ttl():
+    return getattr(settings, 'RESULTS_CACHE_TTL', 2)
+
+
+def _max_stale():
+    return max(getattr(settings, 'RESULTS_CACHE_MAX_STALE', 30), _ttl())
+
+
+def _store(election_id, entry, generation):
+    with _lock:
+        # An invalidation ran while we were computing: do not cache what we read.
+        if generation != _generation:
+            return
+        _entries[election_id] = entry
+        _entries.move_to_end(election_id)
+        while len(_entries) > _MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def _computed_entry(compute, version, now):
+    payload = compute()
+    return _Entry(payload, payload_etag(payload), version, now, now)
+
+
+def get_cached_results(election_id, compute):
+    """Return `(payload, etag)` for `election_id`, calling `compute()` only when the payload must be rebuilt."""
+    if _ttl() <= 0:
+        entry = _computed_entry(compute, tally_version([election_id]), time.monotonic())
+        return entry.payload, entry.etag
+
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(election_id)
+        if entry is not None and now - entry.checked_at < _ttl():
+            metrics.incr('results_cache_hits')
+            return entry.payload, entry.etag
+        flight = _inflight.get(election_id)
+        leader = flight is None
+        if leader:
+            flight = _inflight[election_id] = threading.Event()
+        generation = _generation
+
+    if not leader:
+        if entry is not None and now - entry.computed_at < _max_stale():
+            metrics.incr('results_cache_stale_hits')
+            return entry.payload, entry.etag
+        flight.wait(_WAIT_TIMEOUT)
+        with _lock:
+            entry = _entries.get(election_id)
+        if entry is None:
+            entry = _computed_entry(compute, tally_version([election_id]), now)
+        return entry.payload, entry.etag
+
+    try:
+        version = tally_version([election_id])
+        if entry is not None and entry.version == version and now - entry.computed_at < _max_stale():
+            fresh = _Entry(entry.payload, entry.etag, version, entry.computed_at, now)
+        else:
+            metrics.incr('results_cache_recomputes')
+            fresh = _computed_entry(compute, version, now)
+        _store(election_id, fresh, generation)
+        return fresh.payload, fresh.etag
+    finally:
+        with _lock:
+            _inflight.pop(election_id, None)
+        flight.set()
+
+
+def invalidate_results(election_id=None):
+    """Drop the cached results of `election_id` (or of every election when None)."""
+    global _generation
+    with _lock:
+        _generation += 1
+        if election_id is None:
+            _entries.clear()
+        else:
+            _entries.pop(election_id, None)
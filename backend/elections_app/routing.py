@@ -0,0 +1,8 @@
+"""WebSocket routes served in ASGI mode (see `elections_project.asgi`)."""
+from django.urls import path
+
+from elections_app.consumers import ElectionResultsConsumer
+
+websocket_urlpatterns = [
+    path('ws/elections/<int:election_id>/results/', ElectionResultsConsumer.as_asgi()),
+]
@@ -0,0 +1,76 @@
+"""Model signal receivers (in-process cache invalidation, tally upkeep); connected from `ElectionsAppConfig.ready`."""
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from elections_app.descriptors import invalidate_election_descriptor
+from elections_app.models import Candidate, Election, Vote
+from elections_app.results_cache import invalidate_results
+from elections_app.tally import add_to_tally, move_candidate_tally_to_null, remove_from_tally
+from elections_app.voted_index import invalidate_voted_index
+
+
+@receiver(post_save, sender=Election)
+@receiver(post_delete, sender=Election)
+def election_changed(sender, instance, **kwargs):
+    invalidate_election_descriptor(instance.id)
+    invalidate_results(instance.id)
+
+
+@receiver(post_delete, sender=Election)
+def election_deleted(sender, instance, **kwargs):
+    # Its votes are detached (election set to NULL)
+    invalidate_voted_index(instance.id)
+
+
+@receiver(post_save, sender=Candidate)
+@receiver(post_delete, sender=Candidate)
+def candidate_changed(sender, instance, **kwargs):
+    # Election.updated_at doubles as the HTTP validator stamp for its candidates.
+    # queryset.update() skips Election's own post_save, hence the explicit invalidations.
+    Election.objects.filter(id=instance.election_id).update(updated_at=timezone.now())
+    invalidate_election_descriptor(instance.election_id)
+    invalidate_results(instance.election_id)
+
+
+@receiver(pre_delete, sender=Candidate)
+def candidate_deleting(sender, instance, origin=None, **kwargs):
+    # Its votes become null votes (Vote.candidate is SET_NULL): keep the tally in step.
+    # Skipped when the whole election is being deleted (tallies cascade with it).
+    if getattr(origin, 'model', type(origin)) is Candidate:
+        move_candidate_tally_to_null(instance)
+
+
+# Tally upkeep for single-row Vote writes (cast_vote, admin, ORM deletes such as
+# a voter deleted with its votes). bulk_create and raw deletes bypass these and
+# maintain the tally themselves.
+
+@receiver(pre_save, sender=Vote)
+def vote_saving(sender, instance, raw=False, **kwargs):
+    # Remember what an edited vote counted for, so vote_saved can move it
+    instance._tallied_as = None
+    if not raw and not instance._state.adding:
+        instance._tallied_as = Vote.objects.filter(pk=instance.pk).values_list('election_id', 'candidate_id').first()
+
+
+@receiver(post_save, sender=Vote)
+def vote_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, '_tallied_as', None)
+    after = (instance.election_id, instance.candidate_id)
+    if before == after:
+        return
+    if before is not None and before[0] is not None:
+        remove_from_tally(*before)
+        invalidate_voted_index(before[0])
+    if instance.election_id is not None:
+        add_to_tally(instance.election_id, instance.candidate_id)
+
+
+@receiver(post_delete, sender=Vote)
+def vote_deleted(sender, instance, **kwargs):
+    if instance.election_id is not None:
+        remove_from_tally(instance.election_id, instance.candidate_id)
+        invalidate_voted_index(instance.election_id)
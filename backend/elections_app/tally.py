@@ -0,0 +1,156 @@
+"""Vote tallies: the materialized `ElectionTally` rows and the shared read API.
+
+Every vote insert bumps its (election, candidate, round) row with an F()
+expression inside the same transaction, so result reads cost one row per
+candidate instead of a scan of Vote. Single-row Vote writes are followed by
+the Vote signal receivers in `elections_app.signals`: cast_vote, admin adds
+and edits, and deletions through the ORM (a voter deleted with its votes,
+the admin delete actions) all keep the rows in step. Paths that bypass
+signals maintain the rows themselves: group commit's `bulk_create` applies
+`add_many_to_tally`, and the raw chunked deletes of `elections_app.deletion`
+call `rebuild_election_tally`, which recomputes an election's rows from raw
+votes (also run by `manage.py rebuild_tallies`).
+
+Readers (results, round-2 advancement, serializers) go through
+`election_tally`, which answers from the tally rows and falls back to a single
+`GROUP BY candidate_id` over Vote when an election has none.
+
+Vote does not record the round it was cast in: rebuilt rows are attributed to
+the election's current round.
+"""
+
+from collections import namedtuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Subquery, Sum
+from django.utils import timezone
+
+from elections_app.models import Election, ElectionTally, Vote
+
+
+def _election_round(election_id):
+    """The election's current round, read from its row (never from the descriptor cache)."""
+    return Election.objects.filter(id=election_id).values_list('current_round', flat=True)
+
+
+def _candidate_rows(election_id, candidate_id):
+    qs = ElectionTally.objects.filter(election_id=election_id)
+    if candidate_id is None:
+        return qs.filter(candidate__isnull=True)
+    return qs.filter(candidate_id=candidate_id)
+
+
+def _tally_rows(election_id, candidate_id, round_):
+    if round_ is None:
+        round_ = Subquery(_election_round(election_id)[:1])
+    return _candidate_rows(election_id, candidate_id).filter(round=round_)
+
+
+def add_to_tally(election_id, candidate_id, round_=None, votes=1):
+    """Add `votes` to a tally row, creating it on first use. Call inside the vote's transaction.
+
+    With `round_=None` the votes count towards the round stored on the Election
+    row, read by the UPDATE itself: a round change made by another process is
+    seen by the next vote, whatever the descriptor cache holds.
+    """
+    if _tally_rows(election_id, candidate_id, round_).update(votes=F('votes') + votes, updated_at=timezone.now()):
+        return
+    if round_ is None:
+        round_ = _election_round(election_id).first() or 1
+    try:
+        with transaction.atomic():
+            ElectionTally.objects.create(election_id=election_id, candidate_id=candidate_id, round=round_, votes=votes)
+    except IntegrityError:
+        # Another transaction created the row first
+        _tally_rows(election_id, candidate_id, round_).update(votes=F('votes') + votes, updated_at=timezone.now())
+
+
+def remove_from_tally(election_id, candidate_id):
+    """Take one deleted vote off the tally. Call inside the deletion's transaction.
+
+    Vote does not record its round, so the vote is taken from the latest
+    round that still counts one for `candidate_id`.
+    """
+    row_id = (
+        _candidate_rows(election_id, candidate_id).filter(votes__gt=0)
+        .order_by('-round').values_list('id', flat=True).first()
+    )
+    if row_id is not None:
+        ElectionTally.objects.filter(id=row_id, votes__gt=0).update(votes=F('votes') - 1, updated_at=timezone.now())
+
+
+def add_many_to_tally(counts):
+    """Apply `{(election_id, candidate_id, round or None): votes}` increments (e.g. for a batch of votes)."""
+    for (election_id, candidate_id, round_), votes in counts.items():
+        add_to_tally(election_id, candidate_id, round_, votes)
+
+
+def raw_counts(election_id):
+    """Per-candidate vote counts computed from Vote: `{candidate_id or None: votes}`."""
+    rows = Vote.objects.filter(election_id=election_id).values('candidate_id').annotate(n=Count('id')).order_by()
+    return {r['candidate_id']: r['n'] for r in rows}
+
+
+def tally_counts(election_id):
+    """Per-candidate vote counts from ElectionTally, summed over rounds: `{candidate_id or None: votes}`."""
+    rows = ElectionTally.objects.filter(election_id=election_id).values('candidate_id').annotate(n=Sum('votes')).order_by()
+    return {r['candidate_id']: r['n'] for r in rows if r['n']}
+
+
+class Tally(namedtuple('Tally', ('counts', 'null_votes', 'total'))):
+    """Vote counts of one election: `counts` maps candidate id to votes (null votes excluded)."""
+    __slots__ = ()
+
+    def votes_for(self, candidate_id):
+        return self.counts.get(candidate_id, 0)
+
+
+def election_tally(election_id):
+    """Return the `Tally` of an election: one query on the tally rows, plus one GROUP BY over Vote if they are missing."""
+    counts = tally_counts(election_id)
+    if not counts:
+        counts = raw_counts(election_id)
+    null_votes = counts.pop(None, 0)
+    return Tally(counts, null_votes, sum(counts.values()) + null_votes)
+
+
+def tally_version(election_ids):
+    """Data version of the elections' votes: `(total, rows, last row id, last update)`.
+
+    Moves on every tallied vote and on every rebuild; one aggregate over the
+    tally rows of `election_ids`.
+    """
+    agg = ElectionTally.objects.filter(election_id__in=election_ids).aggregate(
+        total=Sum('votes'), rows=Count('id'), last=Max('id'), updated=Max('updated_at'),
+    )
+    return (agg['total'] or 0, agg['rows'], agg['last'], agg['updated'])
+
+
+def rebuild_election_tally(election_id):
+    """Replace an election's tally rows with counts recomputed from raw votes."""
+    round_ = _election_round(election_id).first()
+    if round_ is None:
+        return
+    with transaction.atomic():
+        ElectionTally.objects.filter(election_id=election_id).delete()
+        ElectionTally.objects.bulk_create([
+            ElectionTally(election_id=election_id, candidate_id=candidate_id, round=round_, votes=n)
+            for candidate_id, n in raw_counts(election_id).items()
+        ])
+
+
+def verify_election_tally(election_id):
+    """Return `{candidate_id: (tally, raw)}` for every candidate whose tally differs from raw votes."""
+    tally = tally_counts(election_id)
+    raw = raw_counts(election_id)
+    return {
+        cid: (tally.get(cid, 0), raw.get(cid, 0))
+        for cid in set(tally) | set(raw)
+        if tally.get(cid, 0) != raw.get(cid, 0)
+    }
+
+
+def move_candidate_tally_to_null(candidate):
+    """Before a candidate is deleted its votes become null votes (Vote.candidate is SET_NULL)."""
+    for row in ElectionTally.objects.filter(candidate=candidate, votes__gt=0).values('round', 'votes'):
+        add_to_tally(candidate.election_id, None, row['round'], row['votes'])
@@ -0,0 +1,1497 @@
+import csv
+import gzip
+import importlib
+import json
+import re
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.apps import apps
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from openpyxl import Workbook
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from elections_app import descriptors, live, results_cache, voted_index
+from elections_app.audit import BufferedAuditWriter, record_audit
+from elections_app.deletion import delete_election, delete_import, raw_delete
+from elections_app.institution.admin import VoterAdmin
+from elections_app.institution.serializers import CandidateSerializer
+from elections_app.management.commands.auto_close_elections import EndTimeSchedule, close_due
+from elections_app.models import (
+    AuditLog, Candidate, Election, ElectionTally, Institution, Vote, Voter, VoterImportFile, normalize_identifier,
+)
+from elections_app.routing import websocket_urlpatterns
+from elections_app.tally import election_tally, tally_counts, verify_election_tally
+from elections_app.utils import auto_close_elections
+from elections_app.voter.group_commit import VoteBatcher, _PendingVote
+from elections_app.voter.tickets import issue_ticket, read_ticket
+from elections_app.voter_import import (
+    ImportCancelled, claim_import_job, import_voter_rows, preview_voter_file, read_voter_rows, run_import_job,
+)
+from elections_app.voter_search import search_backend, search_voter_ids
+
+# Uploads and backups written by the tests
+TEST_MEDIA_ROOT = tempfile.mkdtemp(prefix='ves-tests-')
+
+
+def tearDownModule():
+    shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+
+
+def make_institution(username='inst'):
+    user = User.objects.create_user(username=username, password='x')
+    return Institution.objects.create(user=user, name=f'Institution {username}')
+
+
+def make_election(institution, title='Election', **fields):
+    now = timezone.now()
+    fields = {'start': now - timedelta(hours=1), 'end': now + timedelta(hours=1), **fields}
+    return Election.objects.create(institution=institution, title=title, **fields)
+
+
+def voters_csv(count, prefix='v', start=0):
+    lines = ['identifier,name'] + [f'{prefix}{i},Voter {i}' for i in range(start, start + count)]
+    return ('\n'.join(lines) + '\n').encode()
+
+
+class NormalizedIdentifierTests(TestCase):
+    def setUp(self):
+        self.institution = make_institution()
+        self.client = APIClient()
+
+    def login(self, identifier):
+        return self.client.post('/api/auth/voter/login/', {'identifier': identifier, 'institution_id': self.institution.id}, format='json')
+
+    def make_collision(self):
+        """Two voters differing only by case, as left by migration 0008."""
+        first = Voter.objects.create(institution=self.institution, identifier='Jean.Dupont@univ.cd')
+        second = Voter.objects.create(institution=self.institution, identifier='other')
+        Voter.objects.filter(id=second.id).update(identifier='jean.dupont@univ.cd', identifier_normalized=f'jean.dupont@univ.cd#{second.id}')
+        return first, second
+
+    def test_normalize_identifier(self):
+        self.assertEqual(normalize_identifier('  Jean.DUPONT@Univ.cd '), 'jean.dupont@univ.cd')
+        self.assertEqual(normalize_identifier('ｊｅａｎ'), 'jean')
+        self.assertEqual(normalize_identifier('Straße'), 'strasse')
+        self.assertEqual(len(normalize_identifier('ß' * 200)), 200)
+
+    def test_login_ignores_case_and_spaces(self):
+        voter = Voter.objects.create(institution=self.institution, identifier='Jean.Dupont@univ.cd')
+        response = self.login('  JEAN.DUPONT@UNIV.CD ')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['voter_id'], voter.id)
+        self.assertEqual(self.login('nobody').status_code, 404)
+
+    def test_login_prefers_exact_identifier_over_normalized_match(self):
+        first, second = self.make_collision()
+        self.assertEqual(self.login('jean.dupont@univ.cd').data['voter_id'], second.id)
+        self.assertEqual(self.login('Jean.Dupont@univ.cd').data['voter_id'], first.id)
+        self.assertEqual(self.login('JEAN.DUPONT@UNIV.CD').data['voter_id'], first.id)
+
+    def test_save_and_bulk_create_fill_the_column(self):
+        voter = Voter.objects.create(institution=self.institution, identifier='ABC')
+        voter.identifier = 'Def'
+        voter.save(update_fields=['identifier'])
+        Voter.objects.bulk_create([Voter(institution=self.institution, identifier='GHI')])
+        self.assertEqual(
+            sorted(Voter.objects.values_list('identifier_normalized', flat=True)), ['def', 'ghi'],
+        )
+
+    def test_api_rejects_identifier_equal_once_normalized(self):
+        Voter.objects.create(institution=self.institution, identifier='Jean.Dupont@univ.cd')
+        self.client.force_authenticate(self.institution.user)
+        response = self.client.post('/api/voters/', {'identifier': 'JEAN.dupont@univ.cd'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Voter.objects.count(), 1)
+
+    def test_backfill_suffixes_collisions_within_column_size(self):
+        migration = importlib.import_module('elections_app.migrations.0008_voter_identifier_normalized')
+        long_identifier = 'a' * 200
+        first = Voter.objects.create(institution=self.institution, identifier=long_identifier)
+        second = Voter.objects.create(institution=self.institution, identifier='x')
+        Voter.objects.filter(id=second.id).update(identifier=long_identifier.upper())
+        migration.backfill_identifier_normalized(apps, SimpleNamespace(connection=connection))
+        values = dict(Voter.objects.values_list('id', 'identifier_normalized'))
+        self.assertEqual(values[first.id], long_identifier)
+        self.assertTrue(values[second.id].endswith(f'#{second.id}'))
+        self.assertEqual(len(values[second.id]), 200)
+
+
+class GroupCommitTests(TestCase):
+    def setUp(self):
+        voted_index.invalidate_voted_index()
+        self.addCleanup(voted_index.invalidate_voted_index)
+        institution = make_institution()
+        self.election = make_election(institution)
+        self.candidates = [Candidate.objects.create(election=self.election, name=f'C{i}') for i in range(2)]
+        self.voters = [Voter.objects.create(institution=institution, identifier=f'v{i}') for i in range(8)]
+        # Driven by hand: write_batch is what the writer thread runs
+        self.batcher = VoteBatcher(batch_size=10, max_wait=0)
+
+    def pending(self, voters, candidate=None):
+        candidate_id = (candidate or self.candidates[0]).id
+        return [_PendingVote(self.election.id, voter.id, candidate_id, voter.identifier) for voter in voters]
+
+    def test_batch_rejects_repeats_and_stored_votes(self):
+        Vote.objects.create(election=self.election, candidate=self.candidates[0], voter=self.voters[0])
+        batch = self.pending(self.voters[:3]) + self.pending(self.voters[1:2], self.candidates[1])
+        self.batcher.write_batch(batch)
+        self.assertEqual([p.vote_id is not None for p in batch], [False, True, True, False])
+        self.assertEqual([str(p.error) if p.error else None for p in batch], ['Voter already voted in this election.', None, None, 'Voter already voted in this election.'])
+        self.assertEqual(Vote.objects.count(), 3)
+        self.assertEqual(AuditLog.objects.filter(action='vote_cast').count(), 2)
+        self.assertEqual(tally_counts(self.election.id), {self.candidates[0].id: 3})
+
+    def test_batch_queries_do_not_grow_with_its_size(self):
+        self.batcher.write_batch(self.pending(self.voters[:1]))  # warms the election descriptor
+        with CaptureQueriesContext(connection) as ctx:
+            self.batcher.write_batch(self.pending(self.voters[1:3]))
+        expected = len(ctx.captured_queries)
+        with self.assertNumQueries(expected):
+            self.batcher.write_batch(self.pending(self.voters[3:8]))
+        self.assertEqual(tally_counts(self.election.id), {self.candidates[0].id: 8})
+
+    def test_lost_race_falls_back_to_one_insert_per_vote(self):
+        batch = self.pending(self.voters[:2])
+        with mock.patch.object(VoteBatcher, '_insert', side_effect=IntegrityError('unique')):
+            self.batcher.write_batch(batch)
+        self.assertTrue(all(p.vote_id and p.error is None for p in batch))
+        self.assertEqual(tally_counts(self.election.id), {self.candidates[0].id: 2})
+
+    @override_settings(VOTE_GROUP_COMMIT=True)
+    def test_cast_vote_goes_through_the_batcher(self):
+        def submit(election_id, voter_id, candidate_id, actor):
+            pending = _PendingVote(election_id, voter_id, candidate_id, actor)
+            self.batcher.write_batch([pending])
+            if pending.error:
+                raise pending.error
+            return pending.vote_id
+
+        client = APIClient()
+        data = {'election_id': self.election.id, 'voter_id': self.voters[0].id, 'candidate_id': self.candidates[1].id}
+        with mock.patch('elections_app.voter.group_commit.get_vote_batcher', return_value=SimpleNamespace(submit=submit)):
+            self.assertEqual(client.post('/api/votes/cast_vote/', data, format='json').status_code, 201)
+            self.assertEqual(client.post('/api/votes/cast_vote/', data, format='json').status_code, 400)
+        self.assertEqual(tally_counts(self.election.id), {self.candidates[1].id: 1})
+
+    @override_settings(VOTE_GROUP_COMMIT=True)
+    def test_backends_without_bulk_insert_ids_record_votes_one_by_one(self):
+        data = {'election_id': self.election.id, 'voter_id': self.voters[0].id, 'candidate_id': self.candidates[0].id}
+        features = type(connection.features)
+        with mock.patch.object(features, 'can_return_rows_from_bulk_insert', False):
+            with mock.patch('elections_app.voter.group_commit.get_vote_batcher') as get_vote_batcher:
+                self.assertEqual(APIClient().post('/api/votes/cast_vote/', data, format='json').status_code, 201)
+        get_vote_batcher.assert_not_called()
+        self.assertEqual(tally_counts(self.election.id), {self.candidates[0].id: 1})
+
+
+class AsgiVotingTests(TestCase):
+    """The voting endpoints as Daphne serves them: through Django's ASGI handler."""
+
+    def setUp(self):
+        voted_index.invalidate_voted_index()
+        self.addCleanup(voted_index.invalidate_voted_index)
+        self.institution = make_institution()
+        self.election = make_election(self.institution)
+        self.candidate = Candidate.objects.create(election=self.election, name='A')
+        self.voter = Voter.objects.create(institution=self.institution, identifier='v1')
+
+    async def cast(self, voter_id, election_id=None):
+        data = {'election_id': election_id or self.election.id, 'voter_id': voter_id, 'candidate_id': self.candidate.id}
+        return await self.async_client.post('/api/votes/cast_vote/', data, content_type='application/json')
+
+    async def has_voted(self, voter_id):
+        return await self.async_client.get('/api/votes/has_voted/', {'election_id': self.election.id, 'voter_id': voter_id})
+
+    async def test_duplicate_vote_is_rejected(self):
+        self.assertEqual((await self.cast(self.voter.id)).status_code, 201)
+        response = await self.cast(self.voter.id)
+        self.assertEqual((response.status_code, response.json()['detail']), (400, 'Voter already voted in this election.'))
+        self.assertEqual(await Vote.objects.acount(), 1)
+
+    async def test_ineligible_voter_is_rejected(self):
+        await Voter.objects.filter(id=self.voter.id).aupdate(eligible=False)
+        response = await self.cast(self.voter.id)
+        self.assertEqual((response.status_code, response.json()['detail']), (403, 'Voter not eligible.'))
+
+    async def test_closed_election_is_rejected(self):
+        now = timezone.now()
+        closed = await Election.objects.acreate(
+            institution=self.institution, title='Closed', start=now - timedelta(hours=2), end=now - timedelta(hours=1),
+        )
+        response = await self.cast(self.voter.id, election_id=closed.id)
+        self.assertEqual((response.status_code, response.json()['detail']), (400, 'Voting window closed or not started.'))
+        self.assertFalse(await Vote.objects.aexists())
+
+    async def test_has_voted(self):
+        response = await self.has_voted(self.voter.id)
+        self.assertEqual((response.status_code, response.json()), (200, {'voted': False}))
+        await self.cast(self.voter.id)
+        response = await self.has_voted(self.voter.id)
+        self.assertEqual((response.status_code, response.json()), (200, {'voted': True}))
+        self.assertEqual((await self.has_voted(self.voter.id + 100)).status_code, 404)
+
+
+class LiveResultsTests(TestCase):
+    """The results WebSocket (elections_app.consumers) and the delta coalescer."""
+
+    def setUp(self):
+        voted_index.invalidate_voted_index()
+        self.addCleanup(voted_index.invalidate_voted_index)
+        self.institution = make_institution()
+        self.election = make_election(self.institution)
+        self.candidate = Candidate.objects.create(election=self.election, name='A')
+        self.voter = Voter.objects.create(institution=self.institution, identifier='v1')
+        self.token = Token.objects.create(user=self.institution.user).key
+
+    async def connect(self, query, election_id=None):
+        path = f'/ws/elections/{election_id or self.election.id}/results/?{query}'
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), path)
+        connected, _ = await communicator.connect()
+        return communicator, connected
+
+    def cast_committed(self):
+        data = {'election_id': self.election.id, 'voter_id': self.voter.id, 'candidate_id': self.candidate.id}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().post('/api/votes/cast_vote/', data, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    async def test_owner_token_or_institution_connects_and_gets_a_snapshot(self):
+        for query in (f'token={self.token}', f'institution={self.institution.id}'):
+            communicator, connected = await self.connect(query)
+            self.assertTrue(connected, query)
+            message = await communicator.receive_json_from()
+            self.assertEqual(message, {'type': 'snapshot', 'election_id': self.election.id, 'counts': [{'candidate_id': None, 'votes': 0}]})
+            await communicator.disconnect()
+
+    async def test_other_institutions_and_unknown_elections_are_rejected(self):
+        other = await sync_to_async(make_institution)('other')
+        other_token = await Token.objects.acreate(user=other.user)
+        for query, election_id in [
+            (f'token={other_token.key}', None),
+            (f'institution={other.id}', None),
+            ('', None),
+            (f'token={self.token}', self.election.id + 100),
+        ]:
+            communicator, connected = await self.connect(query, election_id)
+            self.assertFalse(connected, query)
+            await communicator.disconnect()
+
+    @override_settings(LIVE_RESULTS_ENABLED=True, LIVE_RESULTS_MAX_RATE=50)
+    async def test_committed_vote_is_pushed_as_a_delta(self):
+        communicator, connected = await self.connect(f'token={self.token}')
+        self.assertTrue(connected)
+        await communicator.receive_json_from()  # snapshot
+        await database_sync_to_async(self.cast_committed)()
+        message = await communicator.receive_json_from(timeout=5)
+        self.assertEqual(message, {'type': 'delta', 'election_id': self.election.id, 'deltas': [{'candidate_id': self.candidate.id, 'votes': 1}]})
+        await communicator.disconnect()
+
+    @override_settings(LIVE_RESULTS_MAX_RATE=5)
+    def test_coalescer_sends_at_most_one_batch_per_interval(self):
+        sent = []
+        first_sent, all_sent = threading.Event(), threading.Event()
+
+        def send(election_id, deltas):
+            sent.append((time.monotonic(), election_id, dict(deltas)))
+            first_sent.set()
+            if len(sent) == 3:
+                all_sent.set()
+
+        coalescer = live._Coalescer()
+        coalescer._send = send
+        coalescer.add(1, 10)
+        self.assertTrue(first_sent.wait(5))
+        # Queued during the first batch's interval (1/5 s): one message per election after it
+        for _ in range(50):
+            coalescer.add(1, 10)
+        coalescer.add(1, None, 2)
+        coalescer.add(2, 20)
+        self.assertTrue(all_sent.wait(5))
+        time.sleep(0.3)
+        self.assertEqual([(e, d) for _, e, d in sent], [(1, {10: 1}), (1, {10: 50, None: 2}), (2, {20: 1})])
+        self.assertGreaterEqual(sent[1][0] - sent[0][0], 0.15)
+
+
+class VoteAdmissionTests(TestCase):
+    def setUp(self):
+        voted_index.invalidate_voted_index()
+        self.addCleanup(voted_index.invalidate_voted_index)
+        self.institution = make_institution()
+        self.election = make_election(self.institution)
+        self.candidate = Candidate.objects.create(election=self.election, name='A')
+        self.voters = [Voter.objects.create(institution=self.institution, identifier=f'v{i}') for i in range(3)]
+        self.client = APIClient()
+
+    def cast(self, **data):
+        return self.client.post('/api/votes/cast_vote/', {'election_id': self.election.id, 'candidate_id': self.candidate.id, **data}, format='json')
+
+    def statements(self, **data):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.cast(**data).status_code, 201)
+        out = []
+        for query in ctx.captured_queries:
+            table = re.search(r'(?:FROM|INTO|UPDATE) "(\w+)"', query['sql'])
+            out.append(query['sql'].split()[0] + (f' {table.group(1)}' if table else ''))
+        return out
+
+    def test_warm_vote_is_six_statements(self):
+        self.assertEqual(self.cast(voter_id=self.voters[0].id).status_code, 201)  # loads the descriptor, creates the tally row
+        # BEGIN/COMMIT show up as a savepoint inside the test transaction
+        self.assertEqual(self.statements(voter_id=self.voters[1].id), [
+            'SELECT elections_app_voter',
+            'SAVEPOINT',
+            'INSERT elections_app_vote',
+            'UPDATE elections_app_electiontally',
+            'INSERT elections_app_auditlog',
+            'RELEASE',
+        ])
+        ticket = issue_ticket(self.voters[2].id, 'v2', self.institution.id, True)
+        self.assertEqual(len(self.statements(ticket=ticket)), 5)
+
+    def test_ineligible_voter_is_rejected(self):
+        Voter.objects.filter(id=self.voters[0].id).update(eligible=False)
+        response = self.cast(voter_id=self.voters[0].id)
+        self.assertEqual((response.status_code, response.data['detail']), (403, 'Voter not eligible.'))
+        self.assertFalse(Vote.objects.exists())
+        self.assertFalse(AuditLog.objects.filter(action='vote_cast').exists())
+
+    def test_voter_of_another_institution_is_not_found(self):
+        other = Voter.objects.create(institution=make_institution('other'), identifier='v0')
+        response = self.cast(voter_id=other.id)
+        self.assertEqual((response.status_code, response.data['detail']), (404, 'Voter not found.'))
+        self.assertFalse(Vote.objects.exists())
+
+
+class VoterTicketTests(TestCase):
+    def setUp(self):
+        voted_index.invalidate_voted_index()
+        self.addCleanup(voted_index.invalidate_voted_index)
+        self.institution = make_institution()
+        self.election = make_election(self.institution)
+        self.candidate = Candidate.objects.create(election=self.election, name='A')
+        self.voter = Voter.objects.create(institution=self.institution, identifier='v1')
+        self.client = APIClient()
+
+    def old_ticket(self, voter, seconds):
+        with mock.patch('django.core.signing.time.time', return_value=timezone.now().timestamp() - seconds):
+            return issue_ticket(voter.id, voter.identifier, voter.institution_id, voter.eligible)
+
+    def cast(self, **data):
+        return self.client.post('/api/votes/cast_vote/', {'election_id': self.election.id, 'candidate_id': self.candidate.id, **data}, format='json')
+
+    def test_login_ticket_round_trip(self):
+        response = self.client.post('/api/auth/voter/login/', {'identifier': 'v1', 'institution_id': self.institution.id}, format='json')
+        ticket = read_ticket(response.data['ticket'])
+        self.assertEqual((ticket.voter_id, ticket.identifier, ticket.institution_id, ticket.eligible), (self.voter.id, 'v1', self.institution.id, True))
+        with self.assertRaises(signing.BadSignature):
+            read_ticket(response.data['ticket'] + 'x')
+
+    @override_settings(VOTER_TICKET_MAX_AGE=60)
+    def test_expired_or_forged_ticket_is_rejected_with_401(self):
+        response = self.cast(ticket=self.old_ticket(self.voter, 120))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.cast(ticket='forged').status_code, 401)
+        params = {'election_id': self.election.id, 'ticket': self.old_ticket(self.voter, 120)}
+        self.assertEqual(self.client.get('/api/votes/has_voted/', params).status_code, 401)
+        self.assertFalse(Vote.objects.exists())
+
+    def test_valid_ticket_votes_without_voter_id(self):
+        response = self.cast(ticket=self.old_ticket(self.voter, 0))
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Vote.objects.filter(election=self.election, voter=self.voter).exists())
+
+    def test_ticket_of_another_institution_is_not_accepted(self):
+        other = Voter.objects.create(institution=make_institution('other'), identifier='v1')
+        response = self.cast(ticket=self.old_ticket(other, 0))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Vote.objects.exists())
+
+    @override_settings(VOTER_TICKETS_REQUIRED=True)
+    def test_required_ticket(self):
+        self.assertEqual(self.cast(voter_id=self.voter.id).status_code, 401)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class VoterImportTests(TestCase):
+    def setUp(self):
+        self.institution = make_institution()
+        self.client = APIClient()
+        self.client.force_authenticate(self.institution.user)
+
+    def upload(self, content, name='voters.csv'):
+        return self.client.post(
+            f'/api/institutions/{self.institution.id}/import_voters/',
+            {'file': SimpleUploadedFile(name, content, content_type='text/csv')}, format='multipart',
+        )
+
+    def import_file(self):
+        return VoterImportFile.objects.create(institution=self.institution, file='voter_imports/none.csv', status='running')
+
+    def test_csv_rows(self):
+        content = 'Email,Nom\na@x.cd,André\n\n,No id\n b@x.cd ,\n'.encode('latin-1')
+        self.assertEqual(list(read_voter_rows(BytesIO(content))), [('a@x.cd', 'André'), None, ('b@x.cd', '')])
+
+    def test_chunked_upsert_counts_and_checkpoints(self):
+        Voter.objects.create(institution=self.institution, identifier='Jean@x.cd', name='Old', eligible=False)
+        imp = self.import_file()
+        rows = [('JEAN@X.CD', 'Jean'), ('new1', 'N1'), None, ('new1', 'N1 again'), ('new2', 'N2')]
+        stats = import_voter_rows(self.institution, imp, iter(rows), chunk_size=2)
+        self.assertEqual((stats.total_rows, stats.invalid, stats.created, stats.updated), (5, 1, 2, 2))
+        imp.refresh_from_db()
+        self.assertEqual((imp.rows_processed, imp.total_rows, imp.created, imp.updated), (5, 5, 2, 2))
+        # The stored identifier is kept; the last occurrence of a repeated identifier wins
+        jean = Voter.objects.get(institution=self.institution, identifier='Jean@x.cd')
+        self.assertEqual((jean.name, jean.eligible, jean.import_file_id), ('Jean', True, imp.id))
+        self.assertEqual(Voter.objects.get(identifier='new1').name, 'N1 again')
+        self.assertEqual(Voter.objects.count(), 3)
+
+    def test_deleted_import_stops_after_the_current_chunk(self):
+        imp = self.import_file()
+
+        def rows():
+            yield ('a', 'A')
+            VoterImportFile.objects.filter(id=imp.id).delete()
+            yield ('b', 'B')
+
+        with self.assertRaises(ImportCancelled):
+            import_voter_rows(self.institution, imp, rows(), chunk_size=1)
+        # The committed chunk stays, the one whose checkpoint failed is rolled back
+        self.assertEqual(list(Voter.objects.values_list('identifier', flat=True)), ['a'])
+
+    def test_upload_creates_then_updates(self):
+        response = self.upload(voters_csv(5))
+        self.assertEqual((response.status_code, response.data['created'], response.data['updated']), (200, 5, 0))
+        response = self.upload(voters_csv(3, start=3))
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['total_rows']), (1, 2, 3))
+        self.assertEqual(Voter.objects.filter(institution=self.institution).count(), 6)
+        self.assertEqual(VoterImportFile.objects.filter(status='done').count(), 2)
+
+
+def voters_xlsx(rows, header=('identifier', 'name')):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    out = BytesIO()
+    workbook.save(out)
+    return out.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class XlsxImportTests(TestCase):
+    def setUp(self):
+        self.institution = make_institution()
+        self.client = APIClient()
+        self.client.force_authenticate(self.institution.user)
+
+    def upload(self, content, name='voters.xlsx', query=''):
+        return self.client.post(
+            f'/api/institutions/{self.institution.id}/import_voters/{query}',
+            {'file': SimpleUploadedFile(name, content)}, format='multipart',
+        )
+
+    def test_xlsx_rows(self):
+        content = voters_xlsx([(20231, 'Numeric id'), (' a@x.cd ', None), (None, 'No id'), (None, None)])
+        self.assertEqual(list(read_voter_rows(BytesIO(content))), [('20231', 'Numeric id'), ('a@x.cd', ''), None])
+
+    def test_preview_extrapolates_from_a_sample(self):
+        content = voters_xlsx([(f'v{i}' if i % 4 else None, 'N') for i in range(100)])
+        self.assertEqual(
+            preview_voter_file(BytesIO(content), sample_rows=20),
+            {'total_rows': 100, 'eligible': 75, 'invalid': 25, 'estimated': True},
+        )
+        self.assertEqual(
+            preview_voter_file(BytesIO(content)),
+            {'total_rows': 100, 'eligible': 75, 'invalid': 25, 'estimated': False},
+        )
+
+    def test_upload(self):
+        response = self.upload(voters_xlsx([('v1', 'A'), ('v2', 'B')]))
+        self.assertEqual((response.status_code, response.data['created']), (200, 2))
+        self.assertEqual(self.upload(voters_xlsx([('v1', 'A')]), query='?preview=true').data['total_rows'], 1)
+
+    def test_legacy_xls_is_rejected(self):
+        response = self.upload(b'\xd0\xcf\x11\xe0' + b'\0' * 60, name='voters.xls')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('.xls', response.data['detail'])
+        self.assertFalse(VoterImportFile.objects.exists())
+
+
+class ImportDiffTests(TestCase):
+    def setUp(self):
+        self.institution = make_institution()
+        self.client = APIClient()
+        self.client.force_authenticate(self.institution.user)
+        for identifier, name in [('Same@x.cd', 'Same'), ('renamed', 'Old name'), ('gone', 'Gone')]:
+            Voter.objects.create(institution=self.institution, identifier=identifier, name=name)
+
+    def diff(self, content):
+        return self.client.post(
+            f'/api/institutions/{self.institution.id}/import_voters/?preview=diff',
+            {'file': SimpleUploadedFile('voters.csv', content, content_type='text/csv')}, format='multipart',
+        )
+
+    def test_diff_against_the_roster(self):
+        content = b'identifier,name\nSAME@X.CD,Same\nrenamed,New name\nnew,New\nnew,New again\n,No id\n'
+        response = self.diff(content)
+        self.assertEqual(response.status_code, 200)
+        counts = {key: response.data[key] for key in ('total_rows', 'invalid', 'existing', 'new', 'updated', 'unchanged', 'duplicates', 'missing')}
+        self.assertEqual(counts, {'total_rows': 5, 'invalid': 1, 'existing': 3, 'new': 1, 'updated': 1, 'unchanged': 1, 'duplicates': 1, 'missing': 1})
+        samples = response.data['samples']
+        self.assertEqual(samples['updated'], [{'identifier': 'renamed', 'old_name': 'Old name', 'new_name': 'New name'}])
+        self.assertEqual((samples['new'], samples['duplicates'], samples['missing'], samples['invalid_rows']), (['new'], ['new'], ['gone'], [5]))
+        # Nothing written
+        self.assertEqual(Voter.objects.get(identifier='renamed').name, 'Old name')
+        self.assertFalse(VoterImportFile.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class ImportJobTests(TestCase):
+    def setUp(self):
+        self.institution = make_institution()
+        self.client = APIClient()
+        self.client.force_authenticate(self.institution.user)
+
+    def upload(self, content, query=''):
+        return self.client.post(
+            f'/api/institutions/{self.institution.id}/import_voters/{query}',
+            {'file': SimpleUploadedFile('voters.csv', content, content_type='text/csv')}, format='multipart',
+        )
+
+    def queued_import(self, content, **fields):
+        imp = VoterImportFile(institution=self.institution, **{'status': 'queued', **fields})
+        imp.file.save('voters.csv', ContentFile(content), save=False)
+        imp.save()
+        return imp
+
+    def test_background_request_runs_inline_without_worker(self):
+        response = self.upload(voters_csv(3), '?background=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(VoterImportFile.objects.get().status, 'done')
+
+    @override_settings(VOTER_IMPORT_WORKER=True)
+    def test_background_request_is_queued_when_a_worker_runs(self):
+        response = self.upload(voters_csv(3), '?background=true')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(VoterImportFile.objects.get(id=response.data['id']).status, 'queued')
+        self.assertFalse(Voter.objects.exists())
+
+    @override_settings(VOTER_IMPORT_BACKGROUND=True)
+    def test_background_setting_runs_inline_without_worker(self):
+        response = self.upload(voters_csv(3))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(VoterImportFile.objects.get().status, 'done')
+
+    @override_settings(VOTER_IMPORT_BACKGROUND=True, VOTER_IMPORT_WORKER=True)
+    def test_background_setting_queues_when_a_worker_runs(self):
+        response = self.upload(voters_csv(3))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(VoterImportFile.objects.get(id=response.data['id']).status, 'queued')
+
+    def test_worker_resumes_after_processed_rows(self):
+        # First 4 rows committed before the previous worker stopped
+        imp = self.queued_import(voters_csv(10), rows_processed=4, created=4)
+        Voter.objects.bulk_create([Voter(institution=self.institution, identifier=f'v{i}', import_file=imp) for i in range(4)])
+        job = claim_import_job()
+        self.assertEqual(job.id, imp.id)
+        stats = run_import_job(job, chunk_size=3, count_total=True)
+        imp.refresh_from_db()
+        self.assertEqual((stats.total_rows, stats.created, stats.updated), (10, 10, 0))
+        self.assertEqual((imp.status, imp.total_rows, imp.rows_processed), ('done', 10, 10))
+        self.assertEqual(Voter.objects.filter(import_file=imp).count(), 10)
+
+    def test_claim_skips_live_jobs_and_takes_over_stale_ones(self):
+        imp = self.queued_import(voters_csv(1), status='running', heartbeat_at=timezone.now())
+        self.assertIsNone(claim_import_job(stale_after=300))
+        VoterImportFile.objects.filter(id=imp.id).update(heartbeat_at=timezone.now() - timedelta(seconds=600))
+        self.assertEqual(claim_import_job(stale_after=300).id, imp.id)
+
+    def test_failed_import_is_marked(self):
+        imp = self.queued_import(b'\x00not,a\nvoter,file')
+        imp.file.delete(save=False)
+        self.assertIsNone(run_import_job(claim_import_job()))
+        imp.refresh_from_db()
+        self.assertEqual(imp.status, 'failed')
+        self.assertTrue(imp.error)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, AWS_S3_BUCKET_NAME=None, DELETE_CHUNK_PAUSE_MS=0)
+class ForceDeleteImportTests(TestCase):
+    def setUp(self):
+        voted_index.invalidate_voted_index()
+        self.addCleanup(voted_index.invalidate_voted_index)
+        self.institution = make_institution()
+        self.client = APIClient()
+        self.client.force_authenticate(self.institution.user)
+        self.client.post(
+            f'/api/institutions/{self.institution.id}/import_voters/',
+            {'file': SimpleUploadedFile('voters.csv', voters_csv(5), content_type='text/csv')}, format='multipart',
+        )
+        self.imp = VoterImportFile.objects.get()
+        self.election = make_election(self.institution)
+        self.candidate = Candidate.objects.create(election=self.election, name='A')
+        self.voter = Voter.objects.get(identifier='v0')
+        self.client.post('/api/votes/cast_vote/', {'election_id': self.election.id, 'voter_id': self.voter.id, 'candidate_id': self.candidate.id}, format='json')
+
+    def test_plain_delete_refuses_imports_with_votes(self):
+        response = self.client.post(f'/api/institutions/{self.institution.id}/imports/delete/', {'file_id': self.imp.id}, format='json')
+        self.assertEqual((response.status_code, response.data['blocked_count']), (400, 1))
+        self.assertEqual(Voter.objects.count(), 5)
+
+    def test_backup_then_chunked_purge(self):
+        with override_settings(DELETE_CHUNK_SIZE=2):
+            response = self.client.post(f'/api/institutions/{self.institution.id}/imports/force_delete/', {'file_id': self.imp.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data['backup_url'])
+        self.assertFalse(Voter.objects.exists() or Vote.objects.exists() or VoterImportFile.objects.exists())
+        self.assertEqual(election_tally(self.election.id).total, 0)
+
+        download = self.client.get(f'/api/institutions/{self.institution.id}/imports/backup/', {'name': response.data['backup_name']})
+        self.assertEqual(download.status_code, 200)
+        rows = list(csv.reader(gzip.decompress(b''.join(download.streaming_content)).decode().splitlines()))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1][:3], ['v0', 'Voter 0', 'True'])
+        self.assertEqual([vote['candidate_id'] for vote in json.loads(rows[1][4])], [self.candidate.id])
+        self.assertEqual(json.loads(rows[2][4]), [])
+
+    def test_backups_of_other_institutions_are_not_served(self):
+        other = make_institution('other')
+        for name in (f'backups/institution_{other.id}/x.csv.gz', f'backups/institution_{self.institution.id}/../institution_{other.id}/x.csv.gz'):
+            response = self.client.get(f'/api/institutions/{self.institution.id}/imports/backup/', {'name': name})
+            self.assertEqual(response.status_code, 404)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, DELETE_CHUNK_PAUSE_MS=0)
+class ChunkedDeleteTests(TestCase):
+    def setUp(self):
+        voted_index.invalidate_voted_index()
+        self.addCleanup(voted_index.invalidate_voted_index)
+        self.institution = make_institution()
+        self.election = make_election(self.institution)
+        self.candidates = [Candidate.objects.create(election=self.election, name=f'C{i}') for i in range(3)]
+        self.imp = VoterImportFile.objects.create(institution=self.institution, file='voter_imports/none.csv')
+        self.voters = [Voter.objects.create(institution=self.institution, identifier=f'v{i}', import_file=self.imp) for i in range(5)]
+        for voter, candidate in zip(self.voters, self.candidates * 2):
+            Vote.objects.create(election=self.election, candidate=candidate, voter=voter)
+        Election.objects.filter(id=self.election.id).update(finalized_winner=self.candidates[0])
+        self.election.refresh_from_db()
+        self.progress = []
+
+    def test_delete_election_detaches_votes(self):
+        counts = delete_election(self.election, chunk_size=2, progress=lambda *step: self.progress.append(step))
+        self.assertEqual(counts, {'candidates': 3, 'votes_detached': 5, 'tallies': 3})
+        self.assertEqual(self.progress, [('votes_detached', 2, 5), ('votes_detached', 4, 5), ('votes_detached', 5, 5), ('candidates', 3, 3)])
+        self.assertFalse(Election.objects.exists() or Candidate.objects.exists() or ElectionTally.objects.exists())
+        self.assertEqual(Vote.objects.filter(election=None, candidate=None).count(), 5)
+
+    def test_delete_election_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.institution.user)
+        self.assertEqual(client.delete(f'/api/elections/{self.election.id}/').status_code, 204)
+        self.assertFalse(Election.objects.exists())
+        self.assertEqual(Vote.objects.count(), 5)
+
+    def test_delete_import_removes_voters_and_votes(self):
+        other = Voter.objects.create(institution=self.institution, identifier='kept')
+        counts = delete_import(self.imp, chunk_size=2, pause=0, progress=lambda *step: self.progress.append(step))
+        self.assertEqual(counts, {'voters': 5, 'votes': 5})
+        self.assertEqual(self.progress, [('voters', 2, 5), ('voters', 4, 5), ('voters', 5, 5)])
+        self.assertEqual(list(Voter.objects.all()), [other])
+        self.assertEqual(election_tally(self.election.id).total, 0)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('delete_in_chunks', '--election', str(self.election.id), '--dry-run', stdout=out)
+        self.assertIn('candidates 3, votes_detached 5, tallies 3', out.getvalue())
+        self.assertTrue(Election.objects.exists())
+        call_command('delete_in_chunks', '--import', str(self.imp.id), '--chunk-size', '3', '--pause-ms', '0', stdout=out)
+        self.assertIn('voters: 3/5', out.getvalue())
+        self.assertFalse(Voter.objects.exists())
+        with self.assertRaises(CommandError):
+            call_command('delete_in_chunks', '--import', str(self.imp.id), stdout=out)
+
+
+class AutoCloseSchedulerTests(TestCase):
+    def setUp(self):
+        self.institution = make_institution()
+        self.now = timezone.now()
+        self.election = make_election(self.institution, end=self.now - timedelta(minutes=1))
+        self.schedule = EndTimeSchedule()
+        self.schedule.update(self.election.id, self.election.end, False)
+
+    def test_failed_close_keeps_elections_scheduled(self):
+        target = 'elections_app.management.commands.auto_close_elections.auto_close_elections'
+        with mock.patch(target, side_effect=OperationalError('database is locked')):
+            with self.assertRaises(OperationalError):
+                close_due(self.schedule, self.now)
+        self.assertEqual(self.schedule.next_end(), self.election.end)
+
+        self.assertEqual(close_due(self.schedule, self.now), [self.election.id])
+        self.assertIsNone(self.schedule.next_end())
+        self.election.refresh_from_db()
+        self.assertTrue(self.election.closed)
+        self.assertEqual(AuditLog.objects.filter(action='election_closed', election_id=self.election.id).count(), 1)
+
+    def test_rescheduled_end_replaces_the_old_one(self):
+        later = self.now + timedelta(hours=1)
+        self.schedule.update(self.election.id, later, False)
+        self.assertEqual(close_due(self.schedule, self.now), [])
+        self.assertEqual(self.schedule.next_end(), later)
+
+
+class AutoCloseElectionsTests(TestCase):
+    def setUp(self):
+        self.institution = make_institution()
+        self.now = timezone.now()
+        ended = self.now - timedelta(minutes=1)
+        self.first = make_election(self.institution, 'First', end=ended)
+        self.second = make_election(self.institution, 'Second', end=ended)
+
+    def audits(self):
+        return list(AuditLog.objects.filter(action='election_closed').order_by('election_id').values_list('election_id', flat=True))
+
+    def test_closes_and_audits_once(self):
+        self.assertEqual(sorted(auto_close_elections(now=self.now)), [self.first.id, self.second.id])
+        self.assertEqual(auto_close_elections(now=self.now), [])
+        self.assertEqual(self.audits(), [self.first.id, self.second.id])
+
+    def test_only_elections_closed_by_this_call_are_audited_and_returned(self):
+        # Another caller closed `first` after this one read the due list
+        stale_due = [(self.first.id, 'inst'), (self.second.id, 'inst')]
+        auto_close_elections(Election.objects.filter(id=self.first.id), now=self.now)
+        with mock.patch('elections_app.utils._due_elections', return_value=stale_due):
+            self.assertEqual(auto_close_elections(now=self.now), [self.second.id])
+        self.assertEqual(self.audits(), [self.first.id, self.second.id])
+
+
+class ElectionDescriptorTests(TestCase):
+    def setUp(self):
+        descriptors.invalidate_election_descriptor()
+        self.addCleanup(descriptors.invalidate_election_descriptor)
+        voted_index.invalidate_voted_index()
+        self.addCleanup(voted_index.invalidate_voted_index)
+        self.institution = make_institution()
+        self.election = make_election(self.institution)
+        self.candidate = Candidate.objects.create(election=self.election, name='A')
+        self.now = 1000.0
+        patcher = mock.patch.object(descriptors, 'time', SimpleNamespace(monotonic=lambda: self.now))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self):
+        return descriptors.get_election_descriptor(self.election.id)
+
+    @override_settings(ELECTION_DESCRIPTOR_TTL=5)
+    def test_cached_for_the_ttl_then_reloaded(self):
+        self.assertFalse(self.get().closed)
+        # queryset.update() sends no signal: only the TTL bounds how long this is missed
+        Election.objects.filter(id=self.election.id).update(closed=True)
+        self.now += 4
+        with self.assertNumQueries(0):
+            self.assertFalse(self.get().closed)
+        self.now += 1
+        self.assertTrue(self.get().closed)
+
+    @override_settings(ELECTION_DESCRIPTOR_TTL=60)
+    def test_election_and_candidate_writes_invalidate(self):
+        self.assertEqual(self.get().candidate_ids, {self.candidate.id})
+        other = Candidate.objects.create(election=self.election, name='B')
+        self.assertEqual(self.get().candidate_ids, {self.candidate.id, other.id})
+        self.election.closed = True
+        self.election.save()
+        self.assertTrue(self.get().closed)
+        other.delete()
+        self.assertEqual(self.get().candidate_ids, {self.candidate.id})
+        self.assertIsNone(descriptors.get_election_descriptor(self.election.id + 100))
+
+    @override_settings(ELECTION_DESCRIPTOR_TTL=60)
+    def test_load_racing_an_invalidation_is_not_cached(self):
+        build = descriptors._build
+
+        def build_then_invalidate(row, candidate_ids):
+            descriptor = build(row, candidate_ids)
+            descriptors.invalidate_election_descriptor(self.election.id)  # e.g. a save in another thread
+            return descriptor
+
+        with mock.patch.object(descriptors, '_build', build_then_invalidate):
+            self.get()
+        with self.assertNumQueries(2):
+            self.get()
+
+    @override_settings(ELECTION_DESCRIPTOR_TTL=60)
+    def test_votes_count_towards_the_round_on_the_election_row(self):
+        voters = [Voter.objects.create(institution=self.institution, identifier=f'v{i}') for i in range(2)]
+        client = APIClient()
+
+        def cast(voter):
+            data = {'election_id': self.election.id, 'voter_id': voter.id, 'candidate_id': self.candidate.id}
+            self.assertEqual(client.post('/api/votes/cast_vote/', data, format='json').status_code, 201)
+
+        cast(voters[0])
+        # Round advanced by another process: this one's descriptor is still warm
+        Election.objects.filter(id=self.election.id).update(current_round=2)
+        cast(voters[1])
+        rows = ElectionTally.objects.filter(election=self.election).order_by('round')
+        self.assertEqual(list(rows.values_list('round', 'votes')), [(1, 1), (2, 1)])
+
+
+class VotedIndexTests(TestCase):
+    def setUp(self):
+        voted_index.invalidate_voted_index()
+        self.addCleanup(voted_index.invalidate_voted_index)
+        institution = make_institution()
+        self.election = make_election(institution)
+        self.candidate = Candidate.objects.create(election=self.election, name='A')
+        self.voters = [Voter.objects.create(institution=institution, identifier=f'v{i}') for i in range(3)]
+
+    def vote(self, voter):
+        # Written directly, as another worker would: this process's index is not told
+        return Vote.objects.create(election=self.election, candidate=self.candidate, voter=voter)
+
+    def test_votes_committed_elsewhere_are_seen(self):
+        self.vote(self.voters[2])
+        self.assertFalse(voted_index.has_voted(self.election.id, self.voters[0].id))
+        self.vote(self.voters[0])
+        self.assertTrue(voted_index.has_voted(self.election.id, self.voters[0].id))
+        self.assertFalse(voted_index.has_voted(self.election.id, self.voters[1].id))
+
+    def test_known_voters_are_answered_from_memory(self):
+        self.vote(self.voters[0])
+        self.assertTrue(voted_index.has_voted(self.election.id, self.voters[0].id))
+        with self.assertNumQueries(0):
+            self.assertTrue(voted_index.has_voted(self.election.id, self.voters[0].id))
+            self.assertTrue(voted_index.known_voted(self.election.id, self.voters[0].id))
+        self.assertIsNone(voted_index.peek_voted(self.election.id, self.voters[1].id))
+        voted_index.mark_voted(self.election.id, self.voters[1].id)
+        self.assertTrue(voted_index.known_voted(self.election.id, self.voters[1].id))
+
+    def test_negatives_cost_one_query_and_never_scan_the_election(self):
+        for voter in self.voters[1:]:
+            self.vote(voter)
+        params = {'election_id': self.election.id, 'voter_id': self.voters[0].id}
+        self.assertEqual(self.client.get('/api/votes/has_voted/', params).json(), {'voted': False})
+        # With the election descriptor cached, a negative is one lookup...
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/votes/has_voted/', params).json(), {'voted': False})
+        # ...and the other voters were never loaded into memory.
+        self.assertIsNone(voted_index.peek_voted(self.election.id, self.voters[1].id))
+
+    def test_unknown_voters_are_not_found_from_the_same_query(self):
+        other = Voter.objects.create(institution=make_institution('Other'), identifier='x')
+        for voter_id in (other.id, 999999):
+            response = self.client.get('/api/votes/has_voted/', {'election_id': self.election.id, 'voter_id': voter_id})
+            self.assertEqual(response.status_code, 404)
+        self.assertIsNone(voted_index.has_voted(self.election.id, other.id, institution_id=self.election.institution_id))
+
+    def test_indexes_expire_after_max_age(self):
+        voted_index.mark_voted(self.election.id, self.voters[0].id)
+        with override_settings(VOTED_INDEX_MAX_AGE=0):
+            self.assertIsNone(voted_index.peek_voted(self.election.id, self.voters[0].id))
+        self.assertFalse(voted_index.has_voted(self.election.id, self.voters[0].id))
+
+
+class MaterializedTallyTests(TestCase):
+    def setUp(self):
+        voted_index.invalidate_voted_index()
+        self.addCleanup(voted_index.invalidate_voted_index)
+        self.institution = make_institution()
+        self.election = make_election(self.institution)
+        self.candidates = [Candidate.objects.create(election=self.election, name=f'C{i}') for i in range(2)]
+        self.voters = [Voter.objects.create(institution=self.institution, identifier=f'v{i}') for i in range(4)]
+        self.client = APIClient()
+
+    def cast(self, voter, candidate):
+        data = {'election_id': self.election.id, 'voter_id': voter.id, 'candidate_id': candidate.id if candidate else None}
+        return self.client.post('/api/votes/cast_vote/', data, format='json')
+
+    def test_cast_vote_increments_the_tally(self):
+        first, second = self.candidates
+        for voter, candidate in zip(self.voters, [first, first, second, None]):
+            self.assertEqual(self.cast(voter, candidate).status_code, 201)
+        self.assertEqual(self.cast(self.voters[0], second).status_code, 400)
+        self.assertEqual(tally_counts(self.election.id), {first.id: 2, second.id: 1, None: 1})
+        self.assertEqual(verify_election_tally(self.election.id), {})
+
+    def test_deleted_candidate_votes_become_null_votes(self):
+        first, second = self.candidates
+        for voter, candidate in zip(self.voters, [first, first, second]):
+            self.cast(voter, candidate)
+        first.delete()
+        self.assertEqual(tally_counts(self.election.id), {second.id: 1, None: 2})
+        self.assertEqual(verify_election_tally(self.election.id), {})
+
+    def test_deleted_voter_is_removed_from_the_tally(self):
+        self.client.force_authenticate(self.institution.user)
+        for voter in self.voters[:2]:
+            self.cast(voter, self.candidates[0])
+        self.assertEqual(self.client.delete(f'/api/voters/{self.voters[0].id}/').status_code, 204)
+        self.assertEqual(tally_counts(self.election.id), {self.candidates[0].id: 1})
+
+    @override_settings(RESULTS_CACHE_TTL=0)
+    def test_orm_vote_changes_keep_results_in_step(self):
+        first, second = self.candidates
+        for voter, candidate in zip(self.voters, [first, first, second]):
+            self.cast(voter, candidate)
+        # What VoterAdmin and VoteAdmin do: a voter deleted with its votes, a vote deleted, edited and added
+        self.voters[0].delete()
+        Vote.objects.filter(voter=self.voters[1]).delete()
+        vote = Vote.objects.get(voter=self.voters[2])
+        vote.candidate = None
+        vote.save()
+        Vote.objects.create(election=self.election, candidate=second, voter=self.voters[3])
+        self.client.force_authenticate(self.institution.user)
+        results = self.client.get(f'/api/elections/{self.election.id}/results/').data
+        self.assertEqual(results['total_votes'], 2)
+        self.assertEqual([c['votes'] for c in results['candidates']], [0, 1, 1])
+        self.assertEqual(verify_election_tally(self.election.id), {})
+
+    def test_rebuild_tallies_command(self):
+        for voter in self.voters[:3]:
+            self.cast(voter, self.candidates[1])
+        ElectionTally.objects.filter(election=self.election).update(votes=7)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_tallies', '--verify', stdout=StringIO())
+        call_command('rebuild_tallies', '--election', str(self.election.id), stdout=StringIO())
+        self.assertEqual(tally_counts(self.election.id), {self.candidates[1].id: 3})
+        call_command('rebuild_tallies', '--verify', stdout=StringIO())
+
+
+class ResultsCacheTests(TestCase):
+    def setUp(self):
+        results_cache.invalidate_results()
+        self.addCleanup(results_cache.invalidate_results)
+        voted_index.invalidate_voted_index()
+        self.addCleanup(voted_index.invalidate_voted_index)
+        self.institution = make_institution()
+        self.election = make_election(self.institution)
+        self.candidate = Candidate.objects.create(election=self.election, name='A')
+        self.voters = [Voter.objects.create(institution=self.institution, identifier=f'v{i}') for i in range(3)]
+        self.client = APIClient()
+        self.now = 1000.0
+        patcher = mock.patch.object(results_cache, 'time', SimpleNamespace(monotonic=lambda: self.now))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.computed = 0
+
+    def compute(self):
+        self.computed += 1
+        return {'votes': Vote.objects.filter(election=self.election).count()}
+
+    def get(self):
+        return results_cache.get_cached_results(self.election.id, self.compute)
+
+    def cast(self, voter):
+        data = {'election_id': self.election.id, 'voter_id': voter.id, 'candidate_id': self.candidate.id}
+        self.assertEqual(self.client.post('/api/votes/cast_vote/', data, format='json').status_code, 201)
+
+    @override_settings(RESULTS_CACHE_TTL=2, RESULTS_CACHE_MAX_STALE=30)
+    def test_fresh_entries_are_served_without_queries(self):
+        payload, etag = self.get()
+        self.now += 1
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(), (payload, etag))
+        self.assertEqual(self.computed, 1)
+
+    @override_settings(RESULTS_CACHE_TTL=2, RESULTS_CACHE_MAX_STALE=30)
+    def test_stale_entries_are_recomputed_once_and_served_meanwhile(self):
+        stale = self.get()
+        self.cast(self.voters[0])
+        self.now += 5
+        during = []
+
+        def compute():
+            # A request arriving while the refresh runs gets the stale payload
+            during.append(self.get())
+            return self.compute()
+
+        fresh = results_cache.get_cached_results(self.election.id, compute)
+        self.assertEqual(during, [stale])
+        self.assertEqual(fresh[0], {'votes': 1})
+        self.assertNotEqual(fresh[1], stale[1])
+        self.assertEqual(self.computed, 2)
+        self.assertEqual(self.get(), fresh)
+        self.assertEqual(self.computed, 2)
+
+    @override_settings(RESULTS_CACHE_TTL=2, RESULTS_CACHE_MAX_STALE=30)
+    def test_unchanged_version_is_restamped_not_recomputed(self):
+        payload = self.get()
+        self.now += 5
+        self.assertEqual(self.get(), payload)
+        self.assertEqual(self.computed, 1)
+        self.now += 1
+        with self.assertNumQueries(0):
+            self.get()
+
+    @override_settings(RESULTS_CACHE_TTL=2, RESULTS_CACHE_MAX_STALE=30)
+    def test_cast_vote_shows_in_results_once_the_entry_is_stale(self):
+        self.client.force_authenticate(self.institution.user)
+        url = f'/api/elections/{self.election.id}/results/'
+        before = self.client.get(url)
+        self.cast(self.voters[0])
+        # Within the TTL the cached payload is served as is...
+        self.assertEqual(self.client.get(url)['ETag'], before['ETag'])
+        # ...and the moved tally version triggers a recompute right after.
+        self.now += 2
+        after = self.client.get(url)
+        self.assertEqual((before.data['total_votes'], after.data['total_votes']), (0, 1))
+        self.assertNotEqual(after['ETag'], before['ETag'])
+
+    @override_settings(RESULTS_CACHE_TTL=2, RESULTS_CACHE_MAX_STALE=30)
+    def test_election_changes_drop_the_entry(self):
+        self.get()
+        self.candidate.name = 'B'
+        self.candidate.save()
+        self.get()
+        self.assertEqual(self.computed, 2)
+
+
+@override_settings(RESULTS_CACHE_TTL=0)
+class ElectionTallyTests(TestCase):
+    def setUp(self):
+        voted_index.invalidate_voted_index()
+        self.addCleanup(voted_index.invalidate_voted_index)
+        self.institution = make_institution()
+        self.client = APIClient()
+        self.client.force_authenticate(self.institution.user)
+        self.voter_count = 0
+
+    def make_voted_election(self, votes, null_votes=0):
+        """Election with one candidate per entry of `votes`; the Vote receivers fill the tally rows."""
+        election = make_election(self.institution, scrutin_type='majoritaire_2tours')
+        candidates = [Candidate.objects.create(election=election, name=f'C{i}') for i in range(len(votes))]
+        for candidate_id, n in [(c.id, n) for c, n in zip(candidates, votes)] + [(None, null_votes)]:
+            for _ in range(n):
+                self.voter_count += 1
+                voter = Voter.objects.create(institution=self.institution, identifier=f'v{self.voter_count}')
+                Vote.objects.create(election=election, candidate_id=candidate_id, voter=voter)
+        return election, candidates
+
+    def queries(self, func):
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        return len(ctx.captured_queries)
+
+    def test_tally_reads_the_materialized_rows(self):
+        election, candidates = self.make_voted_election([3, 1], null_votes=2)
+        with self.assertNumQueries(1):
+            tally = election_tally(election.id)
+        self.assertEqual((tally.votes_for(candidates[0].id), tally.votes_for(candidates[1].id), tally.null_votes, tally.total), (3, 1, 2, 6))
+        # Without tally rows: one extra GROUP BY over Vote, same counts
+        ElectionTally.objects.filter(election=election).delete()
+        with self.assertNumQueries(2):
+            self.assertEqual(election_tally(election.id), tally)
+
+    def test_results_queries_do_not_grow_with_candidates(self):
+        small, _ = self.make_voted_election([1, 1])
+        large, candidates = self.make_voted_election([5, 1, 0, 2, 3, 1, 4], null_votes=1)
+        expected = self.queries(lambda: self.client.get(f'/api/elections/{small.id}/results/'))
+        with self.assertNumQueries(expected):
+            response = self.client.get(f'/api/elections/{large.id}/results/')
+        self.assertEqual(response.data['total_votes'], 17)
+        votes = {c['candidate_id']: c['votes'] for c in response.data['candidates']}
+        self.assertEqual(votes, {**{c.id: n for c, n in zip(candidates, [5, 1, 0, 2, 3, 1, 4])}, None: 1})
+        self.assertEqual(response.data['status'], 'second_round_required')
+
+    def test_round2_top_two_queries_do_not_grow_with_candidates(self):
+        small, _ = self.make_voted_election([2, 1])
+        large, candidates = self.make_voted_election([1, 4, 0, 2, 3, 1])
+        advance = lambda election: self.client.post(f'/api/elections/{election.id}/advance_to_round2/', {'create_new_election': True}, format='json')
+        expected = self.queries(lambda: advance(small))
+        with self.assertNumQueries(expected):
+            response = advance(large)
+        self.assertEqual(response.status_code, 201)
+        names = set(Candidate.objects.filter(election_id=response.data['new_election_id']).values_list('name', flat=True))
+        self.assertEqual(names, {candidates[1].name, candidates[4].name})
+
+    def test_candidate_serializer_shares_one_tally_per_election(self):
+        election, candidates = self.make_voted_election([2, 0, 1, 3])
+        with self.assertNumQueries(1):
+            data = CandidateSerializer(candidates, many=True).data
+        self.assertEqual([c['vote_count'] for c in data], [2, 0, 1, 3])
+        with self.assertNumQueries(1):
+            data = CandidateSerializer(CandidateSerializer.prepare_queryset(Candidate.objects.filter(election=election).order_by('id')), many=True).data
+        self.assertEqual([c['vote_count'] for c in data], [2, 0, 1, 3])
+
+
+class ElectionListTests(TestCase):
+    def setUp(self):
+        self.institution = make_institution()
+        self.client = APIClient()
+        self.client.force_authenticate(self.institution.user)
+
+    def add_election(self, title, candidates=3, winner=False):
+        election = make_election(self.institution, title=title)
+        created = [Candidate.objects.create(election=election, name=f'{title} C{i}') for i in range(candidates)]
+        voter = Voter.objects.create(institution=self.institution, identifier=f'{title}-voter')
+        Vote.objects.create(election=election, candidate=created[0], voter=voter)
+        if winner:
+            Election.objects.filter(id=election.id).update(finalized_winner=created[0])
+        return election
+
+    def list_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/elections/')
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.data
+
+    def test_list_queries_do_not_grow_with_elections(self):
+        self.add_election('E0', winner=True)
+        one, data = self.list_queries()
+        self.assertEqual(len(data), 1)
+        for i in range(1, 6):
+            self.add_election(f'E{i}', candidates=i + 1, winner=i % 2 == 0)
+        with self.assertNumQueries(one):
+            response = self.client.get('/api/elections/')
+        self.assertEqual(len(response.data), 6)
+        for election in response.data:
+            self.assertEqual(election['voted_voters_count'], 1)
+            self.assertEqual(election['candidates'][0]['vote_count'], 1)
+
+    def test_retrieve_queries_do_not_grow_with_candidates(self):
+        small = self.add_election('E0', candidates=2, winner=True)
+        election = self.add_election('E1', candidates=8, winner=True)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(f'/api/elections/{small.id}/')
+        with self.assertNumQueries(len(ctx.captured_queries)):
+            response = self.client.get(f'/api/elections/{election.id}/')
+        self.assertEqual(len(response.data['candidates']), 8)
+        self.assertEqual(response.data['finalized_winner']['vote_count'], 1)
+        self.assertEqual(response.data['voted_voters_count'], 1)
+
+    @override_settings(RESULTS_CACHE_TTL=0)
+    def test_counts_fall_back_to_votes_like_results(self):
+        election = self.add_election('E0')
+        voter = Voter.objects.create(institution=self.institution, identifier='E0-null-voter')
+        Vote.objects.create(election=election, candidate=None, voter=voter)
+        # Votes stored without tally rows (e.g. before rebuild_tallies ran)
+        ElectionTally.objects.filter(election=election).delete()
+        results = self.client.get(f'/api/elections/{election.id}/results/').data
+        for data in (self.client.get('/api/elections/').data[0], self.client.get(f'/api/elections/{election.id}/').data):
+            self.assertEqual(data['voted_voters_count'], results['total_votes'])
+            self.assertEqual([c['vote_count'] for c in data['candidates']], [c['votes'] for c in results['candidates'][:-1]])
+        self.assertEqual(results['total_votes'], 2)
+
+
+@override_settings(AUDIT_BUFFERED=True)
+class BufferedAuditTests(TestCase):
+    def setUp(self):
+        # Driven by hand: no background thread
+        self.writer = BufferedAuditWriter(flush_size=2, flush_interval=0.05)
+        self.writer._ensure_thread = lambda: None
+        patcher = mock.patch('elections_app.audit.get_audit_writer', return_value=self.writer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_entries_are_queued_after_commit_and_written_in_batches(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(3):
+                record_audit('polled', actor=f'user{i}')
+        self.assertFalse(AuditLog.objects.exists())
+        batch, stop = self.writer._collect()
+        self.assertEqual((len(batch), stop), (2, False))
+        self.writer._write(batch)
+        self.assertEqual(AuditLog.objects.count(), 2)
+        self.writer.shutdown()
+        self.assertEqual(sorted(AuditLog.objects.values_list('actor', flat=True)), ['user0', 'user1', 'user2'])
+
+    def test_rolled_back_actions_are_not_logged(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError), transaction.atomic():
+                record_audit('rolled_back')
+                raise ValueError
+        self.writer.shutdown()
+        self.assertFalse(AuditLog.objects.exists())
+
+    def test_durable_entries_are_written_inline(self):
+        record_audit('election_closed', detail={'election_id': 1}, durable=True)
+        self.assertEqual(AuditLog.objects.get().action, 'election_closed')
+
+    def test_failed_batch_is_retried_row_by_row(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            record_audit('first')
+            record_audit('second')
+        with mock.patch.object(AuditLog.objects, 'bulk_create', side_effect=OperationalError('locked')), self.assertLogs('elections_app.audit', 'ERROR'):
+            self.writer.shutdown()
+        self.assertEqual(AuditLog.objects.count(), 2)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class AuditLogRefsTests(TestCase):
+    def test_save_and_bulk_create_fill_the_ref_columns(self):
+        saved = AuditLog.objects.create(action='a', detail={'election_id': '7', 'institution_id': 3})
+        AuditLog.objects.bulk_create([
+            AuditLog(action='b', detail={'election_id': 8}),
+            AuditLog(action='c', detail={'election_id': 'x', 'institution_id': None}),
+            AuditLog(action='d', detail=['election_id']),
+            AuditLog(action='e', detail={'election_id': 9}, election_id=1),
+        ])
+        self.assertEqual((saved.election_id, saved.institution_id), (7, 3))
+        self.assertEqual(
+            list(AuditLog.objects.order_by('action').values_list('action', 'election_id', 'institution_id')),
+            [('a', 7, 3), ('b', 8, None), ('c', None, None), ('d', None, None), ('e', 1, None)],
+        )
+
+    def test_migration_backfills_existing_rows(self):
+        migration = importlib.import_module('elections_app.migrations.0004_auditlog_refs')
+        AuditLog.objects.bulk_create([
+            AuditLog(action='a', detail={'election_id': 5, 'institution_id': '2'}),
+            AuditLog(action='b', detail={'institution_id': 4}),
+            AuditLog(action='c', detail=None),
+            AuditLog(action='d', detail={'election_id': 'nope'}),
+        ])
+        # As the rows were before the columns existed
+        AuditLog.objects.update(election_id=None, institution_id=None)
+        migration.backfill_refs(apps, None)
+        self.assertEqual(
+            list(AuditLog.objects.order_by('action').values_list('action', 'election_id', 'institution_id')),
+            [('a', 5, 2), ('b', None, 4), ('c', None, None), ('d', None, None)],
+        )
+
+    def test_voters_summary_reads_the_institutions_last_import(self):
+        institution = make_institution()
+        other = make_institution('other')
+        client = APIClient()
+        client.force_authenticate(institution.user)
+        response = client.post(
+            f'/api/institutions/{institution.id}/import_voters/',
+            {'file': SimpleUploadedFile('voters.csv', voters_csv(3), content_type='text/csv')}, format='multipart',
+        )
+        self.assertEqual(response.status_code, 200)
+        Voter.objects.filter(id=Voter.objects.filter(institution=institution).first().id).update(eligible=False)
+        Voter.objects.create(institution=other, identifier='elsewhere')
+        # Newer, same actor name, but about another institution
+        AuditLog.objects.create(action='voters_imported', actor=institution.user.username, detail={'institution_id': other.id, 'created': 99})
+        summary = client.get('/api/institutions/voters_summary/').data
+        self.assertEqual((summary['total_voters'], summary['eligible_voters']), (3, 2))
+        self.assertEqual(summary['last_import']['detail']['created'], 3)
+        self.assertEqual(summary['last_import']['detail']['institution_id'], institution.id)
+
+
+class MyInstitutionTests(TestCase):
+    def setUp(self):
+        self.institution = make_institution()
+        self.client = APIClient()
+        self.client.force_authenticate(self.institution.user)
+
+    def test_polling_writes_no_audit_entry(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get('/api/institutions/my_institution/').status_code, 200)
+        self.assertFalse(AuditLog.objects.exists())
+        summary = self.client.get('/api/institutions/voters_summary/')
+        self.assertIsNone(summary.data['last_import'])
+
+    def test_not_modified_before_any_other_query(self):
+        first = self.client.get('/api/institutions/my_institution/')
+        self.assertEqual(first.data['name'], self.institution.name)
+        with self.assertNumQueries(1):  # the institution lookup
+            response = self.client.get('/api/institutions/my_institution/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        self.client.patch('/api/institutions/my_institution/', {'name': 'Renamed'}, format='json')
+        response = self.client.get('/api/institutions/my_institution/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], 'Renamed')
+
+
+@override_settings(RESULTS_CACHE_TTL=0)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        voted_index.invalidate_voted_index()
+        self.addCleanup(voted_index.invalidate_voted_index)
+        self.institution = make_institution()
+        self.election = make_election(self.institution)
+        self.candidate = Candidate.objects.create(election=self.election, name='A')
+        self.voters = [Voter.objects.create(institution=self.institution, identifier=f'v{i}') for i in range(2)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.institution.user)
+        self.urls = [
+            '/api/elections/',
+            f'/api/elections/{self.election.id}/results/',
+            f'/api/elections/{self.election.id}/timeline/',
+        ]
+
+    def etags(self, previous=None):
+        """GET every URL (revalidating against `previous` when given); return the new ETags."""
+        etags = []
+        for i, url in enumerate(self.urls):
+            headers = {'HTTP_IF_NONE_MATCH': previous[i]} if previous else {}
+            response = self.client.get(url, **headers)
+            self.assertEqual(response.status_code, 200, url)
+            etags.append(response['ETag'])
+        return etags
+
+    def assert_not_modified(self, etags):
+        for url, etag in zip(self.urls, etags):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304, url)
+
+    def test_matching_etag_gets_not_modified(self):
+        self.assert_not_modified(self.etags())
+
+    def test_vote_changes_the_etags(self):
+        before = self.etags()
+        data = {'election_id': self.election.id, 'voter_id': self.voters[0].id, 'candidate_id': self.candidate.id}
+        self.assertEqual(self.client.post('/api/votes/cast_vote/', data, format='json').status_code, 201)
+        after = self.etags(previous=before)
+        for url, old, new in zip(self.urls, before, after):
+            self.assertNotEqual(old, new, url)
+        self.assert_not_modified(after)
+
+    def test_candidate_edit_changes_the_etags(self):
+        before = self.etags()
+        response = self.client.patch(f'/api/candidates/{self.candidate.id}/', {'name': 'B'}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        after = self.etags(previous=before)
+        for url, old, new in zip(self.urls, before, after):
+            self.assertNotEqual(old, new, url)
+
+
+class PaginationTests(TestCase):
+    def setUp(self):
+        self.institution = make_institution()
+        self.client = APIClient()
+        self.client.force_authenticate(self.institution.user)
+        self.imp = VoterImportFile.objects.create(institution=self.institution, file='voter_imports/none.csv')
+        self.voters = [
+            Voter.objects.create(institution=self.institution, identifier=f'{prefix}{i}', eligible=i % 2 == 0, import_file=self.imp if i < 3 else None)
+            for i, prefix in enumerate(['a', 'a', 'b', 'b', 'b', 'c', 'c'])
+        ]
+
+    def walk(self, url):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [row['id'] for row in response.data['results']]
+            url, pages = response.data['next'], pages + 1
+        return ids, pages
+
+    def test_listings_stay_plain_arrays_without_paging_params(self):
+        response = self.client.get('/api/voters/')
+        self.assertEqual([row['id'] for row in response.data], [v.id for v in self.voters])
+        self.assertIsInstance(self.client.get('/api/elections/').data, list)
+
+    def test_voter_pages_in_id_order(self):
+        ids, pages = self.walk('/api/voters/?page_size=3')
+        self.assertEqual((ids, pages), ([v.id for v in self.voters], 3))
+
+    def test_pages_cost_the_same_at_any_depth(self):
+        with CaptureQueriesContext(connection) as ctx:
+            first = self.client.get('/api/voters/?page_size=2')
+        expected = len(ctx.captured_queries)
+        third = self.client.get(first.data['next']).data['next']
+        with self.assertNumQueries(expected) as deep:
+            self.client.get(third)
+        # A keyset condition, not an OFFSET
+        self.assertFalse(any('OFFSET' in q['sql'] for q in deep.captured_queries))
+
+    def test_voter_filters(self):
+        def listed(query):
+            return [row['identifier'] for row in self.client.get(f'/api/voters/?{query}').data]
+
+        self.assertEqual(listed('eligible=true'), ['a0', 'b2', 'b4', 'c6'])
+        self.assertEqual(listed(f'import_file={self.imp.id}'), ['a0', 'a1', 'b2'])
+        self.assertEqual(listed('import_file=none&eligible=false'), ['b3', 'c5'])
+        self.assertEqual(listed('identifier_prefix=b'), ['b2', 'b3', 'b4'])
+
+    def test_elections_and_imports_page_newest_first(self):
+        elections = [make_election(self.institution, title=f'E{i}') for i in range(3)]
+        ids, pages = self.walk('/api/elections/?page_size=2')
+        self.assertEqual((ids, pages), ([e.id for e in reversed(elections)], 2))
+        second = VoterImportFile.objects.create(institution=self.institution, file='voter_imports/other.csv')
+        response = self.client.get(f'/api/institutions/{self.institution.id}/imports/?page_size=1')
+        self.assertEqual([row['id'] for row in response.data['imports']], [second.id])
+        self.assertIsNotNone(response.data['next'])
+
+
+class VoterAdminSearchTests(TestCase):
+    def setUp(self):
+        self.first = make_institution('first')
+        self.second = make_institution('second')
+        for institution in (self.first, self.second):
+            Voter.objects.bulk_create([
+                Voter(institution=institution, identifier=f'{institution.user.username}-{i}', name=f'Dupont {i}') for i in range(4)
+            ])
+        self.admin = VoterAdmin(Voter, admin.site)
+
+    def result_count(self, q, **params):
+        request = RequestFactory().get('/admin/elections_app/voter/', {'q': q, **params})
+        queryset, _ = self.admin.get_search_results(request, Voter.objects.all(), q)
+        return queryset.count()
+
+    def test_indexed_search(self):
+        self.assertEqual(self.result_count(q='dupont'), 8)
+        self.assertEqual(self.result_count(q='first-'), 4)
+
+    def test_scoped_to_the_filtered_institution(self):
+        with mock.patch('elections_app.institution.admin.MAX_SEARCH_LIMIT', 5):
+            self.assertEqual(self.result_count(q='dupont', institution__id__exact=self.second.id), 4)
+
+    def test_falls_back_to_a_full_search_when_the_limit_is_reached(self):
+        with mock.patch('elections_app.institution.admin.MAX_SEARCH_LIMIT', 5):
+            self.assertEqual(self.result_count(q='dupont'), 8)
+
+
+class VoterSearchTests(TestCase):
+    def setUp(self):
+        self.institution = make_institution()
+        self.other = make_institution('other')
+        names = ['Jean Kabila', 'Marie Tshisekedi', 'Pierre Mukendi']
+        self.voters = Voter.objects.bulk_create([
+            Voter(institution=self.institution, identifier=f'MAT{i:04d}', name=name) for i, name in enumerate(names)
+        ])
+        Voter.objects.create(institution=self.other, identifier='MAT0001', name='Marie Other')
+
+    def search(self, query, **kwargs):
+        identifiers = Voter.objects.in_bulk(search_voter_ids(query, institution_id=self.institution.id, **kwargs))
+        return sorted(voter.identifier for voter in identifiers.values())
+
+    def test_backend(self):
+        self.assertIn(search_backend(), ('fts5', 'trigram'))
+
+    def test_substring_on_identifier_and_name(self):
+        self.assertEqual(self.search('tshisek'), ['MAT0001'])
+        self.assertEqual(self.search('T000'), ['MAT0000', 'MAT0001', 'MAT0002'])
+        self.assertEqual(self.search('MA'), ['MAT0000', 'MAT0001', 'MAT0002'])  # short: identifier prefix
+
+    def test_fuzzy(self):
+        self.assertEqual(self.search('Tshisekdi'), [])
+        self.assertEqual(self.search('Tshisekdi', fuzzy=True), ['MAT0001'])
+
+    def test_index_follows_edits_and_raw_deletes(self):
+        voter = Voter.objects.get(institution=self.institution, identifier='MAT0002')
+        voter.name = 'Zorglub'
+        voter.save()
+        self.assertEqual(self.search('zorglub'), ['MAT0002'])
+        self.assertEqual(self.search('mukendi'), [])
+        raw_delete(Voter, 'id', [voter.id])
+        self.assertEqual(self.search('zorglub'), [])
+
+    def test_api(self):
+        client = APIClient()
+        client.force_authenticate(self.institution.user)
+        response = client.get('/api/voters/search/', {'q': 'marie'})
+        self.assertEqual([v['identifier'] for v in response.data['results']], ['MAT0001'])
+        self.assertEqual(client.get('/api/voters/search/').status_code, 400)
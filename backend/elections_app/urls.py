@@ -3,7 +3,7 @@ from django.urls import path, include
 from elections_app.views import (
     InstitutionViewSet, ElectionViewSet, CandidateViewSet, 
     VoterViewSet, VoteViewSet,
-    institution_register, institution_login, voter_login,
+    institution_register, institution_login, voter_login, service_metrics,
 )
 # Verification-related views removed from URL config (verification disabled)
 
@@ -20,4 +20,5 @@ urlpatterns = [
     path('auth/institution/register/', institution_register, name='institution_register'),
     path('auth/institution/login/', institution_login, name='institution_login'),
     path('auth/voter/login/', voter_login, name='voter_login'),
+    path('metrics/', service_metrics, name='service_metrics'),
 ]
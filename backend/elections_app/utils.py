@@ -1,53 +1,121 @@
+from django.conf import settings
 from django.utils import timezone
 
-def auto_close_election(election):
-    """If an election has an end datetime that is past, ensure it's recorded as closed.
 
-    This function is idempotent: it will create a single AuditLog entry for
-    'election_closed' if one does not already exist for this election.
-    Returns True if the election is considered closed (end reached), False otherwise.
-    """
+def as_aware(value):
+    """Return `value` as an aware datetime (naive values use the current timezone)."""
     try:
-        if not election or not getattr(election, 'end', None):
-            return False
-        now = timezone.now()
-        end = election.end
-        # If the stored end is naive, make it aware using current timezone
-        try:
-            if end and timezone.is_naive(end):
-                end = timezone.make_aware(end, timezone.get_current_timezone())
-        except Exception:
-            # if any problem, fall back to comparing directly
-            end = election.end
-
-        if now < end:
-            return False
-
-        # Lazy import to avoid circular imports
-        from elections_app.models import AuditLog
-
-        # Mark election as closed (persistent flag) and create an AuditLog if needed
-        try:
-            if not getattr(election, 'closed', False):
-                election.closed = True
-                election.save()
-        except Exception:
-            # ignore save errors to avoid breaking callers
-            pass
-
-        exists = AuditLog.objects.filter(action='election_closed', detail__election_id=election.id).exists()
-        if not exists:
-            actor = None
-            try:
-                actor = election.institution.user.username
-            except Exception:
-                actor = None
-            try:
-                # Mirror manual close payload by including a 'closed' list for compatibility
-                AuditLog.objects.create(action='election_closed', actor=actor, detail={'election_id': election.id, 'closed': [election.id]})
-            except Exception:
-                # swallow to avoid affecting user-facing endpoints
-                pass
-        return True
+        if value and timezone.is_naive(value):
+            return timezone.make_aware(value, timezone.get_current_timezone())
     except Exception:
-        return False
+        pass
+    return value
+
+
+def election_window_open(start, end, now=None):
+    """Return True when `now` falls within an election's voting window.
+
+    Same rules as `ElectionSerializer.get_is_open`:
+    - If start and end present: open when start <= now < end (end exclusive)
+    - If start present and no end: open when start <= now
+    - Otherwise (including end-only): treat as closed
+    """
+    now = now or timezone.now()
+    start = as_aware(start)
+    end = as_aware(end)
+    if start and end:
+        return start <= now < end
+    if start and not end:
+        return start <= now
+    return False
+
+def auto_close_on_read():
+    """Whether requests should close ended elections themselves.
+
+    False when `manage.py auto_close_elections` runs as a scheduler
+    (`settings.ELECTION_AUTO_CLOSE_ON_READ`). Voting never depends on it: an
+    election past its end is treated as closed either way.
+    """
+    return getattr(settings, 'ELECTION_AUTO_CLOSE_ON_READ', True)
+
+
+def _due_elections(queryset, now):
+    """`(id, owner username)` of the open elections of `queryset` whose end has passed."""
+    return list(
+        queryset.filter(end__isnull=False, end__lte=now, closed=False)
+        .order_by()
+        .values_list('id', 'institution__user__username')
+    )
+
+
+def auto_close_elections(queryset=None, now=None):
+    """Close every election of `queryset` (default: all) whose end has passed.
+
+    One SELECT finds the due elections; when there are any, each is closed by
+    a conditional UPDATE (`closed=False` -> True) inside one transaction and
+    the missing 'election_closed' AuditLog rows are bulk-created. Only the
+    elections whose UPDATE changed a row are audited and returned, so
+    concurrent callers (an on-read close and the scheduler) never both claim
+    the same election. On PostgreSQL the due rows are locked first
+    (`select_for_update`); SQLite serializes the UPDATEs on its write lock.
+
+    The closing is one UPDATE per due election rather than a single
+    `UPDATE ... WHERE id IN (...) AND NOT closed RETURNING id` because the
+    per-row count is what tells this caller which elections it closed.
+    `QuerySet.update()` only returns the total number of rows; RETURNING
+    would need raw SQL, and is not available everywhere: SQLite only has it
+    from 3.35 and MySQL not at all. Without it, a set-based UPDATE that
+    changed fewer rows than expected cannot say which elections a
+    concurrent caller took, so audits would be duplicated or lost. Only a
+    handful of elections fall due at once, and each UPDATE is a primary-key
+    write in the same transaction, so the loop is cheap.
+
+    The UPDATEs bypass model signals, so cached descriptors and results are
+    invalidated explicitly once the transaction commits.
+    Returns the ids of the elections this call closed.
+    """
+    # Lazy imports to avoid circular imports
+    from django.db import connection, transaction
+    from elections_app.descriptors import invalidate_election_descriptor
+    from elections_app.models import AuditLog, Election
+    from elections_app.results_cache import invalidate_results
+
+    now = now or timezone.now()
+    queryset = Election.objects.all() if queryset is None else queryset
+    due = _due_elections(queryset, now)
+    if not due:
+        return []
+
+    with transaction.atomic():
+        if connection.features.has_select_for_update:
+            # A concurrent caller waits here, then finds the elections closed.
+            # Skipped on SQLite, where a read before the first write would make
+            # the transaction fail instead of waiting for the write lock.
+            list(
+                Election.objects.select_for_update(of=('self',))
+                .filter(id__in=[election_id for election_id, _ in due]).values_list('id', flat=True)
+            )
+        closed = [
+            (election_id, actor) for election_id, actor in due
+            if Election.objects.filter(id=election_id, closed=False).update(closed=True, updated_at=now)
+        ]
+        ids = [election_id for election_id, _ in closed]
+        audited = set(
+            AuditLog.objects.filter(action='election_closed', election_id__in=ids)
+            .values_list('election_id', flat=True)
+        )
+        AuditLog.objects.bulk_create([
+            # Mirror manual close payload by including a 'closed' list for compatibility
+            AuditLog(action='election_closed', actor=actor, detail={'election_id': election_id, 'closed': [election_id]})
+            for election_id, actor in closed
+            if election_id not in audited
+        ])
+
+    def invalidate():
+        for election_id in ids:
+            invalidate_election_descriptor(election_id)
+            invalidate_results(election_id)
+
+    if ids:
+        transaction.on_commit(invalidate)
+    return ids
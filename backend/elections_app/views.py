@@ -4,6 +4,7 @@
 from elections_app.institution.views import (
     institution_register,
     institution_login,
+    service_metrics,
     InstitutionViewSet,
     ElectionViewSet,
     CandidateViewSet,
@@ -17,6 +18,6 @@ from elections_app.voter.views import (
 )
 
 __all__ = [
-    'institution_register', 'institution_login', 'voter_login',
+    'institution_register', 'institution_login', 'voter_login', 'service_metrics',
     'InstitutionViewSet', 'ElectionViewSet', 'CandidateViewSet', 'VoterViewSet', 'VoteViewSet'
 ]
@@ -0,0 +1,155 @@
+"""Per-election in-memory index of voters who already voted.
+
+`has_voted` and the duplicate pre-check in `cast_vote` consult a compact
+bitmap keyed by voter id instead of querying the Vote table. An election's
+index is never loaded with a scan of Vote: it holds the votes this process
+recorded and the ones a database lookup found, so no request pays for
+reading a whole election.
+
+Only positive answers come from memory. A voter missing from the bitmap may
+have voted through another worker, so every negative answer costs one
+lookup on the ('election', 'voter') unique index (on the `voter_id` path the
+same query also checks that the voter exists). Vote ids are not a usable
+watermark for answering negatives from memory: on PostgreSQL they are
+assigned before commit, so a lower id can become visible after a higher one.
+Indexes are dropped after `settings.VOTED_INDEX_MAX_AGE` seconds, which
+bounds how long a vote deleted by another process is still reported.
+
+The ('election', 'voter') unique constraint remains the final authority:
+the index only ever short-circuits requests, it never admits a vote.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Exists
+
+# Voter ids are grouped in containers of 2**16 ids (8 KiB each), roaring-style,
+# so sparse id ranges stay compact.
+_CONTAINER_BITS = 16
+_CONTAINER_MASK = (1 << _CONTAINER_BITS) - 1
+_CONTAINER_BYTES = (1 << _CONTAINER_BITS) // 8
+
+
+class VoterBitmap:
+    """Set of non-negative integer ids stored as fixed-size bitmap containers."""
+
+    __slots__ = ('_containers', '_count')
+
+    def __init__(self):
+        self._containers = {}
+        self._count = 0
+
+    def add(self, voter_id):
+        key, offset = voter_id >> _CONTAINER_BITS, voter_id & _CONTAINER_MASK
+        container = self._containers.get(key)
+        if container is None:
+            container = self._containers[key] = bytearray(_CONTAINER_BYTES)
+        byte, bit = offset >> 3, 1 << (offset & 7)
+        if not container[byte] & bit:
+            container[byte] |= bit
+            self._count += 1
+
+    def __contains__(self, voter_id):
+        container = self._containers.get(voter_id >> _CONTAINER_BITS)
+        if container is None:
+            return False
+        offset = voter_id & _CONTAINER_MASK
+        return bool(container[offset >> 3] & (1 << (offset & 7)))
+
+    def __len__(self):
+        return self._count
+
+
+class ElectionVotedIndex:
+    """Voters known to have voted in one election."""
+
+    def __init__(self, election_id):
+        self.election_id = election_id
+        self.bitmap = VoterBitmap()
+        self.created_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def add(self, voter_id):
+        with self.lock:
+            self.bitmap.add(voter_id)
+
+    def peek(self, voter_id):
+        """Answer from memory only: True, or None when the database must be asked."""
+        return True if voter_id in self.bitmap else None
+
+    def expired(self):
+        return time.monotonic() - self.created_at >= getattr(settings, 'VOTED_INDEX_MAX_AGE', 300)
+
+
+_lock = threading.Lock()
+_indexes = OrderedDict()
+
+
+def _get_index(election_id, create=True):
+    with _lock:
+        index = _indexes.get(election_id)
+        if index is not None and index.expired():
+            del _indexes[election_id]
+            index = None
+        if index is not None:
+            _indexes.move_to_end(election_id)
+        elif create:
+            index = _indexes[election_id] = ElectionVotedIndex(election_id)
+            while len(_indexes) > getattr(settings, 'VOTED_INDEX_MAX_ELECTIONS', 256):
+                _indexes.popitem(last=False)
+        return index
+
+
+def peek_voted(election_id, voter_id):
+    """Memory-only answer: True when the index knows the voter voted, otherwise None."""
+    index = _get_index(int(election_id), create=False)
+    if index is None:
+        return None
+    return index.peek(int(voter_id))
+
+
+def known_voted(election_id, voter_id):
+    """True when the index already knows the voter voted (never queries)."""
+    return peek_voted(election_id, voter_id) is True
+
+
+def has_voted(election_id, voter_id, institution_id=None):
+    """Return whether `voter_id` has voted in `election_id`.
+
+    Known voters are answered from memory; anything else is one query. With
+    `institution_id`, that query also checks the voter belongs to the
+    institution and None is returned when it does not (or does not exist).
+    """
+    from elections_app.models import Vote, Voter  # lazy import to avoid circular imports
+
+    election_id, voter_id = int(election_id), int(voter_id)
+    if peek_voted(election_id, voter_id):
+        return True
+    vote = Vote.objects.filter(election_id=election_id, voter_id=voter_id)
+    if institution_id is None:
+        voted = vote.exists()
+    else:
+        voted = (
+            Voter.objects.filter(id=voter_id, institution_id=institution_id)
+            .annotate(voted=Exists(vote)).values_list('voted', flat=True).first()
+        )
+    if voted:
+        mark_voted(election_id, voter_id)
+    return voted
+
+
+def mark_voted(election_id, voter_id):
+    """Record a committed vote in the election's index."""
+    _get_index(int(election_id)).add(int(voter_id))
+
+
+def invalidate_voted_index(election_id=None):
+    """Forget the index of `election_id` (or all indexes), e.g. after votes were deleted."""
+    with _lock:
+        if election_id is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(election_id, None)
@@ -0,0 +1,184 @@
+"""Vote admission path used by `VoteViewSet.cast_vote`.
+
+The election window and candidate membership are validated against the
+cached election descriptor (`elections_app.descriptors`), so a warm ballot
+does not read the Election or Candidate tables. Voter eligibility is one
+SELECT on Voter, or none when the client presents a signed voter ticket
+(`elections_app.voter.tickets`). Duplicate votes are not pre-checked: the
+('election', 'voter') unique constraint on Vote rejects them and the
+IntegrityError is turned into the usual "already voted" response; repeat
+attempts already known to the in-memory voted index
+(`elections_app.voted_index`) are rejected before reaching the database.
+
+Once the descriptor is cached and the candidate's tally row exists, an
+admitted ballot costs six statements: the Voter SELECT, BEGIN, the Vote
+INSERT, the tally UPDATE (Vote post_save receiver), the AuditLog INSERT and
+COMMIT; five with a voter ticket. `manage.py benchmark_votes` reports this
+steady-state figure.
+"""
+
+from django.conf import settings
+from django.core import signing
+from django.db import IntegrityError, transaction
+from rest_framework import status
+
+from elections_app.descriptors import get_election_descriptor
+from elections_app.live import publish_vote
+from elections_app.models import AuditLog, Election, Vote, Voter
+from elections_app.utils import auto_close_elections, auto_close_on_read
+from elections_app.voted_index import known_voted, mark_voted
+from elections_app.voter.tickets import read_ticket
+
+
+class VoteRejected(Exception):
+    """Raised when a ballot cannot be admitted; carries the API response detail and status."""
+
+    def __init__(self, detail, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+def parse_candidate_id(candidate_id):
+    """Return the candidate id as int, or None for a null vote ('', 'null', 'none')."""
+    if candidate_id is None or str(candidate_id).strip().lower() in ['', 'null', 'none']:
+        return None
+    return coerce_id(candidate_id, 'Candidate not found.', status.HTTP_404_NOT_FOUND)
+
+
+def coerce_id(value, detail, status_code=status.HTTP_400_BAD_REQUEST):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise VoteRejected(detail, status_code)
+
+
+def check_election(election, candidate_id):
+    """Raise `VoteRejected` unless the election descriptor accepts a ballot for `candidate_id`."""
+    if election is None:
+        raise VoteRejected('Election not found.', status.HTTP_404_NOT_FOUND)
+    if not election.is_open():
+        raise VoteRejected('Voting window closed or not started.')
+    if candidate_id is not None and not election.has_candidate(candidate_id):
+        raise VoteRejected('Candidate not found.', status.HTTP_404_NOT_FOUND)
+
+
+def check_voter(voter):
+    """Raise `VoteRejected` unless `voter` (a values() row or None) may vote."""
+    if voter is None:
+        raise VoteRejected('Voter not found.', status.HTTP_404_NOT_FOUND)
+    if not voter['eligible']:
+        raise VoteRejected('Voter not eligible.', status.HTTP_403_FORBIDDEN)
+
+
+def voter_row_queryset(election, voter_id):
+    """Voter row lookup for a ballot; voters may only vote in their own institution's elections."""
+    return Voter.objects.filter(id=voter_id, institution_id=election.institution_id).values('identifier', 'eligible')
+
+
+def ticket_voter(token, election):
+    """Resolve the voter of a signed ticket for `election` without reading the Voter table.
+
+    Returns `(voter_id, voter_row)` where `voter_row` mirrors
+    `voter_row_queryset` (None when the ticket belongs to another institution).
+    Raises `VoteRejected` (401) when the ticket is invalid or expired.
+    """
+    try:
+        ticket = read_ticket(token)
+    except signing.BadSignature:
+        raise VoteRejected('Invalid or expired voter ticket.', status.HTTP_401_UNAUTHORIZED)
+    if ticket.institution_id != election.institution_id:
+        return ticket.voter_id, None
+    return ticket.voter_id, {'identifier': ticket.identifier, 'eligible': ticket.eligible}
+
+
+def require_ticket(ticket):
+    """Raise `VoteRejected` (401) when tickets are mandatory and none was sent."""
+    if not ticket and getattr(settings, 'VOTER_TICKETS_REQUIRED', False):
+        raise VoteRejected('Voter ticket required.', status.HTTP_401_UNAUTHORIZED)
+
+
+def check_not_known_voted(election_id, voter_id):
+    """Reject a duplicate early when the in-memory voted index already knows about it (no query)."""
+    if known_voted(election_id, voter_id):
+        raise VoteRejected('Voter already voted in this election.')
+
+
+def close_if_ended(election_id):
+    """Let auto-close record the closed flag and audit entry for an election whose end has passed."""
+    if auto_close_on_read():
+        auto_close_elections(Election.objects.filter(id=election_id))
+
+
+def validate_ballot(election_id, voter_id, candidate_id, ticket=None):
+    """Check a ballot against the election descriptor and the voter.
+
+    The voter comes from the signed `ticket` when one is given (no query),
+    otherwise from the Voter row for `voter_id`. Returns
+    `(election_id, voter_id, voter_identifier)` with ids coerced to int.
+    Raises `VoteRejected` when the election, voter or candidate is unknown,
+    when the voting window is not open or when the voter is not eligible.
+    Duplicates are left to the unique constraint at insert time.
+    """
+    require_ticket(ticket)
+    election_id = coerce_id(election_id, 'Election not found.', status.HTTP_404_NOT_FOUND)
+    if not ticket:
+        voter_id = coerce_id(voter_id, 'Voter not found.', status.HTTP_404_NOT_FOUND)
+
+    election = get_election_descriptor(election_id)
+    if election is not None and election.needs_closing():
+        close_if_ended(election_id)
+    check_election(election, candidate_id)
+
+    if ticket:
+        voter_id, voter = ticket_voter(ticket, election)
+    else:
+        voter = voter_row_queryset(election, voter_id).first()
+    check_voter(voter)
+    check_not_known_voted(election_id, voter_id)
+    return election_id, voter_id, voter['identifier']
+
+
+def record_vote(election_id, voter_id, candidate_id, actor):
+    """Insert one Vote and its `vote_cast` AuditLog row. Returns the Vote id.
+
+    The Vote post_save receiver (`elections_app.signals`) adds the vote to
+    the tally in the same transaction.
+    """
+    try:
+        with transaction.atomic():
+            vote = Vote.objects.create(election_id=election_id, candidate_id=candidate_id, voter_id=voter_id)
+            detail = {'candidate_id': candidate_id, 'election_id': election_id}
+            AuditLog.objects.create(action='vote_cast', actor=actor, detail=detail)
+    except IntegrityError as e:
+        # The unique constraint is the duplicate check; anything else (e.g. a
+        # candidate deleted concurrently) is reported as a recording error.
+        if Vote.objects.filter(election_id=election_id, voter_id=voter_id).exists():
+            mark_voted(election_id, voter_id)
+            raise VoteRejected('Voter already voted in this election.')
+        raise VoteRejected(f'Error recording vote: {str(e)}', status.HTTP_500_INTERNAL_SERVER_ERROR)
+    transaction.on_commit(lambda: vote_committed(election_id, voter_id, candidate_id))
+    return vote.id
+
+
+def vote_committed(election_id, voter_id, candidate_id):
+    """Post-commit bookkeeping for a recorded vote: voted index and live results push."""
+    mark_voted(election_id, voter_id)
+    publish_vote(election_id, candidate_id)
+
+
+def admit_vote(election_id, voter_id, candidate_id, ticket=None):
+    """Validate and record a ballot. Returns the created Vote id.
+
+    `candidate_id` is None for a null vote. When group commit is enabled
+    (`settings.VOTE_GROUP_COMMIT`) and the database supports it, the insert
+    is handed to the batch writer and this call returns once the batch
+    holding the vote has committed.
+    """
+    election_id, voter_id, actor = validate_ballot(election_id, voter_id, candidate_id, ticket)
+    if getattr(settings, 'VOTE_GROUP_COMMIT', False):
+        # Lazy import: the batch writer imports this module
+        from elections_app.voter.group_commit import get_vote_batcher, group_commit_supported
+        if group_commit_supported():
+            return get_vote_batcher().submit(election_id, voter_id, candidate_id, actor)
+    return record_vote(election_id, voter_id, candidate_id, actor)
@@ -0,0 +1,38 @@
+"""Signed, stateless voter ballot tickets.
+
+`voter_login` issues a ticket signed with `django.core.signing` that carries
+the voter id, identifier, institution id and eligibility. The voting
+endpoints verify it cryptographically instead of reading the Voter table and
+check that the ticket's institution owns the election. Tickets expire after
+`settings.VOTER_TICKET_MAX_AGE` seconds, which also bounds how long an
+eligibility change can go unnoticed by a logged-in voter.
+"""
+
+from collections import namedtuple
+
+from django.conf import settings
+from django.core import signing
+
+TICKET_SALT = 'elections_app.voter.ticket'
+
+VoterTicket = namedtuple('VoterTicket', ('voter_id', 'identifier', 'institution_id', 'eligible'))
+
+
+def issue_ticket(voter_id, identifier, institution_id, eligible):
+    """Return a signed ticket string for the given voter."""
+    payload = {'v': voter_id, 'n': identifier, 'i': institution_id, 'e': bool(eligible)}
+    return signing.dumps(payload, salt=TICKET_SALT, compress=True)
+
+
+def read_ticket(token):
+    """Verify `token` and return a `VoterTicket`.
+
+    Raises `signing.BadSignature` (or its subclass `signing.SignatureExpired`)
+    when the ticket is forged, malformed or too old.
+    """
+    max_age = getattr(settings, 'VOTER_TICKET_MAX_AGE', 1800)
+    payload = signing.loads(token, salt=TICKET_SALT, max_age=max_age)
+    try:
+        return VoterTicket(int(payload['v']), payload['n'], int(payload['i']), bool(payload['e']))
+    except (KeyError, TypeError, ValueError):
+        raise signing.BadSignature('Malformed voter ticket.')
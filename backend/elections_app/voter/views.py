@@ -3,12 +3,13 @@ from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from django.shortcuts import get_object_or_404
-from django.db import transaction
-from django.utils import timezone
 
-from elections_app.models import Candidate, Vote, Voter, AuditLog, Election
-from elections_app.utils import auto_close_election
+from elections_app.descriptors import get_election_descriptor
+from elections_app import voted_index
+from elections_app.models import Voter, normalize_identifier
+from elections_app.voter.admission import VoteRejected, admit_vote, parse_candidate_id, require_ticket, ticket_voter
 from elections_app.voter.serializers import VoterLoginSerializer, VoteSerializer
+from elections_app.voter.tickets import issue_ticket
 
 
 @api_view(['POST'])
@@ -27,12 +28,20 @@ def voter_login(request):
 
     # Authenticate voters by institution + identifier only. This allows
     # removing the frontend 'name' field while preserving unique lookup.
-    voter = get_object_or_404(Voter, institution_id=institution_id, identifier=identifier)
+    # The exact identifier wins: voters whose normalized value was suffixed by
+    # migration 0008 (collisions) must not be matched to the other voter.
+    # Otherwise case, surrounding spaces and Unicode form are ignored.
+    voters = Voter.objects.filter(institution_id=institution_id)
+    voter = voters.filter(identifier=identifier).first()
+    if voter is None:
+        voter = get_object_or_404(voters, identifier_normalized=normalize_identifier(identifier))
 
     if not voter.eligible:
         return Response({'detail': 'Voter not eligible.'}, status=status.HTTP_403_FORBIDDEN)
 
-    return Response({'voter_id': voter.id, 'identifier': voter.identifier, 'name': voter.name}, status=status.HTTP_200_OK)
+    # The signed ticket lets the voting endpoints skip the Voter lookup.
+    ticket = issue_ticket(voter.id, voter.identifier, voter.institution_id, voter.eligible)
+    return Response({'voter_id': voter.id, 'identifier': voter.identifier, 'name': voter.name, 'ticket': ticket}, status=status.HTTP_200_OK)
 
 
 class VoteViewSet(viewsets.ViewSet):
@@ -42,90 +51,57 @@ class VoteViewSet(viewsets.ViewSet):
     def cast_vote(self, request):
         candidate_id = request.data.get('candidate_id')
         voter_id = request.data.get('voter_id')
+        # Signed ticket from voter_login; replaces voter_id when present
+        ticket = request.data.get('ticket')
 
-        # Require voter_id and election_id (ballots removed)
+        # Require voter_id (or ticket) and election_id (ballots removed)
         election_id = request.data.get('election_id')
-        if not voter_id or not election_id:
+        if not (voter_id or ticket) or not election_id:
             return Response({'detail': 'Missing required fields: voter_id and election_id are required (ballots removed).'}, status=status.HTTP_400_BAD_REQUEST)
 
-        election = get_object_or_404(Election, id=election_id)
-
-        # If the election's end time has already been reached, ensure it's auto-closed
-        if auto_close_election(election):
-            return Response({'detail': 'Voting window closed or not started.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        voter = get_object_or_404(Voter, id=voter_id)
-
-        # Determine candidate: support a 'null' vote sent by the frontend
-        # A null vote is NOT a candidate — record Vote.candidate = None.
-        candidate = None
-        if candidate_id is None or str(candidate_id).strip().lower() in ['', 'null', 'none']:
-            candidate = None
-        else:
-            # Candidate model is linked to Election, ensure candidate belongs to this election.
-            candidate = get_object_or_404(Candidate, id=candidate_id, election=election)
-
-        now = timezone.now()
-
-        # Use the parent Election window (start/end) to determine whether voting is allowed for this election.
-        # Harmonized logic: use same rules as ElectionSerializer.get_is_open
-        # - If start and end present: open when start <= now < end (end exclusive)
-        # - If start present and no end: open when start <= now
-        # - Otherwise (including end-only): treat as closed
-        start = election.start
-        end = election.end
-        # Normalize naive datetimes to aware using current timezone
+        # Window, eligibility, candidate membership and duplicate checks all
+        # happen in `admit_vote` (at most one SELECT, then the inserts).
         try:
-            if start and timezone.is_naive(start):
-                start = timezone.make_aware(start, timezone.get_current_timezone())
-        except Exception:
-            start = election.start
-        try:
-            if end and timezone.is_naive(end):
-                end = timezone.make_aware(end, timezone.get_current_timezone())
-        except Exception:
-            end = election.end
-
-        if start and end:
-            if not (start <= now < end):
-                return Response({'detail': 'Voting window closed or not started.'}, status=status.HTTP_400_BAD_REQUEST)
-        elif start and not end:
-            if not (start <= now):
-                return Response({'detail': 'Voting window closed or not started.'}, status=status.HTTP_400_BAD_REQUEST)
-        else:
-            # end-only or no window -> closed
-            return Response({'detail': 'Voting window closed or not started.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Prevent double voting per election
-        if Vote.objects.filter(election=election, voter=voter).exists():
-            return Response({'detail': 'Voter already voted in this election.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        try:
-            with transaction.atomic():
-                vote = Vote.objects.create(election=election, candidate=candidate, voter=voter)
-                detail = {'candidate_id': candidate.id if candidate else None, 'election_id': election.id}
-                AuditLog.objects.create(action='vote_cast', actor=voter.identifier, detail=detail)
-            return Response({'detail': 'Vote recorded.', 'vote_id': vote.id}, status=status.HTTP_201_CREATED)
+            # A null vote is NOT a candidate — record Vote.candidate = None.
+            vote_id = admit_vote(election_id, voter_id, parse_candidate_id(candidate_id), ticket)
+        except VoteRejected as e:
+            return Response({'detail': e.detail}, status=e.status_code)
         except Exception as e:
             return Response({'detail': f'Error recording vote: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({'detail': 'Vote recorded.', 'vote_id': vote_id}, status=status.HTTP_201_CREATED)
 
     @action(detail=False, methods=['get'])
     def has_voted(self, request):
         """Check whether a voter has already voted in a given election.
 
-        Expects query params: `voter_id` and `election_id`.
+        Expects query params: `election_id` and either `ticket` (from
+        voter_login) or `voter_id`.
         Returns JSON: { voted: true/false }
         """
         voter_id = request.query_params.get('voter_id')
         election_id = request.query_params.get('election_id')
-        if not voter_id or not election_id:
+        ticket = request.query_params.get('ticket')
+        if not (voter_id or ticket) or not election_id:
             return Response({'detail': 'Missing voter_id or election_id.'}, status=status.HTTP_400_BAD_REQUEST)
 
+        not_found = Response({'detail': 'Voter or election not found.'}, status=status.HTTP_404_NOT_FOUND)
         try:
-            voter = get_object_or_404(Voter, id=voter_id)
-            election = get_object_or_404(Election, id=election_id)
-        except Exception:
-            return Response({'detail': 'Voter or election not found.'}, status=status.HTTP_404_NOT_FOUND)
-
-        voted = Vote.objects.filter(election=election, voter=voter).exists()
+            require_ticket(ticket)
+            election = get_election_descriptor(election_id)
+            if election is None:
+                return not_found
+            if ticket:
+                voter_id, voter = ticket_voter(ticket, election)
+                if voter is None:
+                    return not_found
+                voted = voted_index.has_voted(election.id, voter_id)
+            else:
+                # One query answers both "does the voter exist" and "did they vote".
+                voted = voted_index.has_voted(election.id, voter_id, institution_id=election.institution_id)
+                if voted is None:
+                    return not_found
+        except VoteRejected as e:
+            return Response({'detail': e.detail}, status=e.status_code)
+        except (TypeError, ValueError):
+            return not_found
         return Response({'voted': voted}, status=status.HTTP_200_OK)
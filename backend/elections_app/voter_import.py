@@ -0,0 +1,418 @@
+"""Voter registry import: streaming parse and chunked upsert.
+
+`read_voter_rows` reads an uploaded CSV (decoded incrementally) or XLSX
+(openpyxl read-only mode, one row at a time) and yields one
+`(identifier, name)` pair per data row (`None` for rows without an
+identifier), so memory does not grow with the file. `import_voter_rows`
+upserts those rows with `bulk_create(update_conflicts=True)`, one committed
+transaction per `chunk_size` rows, so the database write lock is only held for
+one chunk at a time.
+
+Identifiers are matched on their normalized form (`normalize_identifier`:
+case, surrounding spaces and Unicode form ignored), so re-importing
+"JEAN.DUPONT@UNIV.CD" updates the voter "jean.dupont@univ.cd", whose stored
+identifier is kept. Counts follow `update_or_create` semantics: the first
+occurrence of an identifier unknown to the institution is `created`, every
+other valid row (existing voter or repeated identifier) is `updated`.
+
+Imports are tracked by their `VoterImportFile` (status, rows processed,
+heartbeat). Large files can be queued with `?background=true` and processed
+by `manage.py run_import_worker`; a crashed import resumes after its last
+committed chunk.
+"""
+
+import codecs
+import csv
+import heapq
+import itertools
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+try:
+    from openpyxl import load_workbook
+except ImportError:  # openpyxl not installed: CSV only
+    load_workbook = None
+
+from elections_app.audit import record_audit
+from elections_app.models import Voter, VoterImportFile, normalize_identifier
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 2000
+# A running import whose heartbeat is older than this is considered crashed
+IMPORT_STALE_SECONDS = 300
+# Data rows read by an XLSX preview before extrapolating to the whole sheet
+PREVIEW_SAMPLE_ROWS = 1000
+# Examples returned per category by a diff preview
+DIFF_SAMPLE_SIZE = 20
+
+# Accepted header names (compared case-insensitively), in order of preference
+IDENTIFIER_HEADERS = ('identifier', 'id', 'email')
+NAME_HEADERS = ('name', 'full_name', 'nom')
+
+_ENCODINGS = ('utf-8-sig', 'latin-1')
+_READ_SIZE = 64 * 1024
+_ZIP_MAGIC = b'PK\x03\x04'
+_OLE_MAGIC = b'\xd0\xcf\x11\xe0'
+
+
+class UnsupportedFileError(ValueError):
+    """The upload is neither CSV nor XLSX (e.g. a legacy .xls workbook)."""
+
+
+class ImportCancelled(Exception):
+    """The import record was deleted while the import was running."""
+
+
+class ImportStats:
+    """Running counters of an import (or preview)."""
+
+    def __init__(self):
+        self.total_rows = 0
+        self.invalid = 0
+        self.created = 0
+        self.updated = 0
+
+    @property
+    def eligible(self):
+        # Imported voters are always eligible
+        return self.total_rows - self.invalid
+
+
+def detect_encoding(fileobj):
+    """Return 'utf-8-sig' when the whole file decodes as UTF-8, else 'latin-1'. Rewinds the file."""
+    decoder = codecs.getincrementaldecoder(_ENCODINGS[0])()
+    fileobj.seek(0)
+    try:
+        while True:
+            chunk = fileobj.read(_READ_SIZE)
+            if not chunk:
+                decoder.decode(b'', final=True)
+                return _ENCODINGS[0]
+            decoder.decode(chunk)
+    except UnicodeDecodeError:
+        return _ENCODINGS[1]
+    finally:
+        fileobj.seek(0)
+
+
+def detect_format(fileobj):
+    """Return 'xlsx' or 'csv' from the file signature; raises `UnsupportedFileError`. Rewinds the file."""
+    fileobj.seek(0)
+    magic = fileobj.read(len(_ZIP_MAGIC))
+    fileobj.seek(0)
+    if magic == _ZIP_MAGIC:
+        if load_workbook is None:
+            raise UnsupportedFileError('XLSX import requires openpyxl.')
+        return 'xlsx'
+    if magic == _OLE_MAGIC:
+        raise UnsupportedFileError('Legacy .xls workbooks are not supported. Save the sheet as XLSX or CSV.')
+    return 'csv'
+
+
+def _cell_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Numeric student ids come back from Excel as floats
+        value = int(value)
+    return str(value).strip()
+
+
+def _voter_rows(header, rows):
+    """Map raw rows (sequences aligned with `header`) to `(identifier, name)` or `None`."""
+    names = [_cell_text(h).lower() for h in header or ()]
+
+    def columns(candidates):
+        return [names.index(h) for h in candidates if h in names]
+
+    identifier_cols = columns(IDENTIFIER_HEADERS)
+    name_cols = columns(NAME_HEADERS)
+
+    def pick(values, cols):
+        for i in cols:
+            if i < len(values):
+                text = _cell_text(values[i])
+                if text:
+                    return text
+        return ''
+
+    for values in rows:
+        identifier = pick(values, identifier_cols)
+        yield (identifier, pick(values, name_cols)) if identifier else None
+
+
+def _csv_rows(fileobj):
+    reader = csv.reader(codecs.getreader(detect_encoding(fileobj))(fileobj))
+    # Blank lines are skipped, as csv.DictReader did
+    return next(reader, None), (values for values in reader if values)
+
+
+def _xlsx_sheet(fileobj):
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    return workbook, workbook.active
+
+
+def _xlsx_rows(sheet):
+    rows = sheet.iter_rows(values_only=True)
+    # Formatted but empty rows are common at the end of exported sheets
+    return next(rows, None), (values for values in rows if any(v is not None and v != '' for v in values))
+
+
+def read_voter_rows(fileobj):
+    """Yield `(identifier, name)` for each CSV/XLSX data row, or `None` when the row has no identifier."""
+    if detect_format(fileobj) == 'xlsx':
+        workbook, sheet = _xlsx_sheet(fileobj)
+        try:
+            yield from _voter_rows(*_xlsx_rows(sheet))
+        finally:
+            workbook.close()
+    else:
+        yield from _voter_rows(*_csv_rows(fileobj))
+
+
+def count_voter_rows(rows, stats=None):
+    """Preview: count rows without touching the database."""
+    stats = stats or ImportStats()
+    for row in rows:
+        stats.total_rows += 1
+        if row is None:
+            stats.invalid += 1
+    return stats
+
+
+def preview_voter_file(fileobj, sample_rows=PREVIEW_SAMPLE_ROWS):
+    """Counts for `?preview=true`: `{'total_rows', 'eligible', 'invalid', 'estimated'}`.
+
+    CSV files are counted in full. XLSX previews read at most `sample_rows`
+    data rows and extrapolate the invalid share to the row count stored in
+    the sheet dimensions (`estimated` is then true); sheets written without
+    dimensions are counted in full.
+    """
+    if detect_format(fileobj) != 'xlsx':
+        stats = count_voter_rows(read_voter_rows(fileobj))
+        return {'total_rows': stats.total_rows, 'eligible': stats.eligible, 'invalid': stats.invalid, 'estimated': False}
+
+    workbook, sheet = _xlsx_sheet(fileobj)
+    try:
+        # From the sheet's <dimension> element, None when the writer omitted it
+        sheet_rows = sheet.max_row - 1 if sheet.max_row else None
+        stats = ImportStats()
+        rows = _voter_rows(*_xlsx_rows(sheet))
+        for row in rows:
+            count_voter_rows([row], stats)
+            if stats.total_rows >= sample_rows:
+                break
+        else:
+            sheet_rows = None
+        if sheet_rows is None or sheet_rows <= stats.total_rows:
+            # Unsized sheet (or the dimension is stale): count the rest instead of guessing
+            count_voter_rows(rows, stats)
+            sheet_rows = None
+    finally:
+        workbook.close()
+    if sheet_rows is None:
+        return {'total_rows': stats.total_rows, 'eligible': stats.eligible, 'invalid': stats.invalid, 'estimated': False}
+    invalid = round(stats.invalid * sheet_rows / stats.total_rows)
+    return {'total_rows': sheet_rows, 'eligible': sheet_rows - invalid, 'invalid': invalid, 'estimated': True}
+
+
+def diff_voter_rows(institution, rows, sample_size=DIFF_SAMPLE_SIZE):
+    """`?preview=diff`: compare `rows` with the institution's current roster without writing.
+
+    The roster is read once (identifiers and name); the file is streamed and
+    compared in memory, matching normalized identifiers like the import. Returns counts and up to `sample_size` examples each:
+
+    - `new`: identifiers the import would create
+    - `updated`: existing voters whose name the import would change
+    - `unchanged`: existing voters the import would leave as they are
+    - `duplicates`: rows repeating an identifier seen earlier in the file
+      (the last occurrence wins)
+    - `missing`: voters of the roster absent from the file (left untouched)
+    - `invalid`: rows without an identifier (data row numbers are sampled)
+    """
+    roster = {
+        normalized: (identifier, name)
+        for normalized, identifier, name in Voter.objects.filter(institution=institution)
+        .values_list('identifier_normalized', 'identifier', 'name').iterator(chunk_size=5000)
+    }
+    stats = ImportStats()
+    names = {}
+    duplicates = 0
+    duplicate_sample = []
+    invalid_rows = []
+    for row in rows:
+        stats.total_rows += 1
+        if row is None:
+            stats.invalid += 1
+            if len(invalid_rows) < sample_size:
+                invalid_rows.append(stats.total_rows)
+            continue
+        identifier, name = row
+        normalized = normalize_identifier(identifier)
+        if normalized in names:
+            duplicates += 1
+            if len(duplicate_sample) < sample_size:
+                duplicate_sample.append(identifier)
+        names[normalized] = (identifier, name)
+
+    new, updated = [], []
+    n_new = n_updated = 0
+    for normalized, (identifier, name) in names.items():
+        if normalized not in roster:
+            n_new += 1
+            if len(new) < sample_size:
+                new.append(identifier)
+        elif roster[normalized][1] != name:
+            n_updated += 1
+            if len(updated) < sample_size:
+                current, old_name = roster[normalized]
+                updated.append({'identifier': current, 'old_name': old_name, 'new_name': name})
+    missing = [roster[normalized][0] for normalized in roster.keys() - names.keys()]
+
+    return {
+        'total_rows': stats.total_rows,
+        'eligible': stats.eligible,
+        'invalid': stats.invalid,
+        'estimated': False,
+        'existing': len(roster),
+        'new': n_new,
+        'updated': n_updated,
+        'unchanged': len(names) - n_new - n_updated,
+        'duplicates': duplicates,
+        'missing': len(missing),
+        'samples': {
+            'new': new,
+            'updated': updated,
+            'duplicates': duplicate_sample,
+            'missing': heapq.nsmallest(sample_size, missing),
+            'invalid_rows': invalid_rows,
+        },
+    }
+
+
+def _upsert_chunk(institution, import_file, chunk, stats):
+    # Last occurrence wins within a chunk; one INSERT row per normalized
+    # identifier (PostgreSQL rejects ON CONFLICT updating the same row twice)
+    latest = {}
+    for identifier, name in chunk:
+        latest[normalize_identifier(identifier)] = (identifier, name)
+    existing = set(
+        Voter.objects.filter(institution=institution, identifier_normalized__in=list(latest))
+        .values_list('identifier_normalized', flat=True)
+    )
+    Voter.objects.bulk_create(
+        [
+            Voter(institution=institution, identifier=identifier, name=name, eligible=True, import_file=import_file)
+            for identifier, name in latest.values()
+        ],
+        update_conflicts=True,
+        unique_fields=['institution', 'identifier_normalized'],
+        update_fields=['name', 'eligible', 'import_file'],
+    )
+    created = len(latest) - len(existing)
+    stats.created += created
+    stats.updated += len(chunk) - created
+
+
+def import_voter_rows(institution, import_file, rows, chunk_size=IMPORT_CHUNK_SIZE, stats=None):
+    """Upsert `rows` (as yielded by `read_voter_rows`) in committed chunks; returns the `ImportStats`.
+
+    Each chunk commits together with the progress of `import_file`
+    (`rows_processed`, counters, heartbeat), so an import that stops halfway
+    can resume after `rows_processed` rows. Raises `ImportCancelled` when the
+    import record has been deleted meanwhile.
+    """
+    stats = stats or ImportStats()
+    chunk_size = max(int(chunk_size), 1)
+    chunk = []
+
+    def checkpoint(**extra):
+        saved = VoterImportFile.objects.filter(id=import_file.id).update(
+            rows_processed=stats.total_rows, created=stats.created, updated=stats.updated,
+            heartbeat_at=timezone.now(), **extra,
+        )
+        if not saved:
+            raise ImportCancelled(f'Import {import_file.id} was deleted.')
+
+    def flush():
+        with transaction.atomic():
+            _upsert_chunk(institution, import_file, chunk, stats)
+            checkpoint()
+        chunk.clear()
+
+    for row in rows:
+        stats.total_rows += 1
+        if row is None:
+            stats.invalid += 1
+            continue
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+
+    checkpoint(total_rows=stats.total_rows)
+    import_file.total_rows = import_file.rows_processed = stats.total_rows
+    import_file.created = stats.created
+    import_file.updated = stats.updated
+    return stats
+
+
+# Background jobs: `import_voters?background=true` stores the file as a
+# 'queued' VoterImportFile and `manage.py run_import_worker` processes it.
+
+def claim_import_job(stale_after=IMPORT_STALE_SECONDS):
+    """Mark the oldest queued (or stalled running) import as running and return it, or None."""
+    now = timezone.now()
+    claimable = Q(status='queued') | Q(status='running', heartbeat_at__lt=now - timedelta(seconds=stale_after))
+    candidates = VoterImportFile.objects.filter(claimable).order_by('uploaded_at', 'id').values_list('id', flat=True)[:10]
+    for import_id in candidates:
+        # Conditional update: only one worker wins a given job
+        if VoterImportFile.objects.filter(claimable, id=import_id).update(status='running', heartbeat_at=now):
+            return VoterImportFile.objects.select_related('institution').get(id=import_id)
+    return None
+
+
+def run_import_job(import_file, chunk_size=IMPORT_CHUNK_SIZE, count_total=False):
+    """Import the stored file of a running `import_file`, resuming after `rows_processed` rows.
+
+    Marks the record 'done' (and writes the `voters_imported` audit entry) or
+    'failed' with the error; returns the `ImportStats`, or None when it
+    failed or was cancelled. `count_total` first counts the file's rows so
+    progress can be reported as a share of `total_rows`.
+    """
+    stats = ImportStats()
+    stats.total_rows = import_file.rows_processed
+    stats.created = import_file.created or 0
+    stats.updated = import_file.updated or 0
+    try:
+        if count_total and import_file.total_rows is None:
+            with import_file.file.open('rb') as stored:
+                total = count_voter_rows(read_voter_rows(stored)).total_rows
+            VoterImportFile.objects.filter(id=import_file.id).update(total_rows=total, heartbeat_at=timezone.now())
+        with import_file.file.open('rb') as stored:
+            rows = itertools.islice(read_voter_rows(stored), import_file.rows_processed, None)
+            import_voter_rows(import_file.institution, import_file, rows, chunk_size=chunk_size, stats=stats)
+    except ImportCancelled:
+        return None
+    except Exception as e:
+        logger.exception('Voter import %s failed after %s rows', import_file.id, stats.total_rows)
+        VoterImportFile.objects.filter(id=import_file.id).update(status='failed', error=str(e), finished_at=timezone.now())
+        import_file.status, import_file.error = 'failed', str(e)
+        return None
+
+    VoterImportFile.objects.filter(id=import_file.id).update(status='done', error='', finished_at=timezone.now())
+    import_file.status = 'done'
+    # durable: voters_summary reads the latest import entry back
+    record_audit(
+        'voters_imported',
+        actor=import_file.uploaded_by,
+        detail={'institution_id': import_file.institution_id, 'created': stats.created, 'updated': stats.updated, 'total_rows': stats.total_rows},
+        durable=True,
+    )
+    return stats
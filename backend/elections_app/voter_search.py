@@ -0,0 +1,189 @@
+"""Indexed voter search over identifier and name.
+
+The backend is picked from the database in use:
+
+- SQLite: the FTS5 table `elections_app_voter_fts` (trigram tokenizer,
+  case-insensitive), kept in sync with `elections_app_voter` by triggers, so
+  imports (bulk upserts), edits and chunked deletes are all reflected.
+  Substring queries are FTS phrase matches; fuzzy queries OR the query's
+  trigrams, take the best-ranked candidates and keep those with a trigram
+  similarity of at least `FUZZY_THRESHOLD`.
+- PostgreSQL: `pg_trgm` GIN indexes serve `ILIKE '%q%'` and the `%`
+  similarity operator.
+- Anything else, or queries shorter than three characters: an identifier
+  prefix range on the `(institution, identifier)` index, plus a name scan on
+  backends without a trigram index.
+
+The SQLite table and triggers are created by migration 0007 and re-created
+after every `migrate` by `ensure_search_index` (SQLite drops triggers when
+Django rebuilds a table to alter it).
+"""
+
+import logging
+
+from django.db import DatabaseError, connection
+from django.db.models import Q
+
+from elections_app.models import Voter
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'elections_app_voter_fts'
+FUZZY_THRESHOLD = 0.3
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 1000
+
+_SQLITE_SCHEMA = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "identifier, name, content='elections_app_voter', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON elections_app_voter BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, identifier, name) VALUES (new.id, new.identifier, new.name); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON elections_app_voter BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, identifier, name) VALUES ('delete', old.id, old.identifier, old.name); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF identifier, name ON elections_app_voter BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, identifier, name) VALUES ('delete', old.id, old.identifier, old.name); "
+    f"INSERT INTO {FTS_TABLE}(rowid, identifier, name) VALUES (new.id, new.identifier, new.name); END",
+]
+
+_backend = None
+
+
+def _sqlite_objects(cursor):
+    cursor.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE name IN (%s, %s, %s, %s)",
+        [FTS_TABLE, f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au'],
+    )
+    return cursor.fetchone()[0]
+
+
+def ensure_search_index(using=None, **kwargs):
+    """Re-create missing SQLite search objects and rebuild the index if any were missing (post_migrate)."""
+    global _backend
+    _backend = None
+    if connection.vendor != 'sqlite':
+        return
+    try:
+        with connection.cursor() as cursor:
+            if _sqlite_objects(cursor) == 4:
+                return
+            for sql in _SQLITE_SCHEMA:
+                cursor.execute(sql)
+            # Rows written while the triggers were missing
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    except DatabaseError as e:
+        # SQLite built without FTS5 / trigram tokenizer: search falls back to scans
+        logger.warning('Voter search index unavailable: %s', e)
+
+
+def search_backend():
+    """'fts5', 'trigram' or 'scan' for the default database (cached per process)."""
+    global _backend
+    if _backend is None:
+        backend = 'scan'
+        try:
+            with connection.cursor() as cursor:
+                if connection.vendor == 'sqlite' and _sqlite_objects(cursor) == 4:
+                    backend = 'fts5'
+                elif connection.vendor == 'postgresql':
+                    cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                    if cursor.fetchone():
+                        backend = 'trigram'
+        except DatabaseError:
+            pass
+        _backend = backend
+    return _backend
+
+
+def trigrams(text):
+    text = f'  {text.casefold()} '
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def similarity(a, b):
+    """pg_trgm-style similarity: shared trigrams over all trigrams of both strings."""
+    ta, tb = trigrams(a), trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+
+def _fts_quote(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _fts_ids(institution_id, match, limit):
+    sql = (
+        f"SELECT v.id FROM {FTS_TABLE} f JOIN elections_app_voter v ON v.id = f.rowid "
+        f"WHERE {FTS_TABLE} MATCH %s"
+    )
+    params = [match]
+    if institution_id is not None:
+        sql += " AND v.institution_id = %s"
+        params.append(institution_id)
+    sql += " ORDER BY f.rank LIMIT %s"
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _trigram_ids(institution_id, query, fuzzy, limit):
+    where = ["institution_id = %s"] if institution_id is not None else []
+    params = [institution_id] if institution_id is not None else []
+    if fuzzy:
+        where.append("(identifier %% %s OR name %% %s)")
+        params += [query, query]
+        order = "GREATEST(similarity(identifier, %s), similarity(name, %s)) DESC"
+        params += [query, query]
+    else:
+        pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        where.append("(identifier ILIKE %s OR name ILIKE %s)")
+        params += [pattern, pattern]
+        order = "identifier"
+    sql = f"SELECT id FROM elections_app_voter WHERE {' AND '.join(where)} ORDER BY {order} LIMIT %s"
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + [limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fallback_ids(institution_id, query, limit, scan_names):
+    queryset = Voter.objects.all() if institution_id is None else Voter.objects.filter(institution_id=institution_id)
+    # Identifier prefix as an index range; names only where no index can help anyway
+    condition = Q(identifier__gte=query, identifier__lt=query + '\U0010ffff')
+    if scan_names:
+        condition |= Q(name__icontains=query)
+    return list(queryset.filter(condition).order_by('identifier').values_list('id', flat=True)[:limit])
+
+
+def search_voter_ids(query, institution_id=None, fuzzy=False, limit=SEARCH_LIMIT):
+    """Ids of voters matching `query` on identifier or name, best matches first."""
+    query = (query or '').strip()
+    limit = min(max(int(limit), 1), MAX_SEARCH_LIMIT)
+    if not query:
+        return []
+    backend = search_backend()
+    if len(query) < 3 or backend == 'scan':
+        return _fallback_ids(institution_id, query, limit, scan_names=backend == 'scan')
+    if backend == 'trigram':
+        return _trigram_ids(institution_id, query, fuzzy, limit)
+    if not fuzzy:
+        return _fts_ids(institution_id, _fts_quote(query), limit)
+    # Candidates sharing trigrams with the query, best BM25 rank first, then
+    # keep the ones similar enough
+    match = ' OR '.join(_fts_quote(t) for t in sorted(trigrams(query)) if t.strip() and len(t.strip()) == 3)
+    if not match:
+        return []
+    candidate_ids = _fts_ids(institution_id, match, limit * 10)
+    rows = Voter.objects.filter(id__in=candidate_ids).values_list('id', 'identifier', 'name')
+    scored = sorted(
+        ((max(similarity(query, identifier), similarity(query, name or '')), voter_id) for voter_id, identifier, name in rows),
+        reverse=True,
+    )
+    return [voter_id for score, voter_id in scored if score >= FUZZY_THRESHOLD][:limit]
+
+
+def search_voters(query, institution_id=None, fuzzy=False, limit=SEARCH_LIMIT):
+    """Voters matching `query`, in relevance order."""
+    ids = search_voter_ids(query, institution_id=institution_id, fuzzy=fuzzy, limit=limit)
+    by_id = Voter.objects.in_bulk(ids)
+    return [by_id[i] for i in ids if i in by_id]
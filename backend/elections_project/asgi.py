@@ -0,0 +1,21 @@
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'elections_project.settings')
+# Turns the live results push on by default (see settings.LIVE_RESULTS_ENABLED)
+os.environ.setdefault('SERVER_MODE', 'asgi')
+django_asgi_app = get_asgi_application()
+
+try:
+    from channels.routing import ProtocolTypeRouter, URLRouter
+except ImportError:  # channels not installed: HTTP only, no live results push
+    application = django_asgi_app
+else:
+    # Imported after get_asgi_application() so the app registry is ready
+    from elections_app.routing import websocket_urlpatterns
+
+    application = ProtocolTypeRouter({
+        'http': django_asgi_app,
+        # Token-authenticated (query string), so no session/origin middleware is needed
+        'websocket': URLRouter(websocket_urlpatterns),
+    })
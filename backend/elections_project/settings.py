@@ -65,6 +65,9 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# SERVER_MODE=asgi is set by elections_project/asgi.py (Daphne); both modes serve
+# the same views, ASGI adds the live results WebSocket.
+SERVER_MODE = os.environ.get('SERVER_MODE', 'wsgi').lower()
 ROOT_URLCONF = 'elections_project.urls'
 
 TEMPLATES = [
@@ -84,6 +87,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'elections_project.wsgi.application'
+ASGI_APPLICATION = 'elections_project.asgi.application'
 
 DATABASES = {
     'default': {
@@ -137,3 +141,83 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
 }
+
+# Seconds an election descriptor (window, closed flag, candidate ids) stays cached
+# per process. Saves/deletes through the ORM invalidate it immediately; the TTL
+# bounds staleness for writes made by other workers.
+ELECTION_DESCRIPTOR_TTL = float(os.environ.get('ELECTION_DESCRIPTOR_TTL', '5'))
+
+# Group-commit vote ingestion: when enabled, validated votes are collected for up
+# to VOTE_GROUP_COMMIT_MAX_WAIT_MS milliseconds (or VOTE_GROUP_COMMIT_BATCH_SIZE
+# votes) and written in one transaction. Off by default: it only pays off when a
+# process serves concurrent requests (gunicorn --threads) and slows the default
+# sync workers down; check with `manage.py benchmark_votes --concurrency N`.
+# Needs a database that returns ids from bulk inserts (SQLite 3.35+, PostgreSQL);
+# elsewhere the setting is ignored.
+VOTE_GROUP_COMMIT = os.environ.get('VOTE_GROUP_COMMIT', 'False').lower() in ('1', 'true', 'yes')
+VOTE_GROUP_COMMIT_BATCH_SIZE = int(os.environ.get('VOTE_GROUP_COMMIT_BATCH_SIZE', '100'))
+VOTE_GROUP_COMMIT_MAX_WAIT_MS = float(os.environ.get('VOTE_GROUP_COMMIT_MAX_WAIT_MS', '5'))
+
+# Signed voter tickets issued by voter_login (seconds of validity). When
+# VOTER_TICKETS_REQUIRED is true, cast_vote/has_voted reject requests that only
+# send a raw voter_id.
+VOTER_TICKET_MAX_AGE = int(os.environ.get('VOTER_TICKET_MAX_AGE', '1800'))
+VOTER_TICKETS_REQUIRED = os.environ.get('VOTER_TICKETS_REQUIRED', 'False').lower() in ('1', 'true', 'yes')
+
+# In-memory "already voted" index used by has_voted/cast_vote. It only learns
+# voters as they vote (or are found in the database) and never scans an
+# election; only positive answers come from memory, every negative costs one
+# indexed query. Indexes are dropped after VOTED_INDEX_MAX_AGE seconds.
+VOTED_INDEX_MAX_AGE = float(os.environ.get('VOTED_INDEX_MAX_AGE', '300'))
+VOTED_INDEX_MAX_ELECTIONS = int(os.environ.get('VOTED_INDEX_MAX_ELECTIONS', '256'))
+
+# Results cache (stale-while-revalidate, per process). A results payload is served
+# from memory for RESULTS_CACHE_TTL seconds; after that one request refreshes it
+# while others keep getting the cached copy for up to RESULTS_CACHE_MAX_STALE
+# seconds. RESULTS_CACHE_TTL=0 disables the cache.
+RESULTS_CACHE_TTL = float(os.environ.get('RESULTS_CACHE_TTL', '2'))
+RESULTS_CACHE_MAX_STALE = float(os.environ.get('RESULTS_CACHE_MAX_STALE', '30'))
+
+# Live results push over WebSockets (ASGI mode, requires `channels`). Vote deltas
+# are coalesced and sent at most LIVE_RESULTS_MAX_RATE times per second per
+# election. The in-memory channel layer only reaches clients connected to the
+# same process; set CHANNEL_REDIS_URL (needs channels_redis) to share a layer
+# between processes, e.g. when votes are also served by WSGI workers.
+LIVE_RESULTS_ENABLED = os.environ.get('LIVE_RESULTS_ENABLED', 'True' if SERVER_MODE == 'asgi' else 'False').lower() in ('1', 'true', 'yes')
+LIVE_RESULTS_MAX_RATE = float(os.environ.get('LIVE_RESULTS_MAX_RATE', '2'))
+CHANNEL_REDIS_URL = os.environ.get('CHANNEL_REDIS_URL')
+if CHANNEL_REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [CHANNEL_REDIS_URL]},
+        },
+    }
+else:
+    CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+# Requests close ended elections themselves (flag + audit entry) unless this is
+# turned off, which is meant for deployments running
+# `manage.py auto_close_elections` as a scheduler.
+ELECTION_AUTO_CLOSE_ON_READ = os.environ.get('ELECTION_AUTO_CLOSE_ON_READ', 'True').lower() in ('1', 'true', 'yes')
+
+# Buffered audit log: when enabled, non-critical audit entries recorded by the
+# institution views are queued after commit and inserted in batches of up to
+# AUDIT_FLUSH_SIZE rows, at least every AUDIT_FLUSH_INTERVAL_MS milliseconds.
+# Vote and election-closing entries are always written synchronously.
+AUDIT_BUFFERED = os.environ.get('AUDIT_BUFFERED', 'False').lower() in ('1', 'true', 'yes')
+AUDIT_FLUSH_SIZE = int(os.environ.get('AUDIT_FLUSH_SIZE', '200'))
+AUDIT_FLUSH_INTERVAL_MS = float(os.environ.get('AUDIT_FLUSH_INTERVAL_MS', '500'))
+
+# Voter imports: with VOTER_IMPORT_BACKGROUND every upload is queued (as with
+# `?background=true`) and processed by `manage.py run_import_worker`.
+VOTER_IMPORT_BACKGROUND = os.environ.get('VOTER_IMPORT_BACKGROUND', 'False').lower() in ('1', 'true', 'yes')
+# Set by entrypoint.sh when it starts the worker. Without it both
+# VOTER_IMPORT_BACKGROUND and `?background=true` are ignored and uploads are
+# imported inside the request, so nothing is queued that no worker would pick up.
+VOTER_IMPORT_WORKER = os.environ.get('VOTER_IMPORT_WORKER', 'False').lower() in ('1', 'true', 'yes')
+
+# Chunked deletes (import purges, election deletion): rows per transaction and
+# pause between chunks so concurrent votes can take the write lock.
+DELETE_CHUNK_SIZE = int(os.environ.get('DELETE_CHUNK_SIZE', '1000'))
+DELETE_CHUNK_PAUSE_MS = float(os.environ.get('DELETE_CHUNK_PAUSE_MS', '10'))
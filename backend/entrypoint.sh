@@ -2,6 +2,8 @@
 set -e
 
 PORT=${PORT:-8000}
+# SERVER_MODE=asgi runs Daphne (HTTP plus the live results WebSocket); default is Gunicorn (WSGI)
+SERVER_MODE=${SERVER_MODE:-wsgi}
 
 echo "Running Django migrations..."
 python manage.py migrate --noinput
@@ -9,5 +11,19 @@ python manage.py migrate --noinput
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
 
+# Background voter imports (import_voters?background=true, sent by the dashboard
+# for large files): run the worker next to the server, restarted if it exits.
+# IMPORT_WORKER=off disables it; uploads are then imported inside the request.
+if [ "${IMPORT_WORKER:-on}" != "off" ]; then
+  export VOTER_IMPORT_WORKER=True
+  echo "Starting voter import worker..."
+  (while true; do python manage.py run_import_worker || true; sleep 5; done) &
+fi
+
+if [ "${SERVER_MODE}" = "asgi" ]; then
+  echo "Starting Daphne (ASGI) on port ${PORT}..."
+  exec daphne -b 0.0.0.0 -p ${PORT} elections_project.asgi:application
+fi
+
 echo "Starting Gunicorn on port ${PORT}..."
 exec gunicorn elections_project.wsgi:application --bind 0.0.0.0:${PORT}
@@ -1,6 +1,6 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import { getElectionResults, getElection, getVoters, getElectionTimeline, advanceToRound2 } from '../services/api';
+import { getElectionResults, getElection, getVoters, getElectionTimeline, advanceToRound2, subscribeElectionResults, applyResultsMessage, deltaVoteCount } from '../services/api';
 import { Bar } from 'react-chartjs-2';
 import { Chart as ChartJS, CategoryScale, LinearScale, BarElement, Title, Tooltip, Legend } from 'chart.js';
 import { Card, Modal, Alert } from '../components/FormComponents';
@@ -26,24 +26,128 @@ export default function ElectionResults() {
   const [modalForm, setModalForm] = useState({ title: `2e tour - ${meta.election_title || ''}`, start: '', end: '', open_immediately: true });
   const [successMessage, setSuccessMessage] = useState('');
 
+  // dernière réponse de getElectionResults, mise à jour par les messages du WebSocket
+  const payloadRef = useRef(null);
+
   useEffect(() => {
-    // initial load + polling every 5s
+    // chargement initial, puis les votes poussés par le serveur (WebSocket) sont
+    // appliqués localement, sans requête HTTP ; sondage toutes les 5s sans socket,
+    // toutes les 30s avec (statuts calculés par le serveur, participation, etc.)
     let mounted = true;
+    let iv = null;
+    const poll = (delay) => {
+      if (iv) clearInterval(iv);
+      iv = setInterval(() => { loadResults(); }, delay);
+    };
     const doLoad = async () => {
       if (!mounted) return;
       await loadResults();
     };
     doLoad();
-    const iv = setInterval(() => {
-      loadResults();
-    }, 5000);
+    poll(5000);
+    const socket = electionId ? subscribeElectionResults(electionId, {
+      onOpen: () => poll(30000),
+      onClose: () => { if (mounted) poll(5000); },
+      onMessage: (msg) => { if (mounted) applyLiveMessage(msg); },
+    }) : null;
     return () => {
       mounted = false;
-      clearInterval(iv);
+      if (iv) { clearInterval(iv); iv = null; }
+      if (socket) socket.close();
     };
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [electionId]);
 
+  // ajoute `count` votes au créneau de la minute courante de la chronologie
+  const addToTimeline = (tl, count) => {
+    const minute = Math.floor(Date.now() / 60000) * 60000;
+    const last = tl.length ? tl[tl.length - 1] : null;
+    if (last && new Date(last.timestamp).getTime() === minute) {
+      return [...tl.slice(0, -1), { ...last, total: (last.total || 0) + count }];
+    }
+    return [...tl, { timestamp: new Date(minute).toISOString(), total: count, by_candidate: [] }];
+  };
+
+  const applyLiveMessage = (msg) => {
+    if (!payloadRef.current || !payloadRef.current.candidates) return;
+    payloadRef.current = applyResultsMessage(payloadRef.current, msg);
+    applyResults(payloadRef.current);
+    const added = deltaVoteCount(msg);
+    if (added) {
+      setVotedCount((c) => (c === null ? c : c + added));
+      setTimeline((tl) => addToTimeline(tl, added));
+    }
+  };
+
+  // calcule l'affichage (tri, pourcentages, prédiction) à partir d'une réponse de
+  // getElectionResults, chargée par HTTP ou mise à jour par le WebSocket
+  const applyResults = (payload) => {
+    // trier les candidats par nombre de voix décroissant, garder 'Vote nul' en fin
+    const raw = payload.candidates || [];
+    const nul = raw.filter(r => r.candidate_name && r.candidate_name.toLowerCase().includes('vote nul'));
+    const others = raw.filter(r => !(r.candidate_name && r.candidate_name.toLowerCase().includes('vote nul'))).sort((a, b) => (b.votes || 0) - (a.votes || 0));
+    const sorted = [...others, ...nul];
+
+    // calculer total_votes (préférer la valeur fournie par le backend)
+    const totalVotes = payload.total_votes || sorted.reduce((s, it) => s + (it.votes || 0), 0);
+
+    // joindre un champ pourcentage numérique (1 décimale) à chaque candidat pour un affichage homogène
+    const withPercents = sorted.map((it) => {
+      const percent = totalVotes ? ((it.votes || 0) / totalVotes) * 100 : 0;
+      return { ...it, percent: Number(percent.toFixed(1)) };
+    });
+
+    // normaliser le formatage des pourcentages des candidats qualifiés
+    const qualified = (payload.qualified_candidates || []).map((q) => ({
+      ...q,
+      percent: q.percent !== undefined ? Number(Number(q.percent).toFixed(1)) : (totalVotes ? Number(((q.votes || 0) / totalVotes * 100).toFixed(1)) : 0)
+    }));
+
+    setResults(withPercents);
+    setMeta({ total_votes: totalVotes, participation_rate: payload.participation_rate || 0, election_title: payload.election_title || '' });
+    setElectionStatus(payload.status || null);
+    setQualifiedCandidates(qualified);
+
+    // calculer le gagnant prédit selon le type de scrutin et les seuils
+    const scrutin = payload.scrutin_type || payload.scrutin || null;
+    const majorityThreshold = (payload.majority_threshold !== undefined && payload.majority_threshold !== null) ? Number(payload.majority_threshold) : 50;
+    const currentRound = payload.current_round || 1;
+
+    // trouver le leader
+    const leader = withPercents.length ? withPercents[0] : null;
+
+    let predicted = null;
+    if (payload.finalized_winner) {
+      // le backend a fourni un gagnant finalisé (peut être id ou objet)
+      const fw = payload.finalized_winner;
+      const name = fw.name || fw.candidate_name || fw.full_name || (typeof fw === 'string' ? fw : null);
+      predicted = null;
+      setFinalWinner(name || fw);
+    } else {
+      setFinalWinner(null);
+      if (scrutin === 'majoritaire_1tour') {
+        // Afficher le candidat en tête (plus de voix), même s'il n'a pas la majorité absolue.
+        if (leader) {
+          predicted = { type: 'top', candidate: leader.candidate_name, votes: leader.votes, percent: leader.percent };
+        }
+      } else if (scrutin === 'majoritaire_2tours') {
+        // Pour un scrutin à deux tours, afficher le candidat ayant la majorité absolue
+        // si présent (percent >= majorityThreshold). Sinon afficher les qualifiés.
+        if (leader && leader.percent >= majorityThreshold) {
+          predicted = { type: 'absolute_majority', candidate: leader.candidate_name, votes: leader.votes, percent: leader.percent };
+        } else if (payload.status === 'second_round_required' || (qualified && qualified.length > 0)) {
+          predicted = { type: 'second_round', qualified: qualified.map(q => q.candidate_name || q.name || q.full_name) };
+        } else if (currentRound === 2 && leader) {
+          predicted = { type: 'second_round_leader', candidate: leader.candidate_name, percent: leader.percent };
+        }
+      } else {
+        // repli : candidat en tête
+        if (leader) predicted = { type: 'top', candidate: leader.candidate_name, percent: leader.percent };
+      }
+      setPredictedWinner(predicted);
+    }
+  };
+
   const loadResults = async () => {
     setError('');
     if (!electionId) {
@@ -53,70 +157,10 @@ export default function ElectionResults() {
     setLoading(true);
     try {
       const res = await getElectionResults(electionId);
+      payloadRef.current = res.data;
         if (res.data.candidates) {
-          // trier les candidats par nombre de voix décroissant, garder 'Vote nul' en fin
-          const raw = res.data.candidates || [];
-          const nul = raw.filter(r => r.candidate_name && r.candidate_name.toLowerCase().includes('vote nul'));
-          const others = raw.filter(r => !(r.candidate_name && r.candidate_name.toLowerCase().includes('vote nul'))).sort((a, b) => (b.votes || 0) - (a.votes || 0));
-          const sorted = [...others, ...nul];
-
-          // calculer total_votes (préférer la valeur fournie par le backend)
-          const totalVotes = res.data.total_votes || sorted.reduce((s, it) => s + (it.votes || 0), 0);
-
-          // joindre un champ pourcentage numérique (1 décimale) à chaque candidat pour un affichage homogène
-          const withPercents = sorted.map((it) => {
-            const percent = totalVotes ? ((it.votes || 0) / totalVotes) * 100 : 0;
-            return { ...it, percent: Number(percent.toFixed(1)) };
-          });
-
-          // normaliser le formatage des pourcentages des candidats qualifiés
-          const qualified = (res.data.qualified_candidates || []).map((q) => ({
-            ...q,
-            percent: q.percent !== undefined ? Number(Number(q.percent).toFixed(1)) : (totalVotes ? Number(((q.votes || 0) / totalVotes * 100).toFixed(1)) : 0)
-          }));
-
-          setResults(withPercents);
-          setMeta({ total_votes: totalVotes, participation_rate: res.data.participation_rate || 0, election_title: res.data.election_title || '' });
-          setElectionStatus(res.data.status || null);
-          setQualifiedCandidates(qualified);
-
-          // calculer le gagnant prédit selon le type de scrutin et les seuils
-          const scrutin = res.data.scrutin_type || res.data.scrutin || null;
-          const majorityThreshold = (res.data.majority_threshold !== undefined && res.data.majority_threshold !== null) ? Number(res.data.majority_threshold) : 50;
-          const currentRound = res.data.current_round || 1;
-
-          // trouver le leader
-          const leader = withPercents.length ? withPercents[0] : null;
-
-          let predicted = null;
-          if (res.data.finalized_winner) {
-            // le backend a fourni un gagnant finalisé (peut être id ou objet)
-            const fw = res.data.finalized_winner;
-            const name = fw.name || fw.candidate_name || fw.full_name || (typeof fw === 'string' ? fw : null);
-            predicted = null;
-            setFinalWinner(name || fw);
-          } else {
-            setFinalWinner(null);
-            if (scrutin === 'majoritaire_1tour') {
-              // Afficher le candidat en tête (plus de voix), même s'il n'a pas la majorité absolue.
-              if (leader) {
-                predicted = { type: 'top', candidate: leader.candidate_name, votes: leader.votes, percent: leader.percent };
-              }
-            } else if (scrutin === 'majoritaire_2tours') {
-              // Pour un scrutin à deux tours, afficher le candidat ayant la majorité absolue
-              // si présent (percent >= majorityThreshold). Sinon afficher les qualifiés.
-              if (leader && leader.percent >= majorityThreshold) {
-                predicted = { type: 'absolute_majority', candidate: leader.candidate_name, votes: leader.votes, percent: leader.percent };
-              } else if (res.data.status === 'second_round_required' || (qualified && qualified.length > 0)) {
-                predicted = { type: 'second_round', qualified: qualified.map(q => q.candidate_name || q.name || q.full_name) };
-              } else if (currentRound === 2 && leader) {
-                predicted = { type: 'second_round_leader', candidate: leader.candidate_name, percent: leader.percent };
-              }
-            } else {
-              // repli : candidat en tête
-              if (leader) predicted = { type: 'top', candidate: leader.candidate_name, percent: leader.percent };
-            }
-            setPredictedWinner(predicted);
+          applyResults(res.data);
+          if (!res.data.finalized_winner) {
             // load election details (for voted_voters_count)
             try {
               const elect = await getElection(electionId);
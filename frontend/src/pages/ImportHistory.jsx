@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import { getMyInstitution, getImportFiles, deleteImportFile, forceDeleteImportFile } from '../services/api';
+import { getMyInstitution, getImportFiles, getImportProgress, deleteImportFile, forceDeleteImportFile, downloadImportBackup } from '../services/api';
 import { useNavigate } from 'react-router-dom';
 import { Modal, Alert } from '../components/FormComponents';
 
@@ -23,6 +23,22 @@ export default function ImportHistory() {
     loadData();
   }, []);
 
+  // Suivre les imports en arrière-plan tant qu'ils ne sont pas terminés
+  const pendingIds = imports.filter((imp) => imp.status === 'queued' || imp.status === 'running').map((imp) => imp.id).join(',');
+  useEffect(() => {
+    if (!pendingIds || !institution) return undefined;
+    const timer = setInterval(async () => {
+      const ids = pendingIds.split(',');
+      try {
+        const updates = await Promise.all(ids.map((id) => getImportProgress(institution.id, id).then((r) => r.data)));
+        setImports((prev) => prev.map((imp) => updates.find((u) => u.id === imp.id) || imp));
+      } catch (err) {
+        // import supprimé entre-temps ou erreur réseau : on réessaiera au prochain tour
+      }
+    }, 2000);
+    return () => clearInterval(timer);
+  }, [pendingIds, institution]);
+
   const loadData = async () => {
     setLoading(true);
     try {
@@ -67,17 +83,20 @@ export default function ImportHistory() {
     setError('');
     try {
       const resp = await forceDeleteImportFile(institution.id, forceTarget);
-      const backup = resp.data.backup;
-      // déclencher le téléchargement du CSV de sauvegarde
-      const blob = new Blob([backup], { type: 'text/csv;charset=utf-8;' });
-      const url = URL.createObjectURL(blob);
-      const a = document.createElement('a');
-      a.href = url;
-      a.download = `import_backup_${forceTarget}.csv`;
-      document.body.appendChild(a);
-      a.click();
-      a.remove();
-      URL.revokeObjectURL(url);
+      // déclencher le téléchargement de la sauvegarde (CSV compressé en gzip)
+      if (resp.data.backup_url) {
+        window.open(resp.data.backup_url, '_blank', 'noopener');
+      } else if (resp.data.backup_name) {
+        const file = await downloadImportBackup(institution.id, resp.data.backup_name);
+        const url = URL.createObjectURL(file.data);
+        const a = document.createElement('a');
+        a.href = url;
+        a.download = resp.data.backup_name.split('/').pop();
+        document.body.appendChild(a);
+        a.click();
+        a.remove();
+        URL.revokeObjectURL(url);
+      }
 
       setForceModalOpen(false);
       setForceTarget(null);
@@ -109,7 +128,7 @@ export default function ImportHistory() {
 
       <Modal title="Suppression forcée" open={forceModalOpen} onClose={() => setForceModalOpen(false)}>
         <div>
-          <p>Des votants importés ont déjà voté. Voulez-vous forcer la suppression ? Cela supprimera aussi les votes et générera un backup CSV téléchargeable.</p>
+          <p>Des votants importés ont déjà voté. Voulez-vous forcer la suppression ? Cela supprimera aussi les votes et générera un backup CSV (gzip) téléchargeable.</p>
           {blockedInfo && (
             <div style={{ fontSize: 13, color: '#374151' }}>Votants bloquants (exemple): {blockedInfo.blocked_voters_sample?.slice(0,5).join(', ')} — total: {blockedInfo.blocked_count}</div>
           )}
@@ -142,6 +161,14 @@ export default function ImportHistory() {
               <div style={{ marginTop: 8, fontSize: 13 }}>
                 Lignes: {imp.total_rows ?? '—'} — Créés: {imp.created ?? '—'} — Mis à jour: {imp.updated ?? '—'}
               </div>
+              {(imp.status === 'queued' || imp.status === 'running') && (
+                <div style={{ marginTop: 6, fontSize: 13, color: '#374151' }}>
+                  {imp.status === 'queued' ? 'En attente du worker…' : `Import en cours : ${imp.rows_processed} lignes traitées${imp.progress != null ? ` (${imp.progress} %)` : ''}`}
+                </div>
+              )}
+              {imp.status === 'failed' && (
+                <div style={{ marginTop: 6, fontSize: 13, color: '#b91c1c' }}>Échec de l'import : {imp.error} ({imp.rows_processed} lignes importées)</div>
+              )}
             </div>
           ))}
         </div>
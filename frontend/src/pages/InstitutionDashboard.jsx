@@ -1,8 +1,11 @@
 import React, { useState, useEffect } from 'react';
-import { getElections, createElection, getMyInstitution, importVoters, importVotersPreview, getVoterSummary } from '../services/api';
+import { getElections, createElection, getMyInstitution, importVoters, importVotersPreview, importVotersDiff, getVoterSummary } from '../services/api';
 import { useNavigate, Link } from 'react-router-dom';
 import { FormContainer, FormField, Card, Alert } from '../components/FormComponents';
 
+// Au-delà de cette taille, l'import est confié au worker (run_import_worker)
+const BACKGROUND_IMPORT_BYTES = 5 * 1024 * 1024;
+
 const styles = {
   container: {
     padding: '20px',
@@ -121,6 +124,8 @@ export default function InstitutionDashboard() {
   const [importLoading, setImportLoading] = useState(false);
   const [importResult, setImportResult] = useState(null);
   const [previewResult, setPreviewResult] = useState(null);
+  const [diffResult, setDiffResult] = useState(null);
+  const [diffLoading, setDiffLoading] = useState(false);
   const [voterSummary, setVoterSummary] = useState(null);
   const navigate = useNavigate();
 
@@ -176,6 +181,7 @@ export default function InstitutionDashboard() {
   const handleFileChange = (e) => {
     setImportResult(null);
     setPreviewResult(null);
+    setDiffResult(null);
     const file = e.target.files?.[0] || null;
     setSelectedFile(file);
     if (file) {
@@ -190,6 +196,19 @@ export default function InstitutionDashboard() {
     }
   };
 
+  const handleDiff = async () => {
+    if (!selectedFile) return;
+    setDiffLoading(true);
+    try {
+      const resp = await importVotersDiff(institution.id, selectedFile);
+      setDiffResult(resp.data);
+    } catch (err) {
+      setError(err.response?.data?.detail || 'Impossible de comparer le fichier avec la liste actuelle.');
+    } finally {
+      setDiffLoading(false);
+    }
+  };
+
   const handleImportSubmit = async (e) => {
     e.preventDefault();
     if (!selectedFile) {
@@ -199,7 +218,13 @@ export default function InstitutionDashboard() {
     setImportLoading(true);
     setError('');
     try {
-      const resp = await importVoters(institution.id, selectedFile);
+      // Les gros fichiers sont importés en arrière-plan (suivi dans l'historique)
+      const background = selectedFile.size > BACKGROUND_IMPORT_BYTES;
+      const resp = await importVoters(institution.id, selectedFile, { background });
+      if (resp.status === 202) {
+        setImportResult({ queued: true, id: resp.data.id });
+        return;
+      }
       setImportResult(resp.data);
       // recharger les données pour refléter les nouveaux votants créés : actualiser le résumé et les données complètes
       try {
@@ -387,10 +412,29 @@ export default function InstitutionDashboard() {
           <div style={{ flexBasis: '100%', marginTop: 10 }}>
             <div style={{ display: 'flex', gap: 12, alignItems: 'center', flexWrap: 'wrap' }}>
               {importLoading && <div style={{ fontSize: 13, color: '#374151' }}>Traitement du fichier…</div>}
-              {importResult && <div style={{ fontSize: 13, color: '#155724' }}>{(importResult.created || 0)} créés • {(importResult.updated || 0)} mis à jour</div>}
+              {importResult && !importResult.queued && <div style={{ fontSize: 13, color: '#155724' }}>{(importResult.created || 0)} créés • {(importResult.updated || 0)} mis à jour</div>}
+              {importResult?.queued && (
+                <div style={{ fontSize: 13, color: '#155724' }}>
+                  Import lancé en arrière-plan. <Link to="/institution/imports">Suivre la progression</Link>
+                </div>
+              )}
               {previewResult && (
                 <div style={{ fontSize: 13, color: '#374151', background: '#eef6ff', padding: '6px 10px', borderRadius: 6 }}>
-                  {previewResult.total_rows} lignes • {previewResult.eligible} ok • {previewResult.invalid} invalid
+                  {/* Les aperçus XLSX sont estimés à partir d'un échantillon */}
+                  {previewResult.estimated ? '≈ ' : ''}{previewResult.total_rows} lignes • {previewResult.eligible} ok • {previewResult.invalid} invalid
+                  {!diffResult && (
+                    <button type="button" className="btn-secondary" onClick={handleDiff} disabled={diffLoading} style={{ marginLeft: 8, padding: '2px 8px', fontSize: 12 }}>
+                      {diffLoading ? 'Comparaison…' : 'Comparer avec la liste actuelle'}
+                    </button>
+                  )}
+                </div>
+              )}
+              {diffResult && (
+                <div style={{ fontSize: 13, color: '#374151', background: '#fff7e6', padding: '6px 10px', borderRadius: 6 }}>
+                  {diffResult.new} nouveaux • {diffResult.updated} noms modifiés • {diffResult.unchanged} inchangés • {diffResult.duplicates} doublons • {diffResult.missing} absents du fichier
+                  {diffResult.samples?.missing?.length > 0 && (
+                    <div style={{ fontSize: 12, color: '#6b7280' }}>Absents (exemple) : {diffResult.samples.missing.slice(0, 5).join(', ')}</div>
+                  )}
                 </div>
               )}
             </div>
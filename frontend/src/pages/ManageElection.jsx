@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useRef, useCallback } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import { getElection, getVoters, deleteElection, updateElection, updateVoter, openElection, closeElection } from '../services/api';
+import { getElection, getVoters, deleteElection, updateElection, updateVoter, openElection, closeElection, subscribeElectionResults, deltaVoteCount } from '../services/api';
 import { Card, Alert, Modal } from '../components/FormComponents';
 
 const styles = {
@@ -78,20 +78,38 @@ export default function ManageElection() {
   }, [electionId]);
 
   // Chargement initial + sondage toutes les 5 secondes pour actualiser les données
+  // Avec le WebSocket des résultats ouvert, les votes poussés incrémentent localement
+  // le nombre de votants (sans requête) et le sondage ralentit à 30s.
   useEffect(() => {
+    let mounted = true;
+    const poll = (delay) => {
+      if (pollRef.current) clearInterval(pollRef.current);
+      pollRef.current = setInterval(() => {
+        loadData();
+      }, delay);
+    };
     loadData();
-    if (pollRef.current) clearInterval(pollRef.current);
-    pollRef.current = setInterval(() => {
-      loadData();
-    }, 5000);
+    poll(5000);
+    const socket = subscribeElectionResults(electionId, {
+      onOpen: () => poll(30000),
+      onClose: () => { if (mounted) poll(5000); },
+      onMessage: (msg) => {
+        const added = deltaVoteCount(msg);
+        if (mounted && added) {
+          setElection((e) => (e ? { ...e, voted_voters_count: (e.voted_voters_count || 0) + added } : e));
+        }
+      },
+    });
 
     return () => {
+      mounted = false;
       if (pollRef.current) {
         clearInterval(pollRef.current);
         pollRef.current = null;
       }
+      if (socket) socket.close();
     };
-  }, [loadData]);
+  }, [loadData, electionId]);
 
   const handleDeleteElection = () => {
     setDeleteModalOpen(true);
@@ -52,6 +52,7 @@ export default function VoterElections() {
 
   const handleLogout = () => {
     localStorage.removeItem('voter_id');
+    localStorage.removeItem('voter_ticket');
     localStorage.removeItem('voter_name');
     localStorage.removeItem('institution_id');
     navigate('/');
@@ -20,6 +20,8 @@ export default function VoterLogin() {
     try {
       const res = await voterLogin(form.identifier, form.institution_id);
       localStorage.setItem('voter_id', res.data.voter_id);
+      // ticket signé : permet au backend de valider le votant sans relire la base
+      if (res.data.ticket) localStorage.setItem('voter_ticket', res.data.ticket);
       // le backend renvoie parfois encore un nom de votant ; le sauvegarder si présent
       if (res.data.name) localStorage.setItem('voter_name', res.data.name);
       localStorage.setItem('institution_id', form.institution_id);
@@ -71,6 +71,74 @@ export const getElection = (id) =>
 export const getElectionResults = (id) =>
   api.get(`/elections/${id}/results/`);
 
+// Live results push (WebSocket, available when the backend runs in ASGI mode).
+// Messages: { type: 'snapshot' | 'delta', election_id, counts | deltas }, where
+// counts/deltas are [{ candidate_id, votes }] (candidate_id null = vote nul).
+// Returns the socket, or null when WebSockets are unavailable; callers should
+// keep polling until `onOpen` fires and resume it on `onClose`.
+export const subscribeElectionResults = (id, { onMessage, onOpen, onClose } = {}) => {
+  if (typeof WebSocket === 'undefined') return null;
+  const wsHost = API_HOST.replace(/^http/, 'ws');
+  const token = localStorage.getItem('token');
+  const query = token && token !== 'null' && token !== 'undefined' ? `?token=${encodeURIComponent(token)}` : '';
+  let socket;
+  try {
+    socket = new WebSocket(`${wsHost}/ws/elections/${id}/results/${query}`);
+  } catch (e) {
+    return null;
+  }
+  socket.onopen = () => onOpen && onOpen();
+  socket.onclose = () => onClose && onClose();
+  socket.onmessage = (event) => {
+    try {
+      if (onMessage) onMessage(JSON.parse(event.data));
+    } catch (e) {
+      // ignore malformed messages
+    }
+  };
+  return socket;
+};
+
+// Nombre de votes ajoutés par un message 'delta'
+export const deltaVoteCount = (msg) =>
+  (msg && msg.type === 'delta' ? (msg.deltas || []) : []).reduce((s, d) => s + (d.votes || 0), 0);
+
+// Applique un message 'snapshot' ou 'delta' à une réponse de getElectionResults,
+// sans requête HTTP : voix par candidat, total, pourcentages et taux de participation.
+// Les statuts calculés par le serveur (qualifiés, élu) sont rafraîchis par le sondage.
+export const applyResultsMessage = (payload, msg) => {
+  if (!payload || !Array.isArray(payload.candidates) || !msg) return payload;
+  if (msg.type !== 'snapshot' && msg.type !== 'delta') return payload;
+  const snapshot = msg.type === 'snapshot';
+  const key = (id) => (id === null || id === undefined ? 'null' : String(id));
+  const changes = new Map(((snapshot ? msg.counts : msg.deltas) || []).map(c => [key(c.candidate_id), c.votes || 0]));
+  const votesOf = (c) => {
+    const change = changes.get(key(c.candidate_id));
+    if (snapshot) return change || 0;
+    return (c.votes || 0) + (change || 0);
+  };
+  const candidates = payload.candidates.map(c => ({ ...c, votes: votesOf(c) }));
+  const total = candidates.reduce((s, c) => s + c.votes, 0);
+  const percentOf = (votes) => (total ? Math.round((votes / total) * 10000) / 100 : 0);
+  const oldTotal = payload.total_votes || 0;
+  // participation = total / inscrits éligibles : on garde le même dénominateur
+  const participation = oldTotal && payload.participation_rate
+    ? Math.round((total * payload.participation_rate / oldTotal) * 100) / 100
+    : payload.participation_rate;
+  const byId = new Map(candidates.map(c => [key(c.candidate_id), c]));
+  const qualified = payload.qualified_candidates && payload.qualified_candidates.map(q => {
+    const c = byId.get(key(q.candidate_id));
+    return c ? { ...q, votes: c.votes, percent: percentOf(c.votes) } : q;
+  });
+  return {
+    ...payload,
+    total_votes: total,
+    participation_rate: participation,
+    candidates: candidates.map(c => ({ ...c, percent: percentOf(c.votes) })),
+    ...(qualified ? { qualified_candidates: qualified } : {}),
+  };
+};
+
 export const getElectionTimeline = (id, { unit = 'minute', start = null, end = null } = {}) => {
   const params = {};
   if (unit) params.unit = unit;
@@ -172,11 +240,14 @@ export const deleteVoter = (id) =>
   api.delete(`/voters/${id}/`);
 
 // Import voters (CSV / XLSX) for an institution
-export const importVoters = (institutionId, file) => {
+// With { background: true } the backend queues the file (202 + { id, status })
+// and a worker imports it; follow it with getImportProgress.
+export const importVoters = (institutionId, file, { background = false } = {}) => {
   const form = new FormData();
   form.append('file', file);
   // Let axios set the Content-Type (including boundary) automatically.
-  return api.post(`/institutions/${institutionId}/import_voters/`, form);
+  const query = background ? '?background=true' : '';
+  return api.post(`/institutions/${institutionId}/import_voters/${query}`, form);
 };
 
 export const importVotersPreview = (institutionId, file) => {
@@ -186,26 +257,63 @@ export const importVotersPreview = (institutionId, file) => {
   return api.post(`/institutions/${institutionId}/import_voters/?preview=true`, form);
 };
 
+// Compare the file with the current voters: new / updated / duplicates / missing counts and samples
+export const importVotersDiff = (institutionId, file) => {
+  const form = new FormData();
+  form.append('file', file);
+  return api.post(`/institutions/${institutionId}/import_voters/?preview=diff`, form);
+};
+
 // Get a simple summary of voters for the authenticated institution
 export const getVoterSummary = () => api.get('/institutions/voters_summary/');
 
 // Import files management
 export const getImportFiles = (institutionId) => api.get(`/institutions/${institutionId}/imports/`);
+export const getImportProgress = (institutionId, fileId) => api.get(`/institutions/${institutionId}/imports/${fileId}/progress/`);
 // NOTE: Django's APPEND_SLASH is enabled; use trailing slashes for POST endpoints that expect one.
 export const deleteImportFile = (institutionId, fileId) => api.post(`/institutions/${institutionId}/imports/delete/`, { file_id: fileId });
 export const forceDeleteImportFile = (institutionId, fileId) => api.post(`/institutions/${institutionId}/imports/force_delete/`, { file_id: fileId });
+// Backups written by force_delete (gzip CSV) when they are kept in the backend's storage
+export const downloadImportBackup = (institutionId, name) => api.get(`/institutions/${institutionId}/imports/backup/`, { params: { name }, responseType: 'blob' });
 
 // Votes
+// Signed voter ticket returned by voterLogin (stored by VoterLogin.jsx)
+const voterTicket = () => {
+  const ticket = localStorage.getItem('voter_ticket');
+  return ticket && ticket !== 'null' && ticket !== 'undefined' ? ticket : null;
+};
+
+// Ticket expiré ou invalide (401) : on efface la session électeur et on
+// renvoie l'électeur vers la page de connexion pour qu'il obtienne un nouveau ticket.
+const expireVoterSession = (err) => {
+  if (err?.response?.status === 401) {
+    localStorage.removeItem('voter_ticket');
+    localStorage.removeItem('voter_id');
+    localStorage.removeItem('voter_name');
+    // L'application utilise un HashRouter : la route est dans le fragment
+    if (typeof window !== 'undefined' && window.location.hash !== '#/voter/login') {
+      window.location.hash = '#/voter/login';
+    }
+  }
+  return Promise.reject(err);
+};
+
 export const castVote = (ballot_id, candidate_id, voter_id, election_id = null) => {
   const payload = { ballot_id, candidate_id, voter_id };
   // include election_id when provided (supports election-level voting)
   if (election_id !== null && election_id !== undefined) payload.election_id = election_id;
-  return api.post('/votes/cast_vote/', payload);
+  const ticket = voterTicket();
+  if (ticket) payload.ticket = ticket;
+  return api.post('/votes/cast_vote/', payload).catch(expireVoterSession);
 };
 
 // Check whether a voter has already voted in an election
-export const checkHasVoted = (voter_id, election_id) =>
-  api.get('/votes/has_voted/', { params: { voter_id, election_id } });
+export const checkHasVoted = (voter_id, election_id) => {
+  const params = { voter_id, election_id };
+  const ticket = voterTicket();
+  if (ticket) params.ticket = ticket;
+  return api.get('/votes/has_voted/', { params }).catch(expireVoterSession);
+};
 
 export default api;
 export { API_BASE, API_HOST };
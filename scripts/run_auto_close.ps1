@@ -34,8 +34,8 @@ try {
     }
 
     # Run the management command
-    Write-Log "Running: $PythonExe manage.py auto_close_elections"
-    & $PythonExe manage.py auto_close_elections 2>&1 | ForEach-Object { Write-Log $_ }
+    Write-Log "Running: $PythonExe manage.py auto_close_elections --once"
+    & $PythonExe manage.py auto_close_elections --once 2>&1 | ForEach-Object { Write-Log $_ }
     $exitCode = $LASTEXITCODE
     Write-Log "auto_close_elections finished with exit code $exitCode"
 